@@ -261,6 +261,8 @@ def main():
     
     print("\n" + "=" * 80)
     print("Analysis complete! View the images to get actual metric values.")
+    print("For exact numbers from saved predictions, run evaluate_brssd.py:")
+    print("  python evaluate_brssd.py --labels BRSSD/valid/labels --predictions <pred labels>")
     print("=" * 80 + "\n")
 
 if __name__ == "__main__":
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Artifact Store for BRSSD Runs
+Splits run folders, zipped runs and validation bundles into content-defined
+chunks stored once by hash; runs become small manifests that reference the
+chunks and are restored on demand
+"""
+
+import os
+import sys
+import json
+import zlib
+import shutil
+import hashlib
+import zipfile
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_STORE = 'artifacts'
+
+# Content-defined chunking: boundaries depend on the bytes themselves, so an
+# insertion only changes the chunks around it instead of shifting all of them
+MIN_CHUNK = 16 * 1024
+AVG_CHUNK_BITS = 16  # ~64 KB average chunk
+MAX_CHUNK = 256 * 1024
+GEAR_WINDOW = 64
+BLOCK_SIZE = 4 * 1024 * 1024
+
+_rng = np.random.default_rng(20240125)
+GEAR = _rng.integers(0, 2**63, size=256, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+# Mask the high bits: with h_i = sum(G[b_{i-k}] << k) they depend on the whole window
+BOUNDARY_MASK = np.uint64(((1 << AVG_CHUNK_BITS) - 1) << (64 - AVG_CHUNK_BITS))
+
+
+def candidate_cuts(data):
+    """Offsets (exclusive end) where the rolling gear hash hits the boundary mask"""
+    n = len(data)
+    buf = np.frombuffer(data, dtype=np.uint8)
+    cuts = []
+    for start in range(0, n, BLOCK_SIZE):
+        lead = min(start, GEAR_WINDOW - 1)
+        block = buf[start - lead:min(n, start + BLOCK_SIZE)]
+        g = GEAR[block]
+        h = np.zeros(len(block), dtype=np.uint64)
+        # Gear hash over a 64-byte window, vectorized across the block
+        for k in range(min(GEAR_WINDOW, len(block))):
+            h[k:] += g[:len(block) - k] << np.uint64(k)
+        hits = np.flatnonzero((h[lead:] & BOUNDARY_MASK) == 0)
+        cuts.extend((hits + start + 1).tolist())
+    return cuts
+
+
+def chunk_boundaries(data):
+    """Chunk end offsets honouring the minimum and maximum chunk size"""
+    n = len(data)
+    if n <= MIN_CHUNK:
+        return [n] if n else []
+    bounds, last = [], 0
+    for cut in candidate_cuts(data):
+        while cut - last > MAX_CHUNK:
+            last += MAX_CHUNK
+            bounds.append(last)
+        if cut - last >= MIN_CHUNK and cut < n:
+            bounds.append(cut)
+            last = cut
+    while n - last > MAX_CHUNK:
+        last += MAX_CHUNK
+        bounds.append(last)
+    bounds.append(n)
+    return bounds
+
+
+def content_key(manifest):
+    """What an artifact holds: its kind and the (path, sha256) of every file"""
+    return [manifest['kind']] + [[f['path'], f['sha256']] for f in manifest['files']]
+
+
+class ArtifactStore:
+    """Chunk objects under objects/, one JSON manifest per artifact under refs/"""
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.refs = self.root / 'refs'
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.refs.mkdir(parents=True, exist_ok=True)
+
+    # -- objects ---------------------------------------------------------
+
+    def object_path(self, digest):
+        return self.objects / digest[:2] / digest[2:]
+
+    def has_object(self, digest):
+        return self.object_path(digest).exists()
+
+    def put_chunk(self, chunk):
+        """Store one chunk; returns (hash, bytes written to disk)"""
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self.object_path(digest)
+        if path.exists():
+            return digest, 0
+        packed = zlib.compress(chunk, 6)
+        # Already-compressed content (PNG, JPEG) is kept raw
+        payload = b'z' + packed if len(packed) < len(chunk) else b'r' + chunk
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return digest, len(payload)
+
+    def get_chunk(self, digest):
+        with open(self.object_path(digest), 'rb') as f:
+            payload = f.read()
+        chunk = zlib.decompress(payload[1:]) if payload[:1] == b'z' else payload[1:]
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise IOError(f"Corrupt object {digest}")
+        return chunk
+
+    # -- files -------------------------------------------------------------
+
+    def put_bytes(self, data):
+        """Chunk and store a file's bytes; returns its manifest entry and new bytes written"""
+        chunks, written, start = [], 0, 0
+        for end in chunk_boundaries(data):
+            digest, n = self.put_chunk(data[start:end])
+            chunks.append(digest)
+            written += n
+            start = end
+        entry = {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest(), 'chunks': chunks}
+        return entry, written
+
+    def get_bytes(self, entry):
+        data = b''.join(self.get_chunk(d) for d in entry['chunks'])
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise IOError("Restored file does not match its recorded hash")
+        return data
+
+    # -- artifacts ---------------------------------------------------------
+
+    def ref_path(self, name):
+        return self.refs / f"{name}.json"
+
+    def list_refs(self):
+        refs = []
+        for path in sorted(self.refs.glob('*.json')):
+            with open(path) as f:
+                refs.append(json.load(f))
+        return refs
+
+    def load_ref(self, name):
+        path = self.ref_path(name)
+        if not path.exists():
+            raise KeyError(f"No artifact named '{name}'")
+        with open(path) as f:
+            return json.load(f)
+
+    def add(self, source, name=None):
+        """
+        Add a run folder, a zip archive or a single file; returns the manifest.
+
+        An existing artifact of the same name is only replaced by identical
+        content. Otherwise an explicit name raises FileExistsError and a
+        default name (the source's basename) gets a content-hash suffix.
+        """
+        source = Path(source)
+        explicit = bool(name)
+        if not name:
+            name = source.stem if source.suffix == '.zip' else source.name
+        manifest = {
+            'name': name,
+            'source': str(source),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'files': [],
+        }
+        written = 0
+
+        if source.is_dir():
+            manifest['kind'] = 'dir'
+            for path in sorted(p for p in source.rglob('*') if p.is_file()):
+                entry, n = self.put_bytes(path.read_bytes())
+                entry['path'] = path.relative_to(source).as_posix()
+                manifest['files'].append(entry)
+                written += n
+        elif source.suffix == '.zip':
+            # Members are stored uncompressed and individually, so the same
+            # plot inside differently named archives is stored once
+            manifest['kind'] = 'zip'
+            with zipfile.ZipFile(source) as zf:
+                for info in zf.infolist():
+                    data = b'' if info.is_dir() else zf.read(info)
+                    entry, n = self.put_bytes(data)
+                    entry.update({'path': info.filename, 'date_time': list(info.date_time),
+                                  'compress_type': info.compress_type,
+                                  'external_attr': info.external_attr})
+                    manifest['files'].append(entry)
+                    written += n
+        else:
+            manifest['kind'] = 'file'
+            entry, n = self.put_bytes(source.read_bytes())
+            entry['path'] = source.name
+            manifest['files'].append(entry)
+            written += n
+
+        manifest['size'] = sum(f['size'] for f in manifest['files'])
+        manifest['stored_bytes'] = written
+        if self.ref_path(name).exists() and not self.same_content(name, manifest):
+            if explicit:
+                raise FileExistsError(f"An artifact named '{name}' with different content exists")
+            digest = hashlib.sha256(json.dumps(content_key(manifest)).encode()).hexdigest()
+            name = manifest['name'] = f"{name}-{digest[:8]}"
+        with open(self.ref_path(name), 'w') as f:
+            json.dump(manifest, f, indent=1)
+        return manifest
+
+    def same_content(self, name, manifest):
+        """True if the artifact `name` exists and holds the same files as manifest"""
+        try:
+            return content_key(self.load_ref(name)) == content_key(manifest)
+        except KeyError:
+            return False
+
+    def restore(self, name, dest=None):
+        """Rebuild an artifact from its chunks; returns the restored path"""
+        manifest = self.load_ref(name)
+        kind = manifest['kind']
+        dest = Path(dest) if dest else Path(manifest['source'])
+
+        if kind == 'dir':
+            for entry in manifest['files']:
+                path = dest / entry['path']
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(self.get_bytes(entry))
+        elif kind == 'zip':
+            # Content-identical to the original; the compressed bytes may differ
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(dest, 'w') as zf:
+                for entry in manifest['files']:
+                    info = zipfile.ZipInfo(entry['path'], date_time=tuple(entry['date_time']))
+                    info.compress_type = entry['compress_type']
+                    info.external_attr = entry['external_attr']
+                    zf.writestr(info, self.get_bytes(entry))
+        else:
+            if dest.is_dir():
+                dest = dest / manifest['files'][0]['path']
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_bytes(self.get_bytes(manifest['files'][0]))
+        return dest
+
+    def verify(self, name):
+        """Check that every chunk of an artifact is present and intact"""
+        for entry in self.load_ref(name)['files']:
+            self.get_bytes(entry)
+        return True
+
+    def remove(self, name):
+        self.ref_path(name).unlink()
+
+    def gc(self):
+        """Delete objects no manifest refers to; returns (objects, bytes) freed"""
+        live = {d for m in self.list_refs() for f in m['files'] for d in f['chunks']}
+        freed = count = 0
+        for path in self.objects.glob('*/*'):
+            digest = path.parent.name + path.name
+            if digest not in live:
+                freed += path.stat().st_size
+                path.unlink()
+                count += 1
+        return count, freed
+
+    def stats(self):
+        """Logical size of all artifacts vs bytes actually stored"""
+        refs = self.list_refs()
+        objects = list(self.objects.glob('*/*'))
+        return {
+            'artifacts': len(refs),
+            'logical_bytes': sum(m['size'] for m in refs),
+            'objects': len(objects),
+            'stored_bytes': sum(p.stat().st_size for p in objects),
+        }
+
+
+def human(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.1f} {unit}" if unit != 'B' else f"{n} B"
+        n /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Deduplicating content-addressed store for run and validation archives',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Store all zipped runs and validation bundles (identical content is kept once)
+  python artifact_store.py add YOLOv10m_training*.zip val*.zip
+
+  # Store a run folder and free the original after verifying the copy
+  python artifact_store.py add runs/brssd/YOLOv10s_BRSSD --delete-source
+
+  # Bring a run back when you need it
+  python artifact_store.py restore YOLOv10s_BRSSD
+  python artifact_store.py restore val3 /tmp/val3.zip
+
+  python artifact_store.py stats
+
+Objects never change once written, so syncing the store (rsync, rclone)
+only transfers chunks the other side does not have yet.
+        """
+    )
+    parser.add_argument('--store', type=str, default=DEFAULT_STORE, help='Store directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('add', help='Add run folders, zip archives or files')
+    p.add_argument('paths', nargs='+', help='Paths to add')
+    p.add_argument('--name', type=str, default=None, help='Artifact name (single path only)')
+    p.add_argument('--delete-source', action='store_true',
+                   help='Delete the original after the stored copy is verified')
+
+    p = sub.add_parser('restore', help='Rebuild an artifact')
+    p.add_argument('name', help='Artifact name')
+    p.add_argument('dest', nargs='?', default=None, help='Destination (default: original path)')
+
+    sub.add_parser('ls', help='List artifacts')
+    sub.add_parser('stats', help='Deduplication statistics')
+
+    p = sub.add_parser('rm', help='Remove an artifact manifest (run gc to free space)')
+    p.add_argument('names', nargs='+', help='Artifact names')
+
+    sub.add_parser('gc', help='Delete unreferenced chunks')
+
+    args = parser.parse_args()
+    store = ArtifactStore(args.store)
+
+    try:
+        if args.command == 'add':
+            if args.name and len(args.paths) > 1:
+                print("✗ --name can only be used with a single path")
+                return 1
+            for path in args.paths:
+                if not Path(path).exists():
+                    print(f"✗ Not found: {path}")
+                    return 1
+                manifest = store.add(path, args.name)
+                print(f"  ✓ {manifest['name']:<28} {human(manifest['size']):>10} logical, "
+                      f"{human(manifest['stored_bytes']):>10} new")
+                # The source goes only if its own manifest is the one stored under the name
+                if args.delete_source and store.same_content(manifest['name'], manifest) \
+                        and store.verify(manifest['name']):
+                    if Path(path).is_dir():
+                        shutil.rmtree(path)
+                    else:
+                        Path(path).unlink()
+                    print(f"    Removed {path}")
+
+        elif args.command == 'restore':
+            dest = store.restore(args.name, args.dest)
+            print(f"✓ Restored {args.name} to {dest}")
+
+        elif args.command == 'ls':
+            print(f"{'Name':<30} {'Kind':<5} {'Files':>6} {'Size':>10}  {'Added'}")
+            print(f"{'-'*30} {'-'*5} {'-'*6} {'-'*10}  {'-'*19}")
+            for m in store.list_refs():
+                print(f"{m['name']:<30} {m['kind']:<5} {len(m['files']):>6} "
+                      f"{human(m['size']):>10}  {m['created']}")
+
+        elif args.command == 'stats':
+            s = store.stats()
+            ratio = s['logical_bytes'] / s['stored_bytes'] if s['stored_bytes'] else 0.0
+            print(f"  Artifacts:      {s['artifacts']}")
+            print(f"  Logical size:   {human(s['logical_bytes'])}")
+            print(f"  Stored size:    {human(s['stored_bytes'])} in {s['objects']} chunks")
+            print(f"  Dedup ratio:    {ratio:.2f}x")
+
+        elif args.command == 'rm':
+            for name in args.names:
+                store.remove(name)
+                print(f"  Removed {name}")
+
+        elif args.command == 'gc':
+            count, freed = store.gc()
+            print(f"✓ Deleted {count} unreferenced chunks ({human(freed)})")
+    except (KeyError, FileNotFoundError, IOError) as e:
+        print(f"✗ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
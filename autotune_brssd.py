@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+CPU Auto-Tuning for YOLOv10 Training on BRSSD
+Times a few mini-iterations over batch sizes, dataloader workers and
+torch thread settings, and picks the fastest stable combination
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+from pathlib import Path
+
+import yaml
+
+# Coefficient of variation above which a candidate's step times are
+# considered too noisy to trust (thermal throttling, swapping, ...)
+MAX_STEP_CV = 0.35
+
+
+def default_candidates(batch=16):
+    """Build the candidate grid for the current machine"""
+    cpus = os.cpu_count() or 1
+    threads = sorted({cpus, max(1, cpus // 2), max(1, cpus - 1)}, reverse=True)
+    batches = sorted({b for b in (2, 4, 8, 16, 32) if b <= max(batch, 2)})
+    workers = sorted({0, 2, min(4, cpus), min(8, cpus)})
+    return {
+        'intra_op_threads': threads,
+        'inter_op_threads': [1, 2] if cpus > 2 else [1],
+        'batch': batches,
+        'workers': workers,
+    }
+
+
+def _time_candidate(model_path, data_yaml, imgsz, batch, workers, intra, inter,
+                    warmup, iterations, queue):
+    """Run timed forward/backward steps in a fresh process and report back"""
+    # Thread settings must be applied before torch does any parallel work,
+    # which is why every candidate gets its own interpreter
+    import torch
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(inter)
+    except RuntimeError:
+        pass
+
+    try:
+        from ultralytics import YOLO
+        from ultralytics.cfg import get_cfg
+        from ultralytics.data import build_dataloader, build_yolo_dataset
+        from ultralytics.data.utils import check_det_dataset
+        from ultralytics.utils import DEFAULT_CFG
+
+        cfg = get_cfg(DEFAULT_CFG, overrides={'imgsz': imgsz, 'batch': batch,
+                                              'workers': workers, 'data': data_yaml})
+        data = check_det_dataset(data_yaml)
+        dataset = build_yolo_dataset(cfg, data['train'], batch, data, mode='train')
+        loader = build_dataloader(dataset, batch, workers, shuffle=True)
+
+        model = YOLO(model_path).model.float().cpu()
+        model.args = cfg  # the loss reads its gains from model.args
+        model.train()
+        for p in model.parameters():
+            p.requires_grad = True
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.0, momentum=0.9)
+
+        step_times = []
+        loader_iter = iter(loader)
+        for i in range(warmup + iterations):
+            start = time.perf_counter()
+            batch_data = next(loader_iter)
+            batch_data['img'] = batch_data['img'].float() / 255
+            loss, _ = model.loss(batch_data)
+            loss.sum().backward()
+            optimizer.step()
+            optimizer.zero_grad()
+            if i >= warmup:
+                step_times.append(time.perf_counter() - start)
+
+        queue.put({'ok': True, 'step_times': step_times})
+    except Exception as e:
+        queue.put({'ok': False, 'error': f"{type(e).__name__}: {e}"})
+
+
+def time_candidate(model_path, data_yaml, imgsz, batch, workers, intra, inter,
+                   warmup=2, iterations=5, timeout=600):
+    """Time one (batch, workers, threads) combination in a subprocess"""
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_time_candidate,
+                       args=(model_path, data_yaml, imgsz, batch, workers, intra, inter,
+                             warmup, iterations, queue))
+    proc.start()
+
+    # Poll so that a worker killed by the OOM killer is noticed immediately
+    outcome = None
+    deadline = time.monotonic() + timeout
+    while outcome is None and time.monotonic() < deadline:
+        try:
+            outcome = queue.get(timeout=1)
+        except Exception:
+            if not proc.is_alive():
+                try:
+                    outcome = queue.get(timeout=1)
+                except Exception:
+                    outcome = {'ok': False, 'error': f'worker exited with code {proc.exitcode}'}
+    if outcome is None:
+        outcome = {'ok': False, 'error': f'timed out after {timeout}s'}
+    proc.join(timeout=10)
+    if proc.is_alive():
+        proc.terminate()
+
+    result = {'batch': batch, 'workers': workers,
+              'intra_op_threads': intra, 'inter_op_threads': inter}
+    if not outcome['ok']:
+        result.update({'stable': False, 'error': outcome['error'],
+                       'images_per_sec': 0.0})
+        return result
+
+    times = outcome['step_times']
+    mean = sum(times) / len(times)
+    std = (sum((t - mean) ** 2 for t in times) / len(times)) ** 0.5
+    cv = std / mean if mean > 0 else 0.0
+    result.update({
+        'stable': cv <= MAX_STEP_CV,
+        'step_time_s': round(mean, 4),
+        'step_time_cv': round(cv, 3),
+        'images_per_sec': round(batch / mean, 2) if mean > 0 else 0.0,
+    })
+    return result
+
+
+def _best(results):
+    """Pick the fastest stable result, falling back to the fastest finished one"""
+    stable = [r for r in results if r['stable']]
+    pool = stable or [r for r in results if r['images_per_sec'] > 0]
+    if not pool:
+        return None
+    return max(pool, key=lambda r: r['images_per_sec'])
+
+
+def autotune_cpu(model_path, data_yaml, imgsz=640, batch=16, candidates=None,
+                 warmup=2, iterations=5):
+    """
+    Search thread, batch and worker settings for CPU training.
+
+    The search is coordinate-wise (threads, then batch, then workers) so the
+    number of timed runs grows with the sum, not the product, of the
+    candidate list lengths.
+    """
+    candidates = candidates or default_candidates(batch)
+
+    print("\n" + "=" * 60)
+    print("CPU Auto-Tuning")
+    print("=" * 60)
+    print(f"  CPUs: {os.cpu_count()}")
+    print(f"  Threads (intra-op): {candidates['intra_op_threads']}")
+    print(f"  Threads (inter-op): {candidates['inter_op_threads']}")
+    print(f"  Batch sizes: {candidates['batch']}")
+    print(f"  Workers: {candidates['workers']}")
+
+    trials = []
+
+    def run(stage, **kwargs):
+        result = time_candidate(model_path, data_yaml, imgsz, warmup=warmup,
+                                iterations=iterations, **kwargs)
+        result['stage'] = stage
+        trials.append(result)
+        status = f"{result['images_per_sec']:.2f} img/s" if result['images_per_sec'] else result.get('error')
+        flag = '✓' if result['stable'] else '⚠️ '
+        print(f"  {flag} batch={kwargs['batch']:<3} workers={kwargs['workers']:<2} "
+              f"threads={kwargs['intra']}/{kwargs['inter']}  {status}")
+        return result
+
+    # Stage 1: threads, with a small batch and in-process loading
+    probe_batch = min(candidates['batch'][-1], 4)
+    print("\n[1/3] Thread settings...")
+    stage = [run('threads', batch=probe_batch, workers=0, intra=intra, inter=inter)
+             for intra in candidates['intra_op_threads']
+             for inter in candidates['inter_op_threads']]
+    best = _best(stage)
+    if best is None:
+        raise RuntimeError("Auto-tuning failed: no candidate finished a timed step")
+    intra, inter = best['intra_op_threads'], best['inter_op_threads']
+
+    # Stage 2: batch size
+    print("\n[2/3] Batch sizes...")
+    stage = [run('batch', batch=b, workers=0, intra=intra, inter=inter)
+             for b in candidates['batch']]
+    best = _best(stage) or best
+    tuned_batch = best['batch']
+
+    # Stage 3: dataloader workers
+    print("\n[3/3] Dataloader workers...")
+    stage = [run('workers', batch=tuned_batch, workers=w, intra=intra, inter=inter)
+             for w in candidates['workers']]
+    best = _best(stage) or best
+
+    settings = {
+        'batch': best['batch'],
+        'workers': best['workers'],
+        'intra_op_threads': best['intra_op_threads'],
+        'inter_op_threads': best['inter_op_threads'],
+        'images_per_sec': best['images_per_sec'],
+    }
+
+    print("\n✓ Fastest stable combination:")
+    for key, value in settings.items():
+        print(f"  {key}: {value}")
+    print("=" * 60 + "\n")
+
+    return {'settings': settings, 'trials': trials,
+            'cpu_count': os.cpu_count(), 'imgsz': imgsz, 'model': str(model_path)}
+
+
+def apply_thread_settings(settings):
+    """Apply tuned torch thread counts to the current process"""
+    import torch
+    torch.set_num_threads(settings['intra_op_threads'])
+    try:
+        torch.set_num_interop_threads(settings['inter_op_threads'])
+    except RuntimeError:
+        # Only settable before the first inter-op parallel region runs
+        print("⚠️  Could not change inter-op threads (already initialized)")
+
+
+def save_autotune_report(report, run_dir):
+    """Record the auto-tune result in the run directory"""
+    run_dir = Path(run_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    path = run_dir / 'autotune.yaml'
+    with open(path, 'w') as f:
+        yaml.safe_dump(report, f, sort_keys=False)
+    print(f"✓ Auto-tune results saved to: {path}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Auto-tune CPU training settings for YOLOv10 on BRSSD',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Tune the nano model and print the best settings
+  python autotune_brssd.py --model n
+
+  # Tune and record the result in a run directory
+  python autotune_brssd.py --model s --save-dir runs/brssd/YOLOv10s_BRSSD
+        """
+    )
+    parser.add_argument('--model', choices=['n', 's', 'm', 'l', 'x'], default='n',
+                        help='Model size: n(nano), s(small), m(medium), l(large), x(xlarge)')
+    parser.add_argument('--batch', type=int, default=16, help='Largest batch size to try')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed steps per candidate')
+    parser.add_argument('--save-dir', type=str, default=None,
+                        help='Directory to write autotune.yaml into')
+    args = parser.parse_args()
+
+    try:
+        report = autotune_cpu(f'yolov10{args.model}.pt', args.data, imgsz=args.imgsz,
+                              batch=args.batch, iterations=args.iterations)
+    except Exception as e:
+        print(f"\n✗ Auto-tuning failed: {e}")
+        return 1
+
+    if args.save_dir:
+        save_autotune_report(report, args.save_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Batched Photometric Augmentation for YOLO Datasets
+Applies brightness/contrast and gamma as per-image lookup tables and
+horizontal flips to stacks of same-size images in NumPy, falling back to
+per-image albumentations only for geometric ops such as Rotate
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+
+class BatchPhotometric:
+    """
+    Vectorized equivalent of
+        A.RandomBrightnessContrast(p) -> A.HorizontalFlip(p) -> A.RandomGamma(p)
+    for uint8 image batches of shape (N, H, W, C).
+
+    Brightness/contrast and gamma are both per-pixel maps, so they are
+    folded into one 256-entry table per image (same rounding as the
+    albumentations uint8 path) and applied with a single gather.
+    """
+
+    def __init__(self, brightness_limit=0.2, contrast_limit=0.2, p_brightness_contrast=0.5,
+                 gamma_limit=(80, 120), p_gamma=0.3, p_flip=0.5, seed=None):
+        self.brightness_limit = brightness_limit
+        self.contrast_limit = contrast_limit
+        self.p_brightness_contrast = p_brightness_contrast
+        self.gamma_limit = gamma_limit
+        self.p_gamma = p_gamma
+        self.p_flip = p_flip
+        self.rng = np.random.default_rng(seed)
+
+    def luts(self, n):
+        """(n, 256) uint8 tables: brightness/contrast followed by gamma, drawn per image"""
+        rng = self.rng
+        alpha = np.ones(n, dtype=np.float32)
+        beta = np.zeros(n, dtype=np.float32)
+        bc = rng.random(n) < self.p_brightness_contrast
+        alpha[bc] = 1 + rng.uniform(-self.contrast_limit, self.contrast_limit, bc.sum())
+        beta[bc] = rng.uniform(-self.brightness_limit, self.brightness_limit, bc.sum())
+        levels = np.arange(256, dtype=np.float32)
+        bc_lut = np.clip(levels * alpha[:, None] + beta[:, None] * 255, 0, 255).astype(np.uint8)
+
+        gamma = np.ones(n, dtype=np.float32)
+        g = rng.random(n) < self.p_gamma
+        gamma[g] = rng.uniform(self.gamma_limit[0], self.gamma_limit[1], g.sum()) / 100
+        gamma_lut = (np.power(levels / 255, gamma[:, None]) * 255).astype(np.uint8)
+        return np.take_along_axis(gamma_lut, bc_lut.astype(np.intp), axis=1)
+
+    def __call__(self, images, boxes):
+        """
+        Augment a batch; returns (new images, new boxes).
+
+        boxes is a list with one (k, 4) array of normalized xywh per image;
+        flipped images get x_center -> 1 - x_center.
+        """
+        n = len(images)
+        luts = self.luts(n)
+        # One gather over the flattened tables: image i reads row i via an index offset
+        offsets = (np.arange(n, dtype=np.uint32) * 256).reshape((n,) + (1,) * (images.ndim - 1))
+        out = luts.ravel()[images.astype(np.uint32) + offsets]
+
+        flip = self.rng.random(n) < self.p_flip
+        out[flip] = out[flip][:, :, ::-1]
+
+        counts = [len(b) for b in boxes]
+        flat = np.concatenate([np.asarray(b, dtype=np.float32).reshape(-1, 4) for b in boxes]) \
+            if boxes else np.zeros((0, 4), np.float32)
+        owner = np.repeat(np.arange(n), counts)
+        flat[flip[owner], 0] = 1 - flat[flip[owner], 0]
+        return out, np.split(flat, np.cumsum(counts)[:-1])
+
+
+def _augment_group(group, engine, num_augment, geometric):
+    images = np.stack([sample[1] for sample in group])
+    boxes = [sample[2] for sample in group]
+    for i in range(num_augment):
+        out, out_boxes = engine(images, boxes)
+        for (name, _, _, classes, allow_geometric), img, bb in zip(group, out, out_boxes):
+            classes = list(classes)
+            if geometric is not None and allow_geometric:
+                result = geometric(image=img, bboxes=bb.tolist(), class_labels=classes)
+                img, classes = result['image'], list(result['class_labels'])
+                bb = np.asarray(result['bboxes'], dtype=np.float32).reshape(-1, 4)
+            yield name, i, img, bb, classes
+
+
+def augment_samples(samples, engine, num_augment=2, geometric=None, batch_size=64, max_pending=None):
+    """
+    Yield (name, i, image, boxes, classes) for i in range(num_augment) per sample.
+
+    samples are (name, image, (k, 4) boxes, classes, allow_geometric).
+    Images of the same shape are stacked into batches of batch_size for
+    the photometric engine; `geometric` (an albumentations Compose with
+    YOLO bbox params, e.g. Rotate) then runs per image where allowed.
+    At most max_pending images wait for their batch to fill.
+    """
+    max_pending = max_pending or 4 * batch_size
+    groups = {}
+    pending = 0
+    for sample in samples:
+        group = groups.setdefault(sample[1].shape, [])
+        group.append(sample)
+        pending += 1
+        if len(group) == batch_size or pending >= max_pending:
+            shape = sample[1].shape if len(group) == batch_size else max(groups, key=lambda s: len(groups[s]))
+            flushed = groups.pop(shape)
+            pending -= len(flushed)
+            yield from _augment_group(flushed, engine, num_augment, geometric)
+    for group in groups.values():
+        yield from _augment_group(group, engine, num_augment, geometric)
+
+
+def load_samples(images_dir, labels_dir, limit=None):
+    """(name, BGR image, boxes, classes, True) for labeled images of a folder"""
+    import cv2
+
+    names = sorted(n for n in os.listdir(labels_dir) if n.endswith('.txt'))[:limit]
+    for name in names:
+        stem = name[:-4]
+        img = cv2.imread(os.path.join(images_dir, f"{stem}.jpg"))
+        if img is None:
+            continue
+        with open(os.path.join(labels_dir, name)) as f:
+            rows = [line.split() for line in f if len(line.split()) == 5]
+        boxes = np.array([[float(v) for v in r[1:]] for r in rows], dtype=np.float32).reshape(-1, 4)
+        yield stem, img, boxes, [r[0] for r in rows], True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark batched photometric augmentation against per-image albumentations',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 500 validation images, two augmented copies each
+  python batch_augment.py --images BRSSD/valid/images --labels BRSSD/valid/labels --limit 500
+
+  # Larger batches for big, same-size images
+  python batch_augment.py --images BRSSD/train/images --labels BRSSD/train/labels --batch 128
+        """
+    )
+    parser.add_argument('--images', required=True, help='Images folder')
+    parser.add_argument('--labels', required=True, help='Labels folder')
+    parser.add_argument('--limit', type=int, default=500, help='Number of labeled images')
+    parser.add_argument('--copies', type=int, default=2, help='Augmented copies per image')
+    parser.add_argument('--batch', type=int, default=64, help='Images per batch')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.images) or not os.path.isdir(args.labels):
+        print(f"✗ Folder not found: {args.images if not os.path.isdir(args.images) else args.labels}")
+        return 1
+
+    samples = list(load_samples(args.images, args.labels, args.limit))
+    if not samples:
+        print("✗ No labeled .jpg images found")
+        return 1
+    outputs = len(samples) * args.copies
+
+    timings = {}
+    try:
+        import albumentations as A
+        transform = A.Compose([
+            A.RandomBrightnessContrast(p=0.5),
+            A.HorizontalFlip(p=0.5),
+            A.RandomGamma(p=0.3),
+        ], bbox_params=A.BboxParams(format='yolo', label_fields=['class_labels']))
+        start = time.perf_counter()
+        for _, img, boxes, classes, _ in samples:
+            for _ in range(args.copies):
+                transform(image=img, bboxes=boxes.tolist(), class_labels=classes)
+        timings['albumentations per image'] = time.perf_counter() - start
+    except ImportError:
+        print("⚠️  albumentations not installed; timing the batched engine only")
+
+    start = time.perf_counter()
+    for _ in augment_samples(iter(samples), BatchPhotometric(seed=0), args.copies, batch_size=args.batch):
+        pass
+    timings['batched lookup tables'] = time.perf_counter() - start
+
+    print("\n" + "=" * 60)
+    print(f"PHOTOMETRIC AUGMENTATION: {len(samples)} images x {args.copies} copies")
+    print("=" * 60)
+    base = next(iter(timings.values()))
+    for name, seconds in timings.items():
+        print(f"  {name:<26} {seconds:>7.2f}s  {outputs / seconds:>8.1f} images/s  x{base / seconds:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
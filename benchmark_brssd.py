@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark YOLOv10 Checkpoints on BRSSD
+Reports parameters, FLOPs, CPU latency and validation mAP for one or
+more trained models
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+
+def load_detection_model(weights):
+    """Load the underlying torch module of a checkpoint (or pass a module through)"""
+    if hasattr(weights, 'forward'):
+        return weights
+    from ultralytics import YOLO
+    return YOLO(str(weights)).model
+
+
+def count_parameters(model):
+    """Number of parameters in a torch module"""
+    return sum(p.numel() for p in model.parameters())
+
+
+def count_gflops(model, imgsz=640):
+    """Forward-pass GFLOPs at the given image size (0 if it cannot be measured)"""
+    try:
+        from ultralytics.utils.torch_utils import get_flops
+        return round(get_flops(model, imgsz), 2)
+    except Exception:
+        return 0.0
+
+
+def measure_cpu_latency(weights, imgsz=640, runs=50, warmup=10, threads=None):
+    """Median and p90 single-image CPU latency in milliseconds"""
+    import copy
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    model = copy.deepcopy(load_detection_model(weights)).float().cpu().eval()
+    if hasattr(model, 'fuse'):
+        model = model.fuse(verbose=False)
+    x = torch.zeros(1, 3, imgsz, imgsz)
+
+    times = []
+    with torch.inference_mode():
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            model(x)
+            if i >= warmup:
+                times.append((time.perf_counter() - start) * 1000)
+
+    times.sort()
+    return {
+        'latency_ms': round(times[len(times) // 2], 2),
+        'latency_p90_ms': round(times[min(len(times) - 1, int(len(times) * 0.9))], 2),
+        'threads': torch.get_num_threads(),
+    }
+
+
+def evaluate_weights(weights, data_yaml='brssd_data.yaml', imgsz=640, device='cpu', batch=16):
+    """Validation metrics of a checkpoint"""
+    from ultralytics import YOLO
+    metrics = YOLO(str(weights)).val(data=data_yaml, imgsz=imgsz, device=device, batch=batch,
+                                     plots=False, verbose=False)
+    box = metrics.box
+    return {
+        'map50': round(float(box.map50), 5),
+        'map50_95': round(float(box.map), 5),
+        'precision': round(float(box.mp), 5),
+        'recall': round(float(box.mr), 5),
+    }
+
+
+def benchmark(weights, data_yaml='brssd_data.yaml', imgsz=640, runs=50, device='cpu', skip_val=False):
+    """Size, speed and accuracy of one checkpoint"""
+    model = load_detection_model(weights)
+    result = {
+        'weights': str(weights),
+        'params': count_parameters(model),
+        'gflops': count_gflops(model, imgsz),
+        'imgsz': imgsz,
+    }
+    result.update(measure_cpu_latency(model, imgsz=imgsz, runs=runs))
+    if not skip_val:
+        result.update(evaluate_weights(weights, data_yaml, imgsz=imgsz, device=device))
+    return result
+
+
+def print_comparison(results, title="Model Comparison"):
+    """Print a side-by-side table of benchmark results"""
+    print("\n" + "=" * 80)
+    print(title)
+    print("=" * 80)
+    print(f"{'Model':<32} {'Params':>10} {'GFLOPs':>8} {'CPU ms':>8} {'mAP50':>8} {'mAP50-95':>9}")
+    print(f"{'-'*32} {'-'*10} {'-'*8} {'-'*8} {'-'*8} {'-'*9}")
+    for label, r in results.items():
+        map50 = f"{r['map50']:.4f}" if 'map50' in r else '-'
+        map5095 = f"{r['map50_95']:.4f}" if 'map50_95' in r else '-'
+        print(f"{label:<32} {r['params'] / 1e6:>9.2f}M {r['gflops']:>8.2f} "
+              f"{r['latency_ms']:>8.2f} {map50:>8} {map5095:>9}")
+    print("=" * 80 + "\n")
+
+
+def run_dir_of(weights):
+    """runs/brssd/<name>/weights/best.pt -> runs/brssd/<name>, else None"""
+    weights = Path(weights)
+    return weights.parent.parent if weights.parent.name == 'weights' else None
+
+
+def save_benchmark(result, run_dir):
+    """Store a benchmark result as benchmark.json inside a run directory"""
+    path = Path(run_dir) / 'benchmark.json'
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark YOLOv10 checkpoints (size, CPU latency, mAP)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compare a distilled nano model with a plain-trained one
+  python benchmark_brssd.py runs/brssd/YOLOv10n_distill/weights/best.pt \\
+                            runs/brssd/YOLOv10n_BRSSD/weights/best.pt
+
+  # Latency only, at 416 px
+  python benchmark_brssd.py yolov10n.pt yolov10s.pt --imgsz 416 --no-val
+        """
+    )
+    parser.add_argument('weights', nargs='+', help='Checkpoint files to benchmark')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--runs', type=int, default=50, help='Timed forward passes per model')
+    parser.add_argument('--device', type=str, default='cpu', help='Device for validation')
+    parser.add_argument('--no-val', action='store_true', help='Skip mAP evaluation')
+    parser.add_argument('--save', type=str, default=None, help='Write all results to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    for weights in args.weights:
+        if not Path(weights).exists():
+            print(f"✗ Checkpoint not found: {weights}")
+            return 1
+        print(f"Benchmarking {weights}...")
+        results[weights] = benchmark(weights, args.data, imgsz=args.imgsz, runs=args.runs,
+                                     device=args.device, skip_val=args.no_val)
+        run_dir = run_dir_of(weights)
+        if run_dir is not None:
+            save_benchmark(results[weights], run_dir)
+
+    print_comparison(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results saved to: {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Parallel Image Integrity Scanner for YOLO Datasets
+Finds corrupt and truncated images before training, moves them and their
+labels to a quarantine folder, and records results in the dataset manifest
+so unchanged images are never scanned twice
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from dataset_manifest import DatasetManifest
+from image_probe import image_size
+
+# Bytes searched for the JPEG end-of-image marker; motion photos and maker
+# trailers append data after it
+EOI_WINDOW = 64 * 1024
+
+
+def check_fast(path):
+    """(status, error) from the header and end-of-file marker only"""
+    if image_size(path) is None:
+        return 'corrupt', 'unreadable header'
+    with open(path, 'rb') as f:
+        head = f.read(2)
+        f.seek(-min(EOI_WINDOW, os.fstat(f.fileno()).st_size), os.SEEK_END)
+        tail = f.read()
+    if head == b'\xff\xd8' and b'\xff\xd9' not in tail:
+        return 'truncated', 'missing JPEG EOI marker'
+    if head == b'\x89P' and tail[-8:-4] != b'IEND':
+        return 'truncated', 'missing PNG IEND chunk'
+    return 'ok', None
+
+
+def check_full(path):
+    """(status, error) after decoding every pixel; data after the image end is allowed"""
+    from PIL import Image, ImageFile
+    ImageFile.LOAD_TRUNCATED_IMAGES = False
+
+    if image_size(path) is None:
+        return 'corrupt', 'unreadable header'
+    try:
+        with Image.open(path) as img:
+            img.load()
+    except Exception as e:
+        return 'corrupt', str(e) or type(e).__name__
+    return 'ok', None
+
+
+def _check_task(task):
+    split, stem, path, size, mtime, mode = task
+    try:
+        status, error = (check_full if mode == 'full' else check_fast)(path)
+    except OSError as e:
+        status, error = 'corrupt', str(e)
+    return split, stem, size, mtime, mode, status, error
+
+
+def quarantine(manifest, split, stem, quarantine_dir):
+    """Move an image and its label into quarantine_dir/<split>/{images,labels}/"""
+    images_dir, labels_dir = manifest.dirs[split]
+    row = manifest.conn.execute("SELECT name FROM images WHERE split = ? AND stem = ?", (split, stem)).fetchone()
+    moved = []
+    for src, kind in ((images_dir / row[0], 'images'), (labels_dir / f"{stem}.txt", 'labels')):
+        if src.exists():
+            dst_dir = Path(quarantine_dir) / split / kind
+            dst_dir.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(src), str(dst_dir / src.name))
+            moved.append(src.name)
+    manifest.forget(split, stem)
+    return moved
+
+
+def check_images(manifest, mode='full', workers=None, quarantine_dir=None):
+    """
+    Scan every image of the manifest that has no up-to-date result.
+
+    Full mode decodes images in a process pool; fast mode only checks
+    headers and end markers in a thread pool. Bad images are quarantined
+    together with their labels when quarantine_dir is given.
+    """
+    start = time.perf_counter()
+    manifest.refresh()
+    todo = manifest.images_to_check(mode)
+    tasks = [(split, stem, str(path), size, mtime, mode) for split, stem, path, size, mtime in todo]
+
+    executor = ProcessPoolExecutor if mode == 'full' else ThreadPoolExecutor
+    if tasks:
+        batch = []
+        with executor(max_workers=workers or os.cpu_count()) as pool:
+            for done, result in enumerate(pool.map(_check_task, tasks, chunksize=32), 1):
+                batch.append(result)
+                if len(batch) == 1000:
+                    # Saved as we go, so an interrupted scan resumes where it stopped
+                    manifest.record_integrity(batch)
+                    batch = []
+                    print(f"  Checked {done}/{len(tasks)} images...")
+        manifest.record_integrity(batch)
+
+    bad = manifest.bad_images()
+    quarantined = []
+    if quarantine_dir:
+        for split, stem, status, error in bad:
+            quarantine(manifest, split, stem, quarantine_dir)
+            quarantined.append((split, stem))
+        manifest.conn.commit()
+    return {'scanned': len(tasks), 'bad': bad, 'quarantined': quarantined,
+            'seconds': round(time.perf_counter() - start, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Detect corrupt or truncated dataset images in parallel',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Decode every image once; later runs only scan new or changed files
+  python check_images.py --data brssd_data.yaml
+
+  # Header and EOI check only, moving bad images and labels aside
+  python check_images.py --data brssd_data.yaml --fast --quarantine BRSSD/quarantine
+
+  # Folders without a data YAML (manifest stored next to the images folder)
+  python check_images.py --images DATASIGNALISATION/train/images --labels DATASIGNALISATION/train/labels
+        """
+    )
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--images', type=str, default=None, help='Images folder (instead of --data)')
+    parser.add_argument('--labels', type=str, default=None, help='Labels folder for --images')
+    parser.add_argument('--fast', action='store_true', help='Check headers and end markers without decoding')
+    parser.add_argument('--quarantine', type=str, default=None, help='Move bad images and labels here')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel workers (default: all cores)')
+    args = parser.parse_args()
+
+    if args.images:
+        images = Path(args.images)
+        labels = Path(args.labels) if args.labels else Path(str(images).replace('/images', '/labels'))
+        if not images.is_dir():
+            print(f"✗ Images folder not found: {images}")
+            return 1
+        manifest = DatasetManifest(path=images.parent / 'manifest.db', dirs={images.parent.name: (images, labels)})
+    else:
+        if not Path(args.data).exists():
+            print(f"✗ Configuration file not found: {args.data}")
+            return 1
+        try:
+            manifest = DatasetManifest(args.data)
+        except FileNotFoundError as e:
+            print(f"✗ {e}")
+            return 1
+
+    mode = 'fast' if args.fast else 'full'
+    print(f"Checking images ({mode} mode), manifest: {manifest.path}")
+    summary = check_images(manifest, mode=mode, workers=args.workers, quarantine_dir=args.quarantine)
+    manifest.close()
+
+    print("\n" + "=" * 60)
+    print("IMAGE INTEGRITY")
+    print("=" * 60)
+    print(f"  Scanned: {summary['scanned']} images in {summary['seconds']}s (others cached)")
+    if not summary['bad']:
+        print("  ✓ No corrupt or truncated images")
+    for split, stem, status, error in summary['bad']:
+        print(f"  ✗ [{split}] {stem}: {status} ({error})")
+    if summary['quarantined']:
+        print(f"\n✓ Quarantined {len(summary['quarantined'])} images with their labels in {args.quarantine}")
+    elif summary['bad']:
+        print("\n  Use --quarantine DIR to move them (and their labels) out of the dataset")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
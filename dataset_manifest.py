@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Cached Dataset Manifest for YOLO Datasets
+Records size, mtime, content hash, header dimensions and label box count
+of every image in a SQLite file next to the data YAML; refreshes only
+re-read entries whose size or mtime changed
+"""
+
+import os
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+
+from image_probe import image_size
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+SPLITS = ('train', 'val', 'test')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    split TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    PRIMARY KEY (split, stem)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    split TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    boxes INTEGER NOT NULL,
+    bad_lines INTEGER NOT NULL,
+    PRIMARY KEY (split, stem)
+);
+CREATE TABLE IF NOT EXISTS integrity (
+    split TEXT NOT NULL,
+    stem TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (split, stem)
+);
+"""
+
+
+def manifest_path(data_yaml):
+    """Manifest file of a data YAML (brssd_data.yaml -> brssd_data.manifest.db)"""
+    data_yaml = Path(data_yaml)
+    return data_yaml.with_name(f"{data_yaml.stem}.manifest.db")
+
+
+def split_dirs(data_yaml):
+    """
+    {split: (images dir, labels dir)} for the splits named in the data YAML.
+
+    Without a `path` key the root is the YAML's folder, and "../x" splits
+    that do not exist fall back to "x" under the root, as in Ultralytics
+    (Roboflow exports). Raises FileNotFoundError for a missing split folder.
+    """
+    with open(data_yaml) as f:
+        config = yaml.safe_load(f)
+    parent = Path(data_yaml).parent
+    root = Path(config['path']) if config.get('path') else parent
+    if not root.is_absolute() and not root.exists():
+        root = parent / root
+    dirs = {}
+    for split in SPLITS:
+        if not config.get(split):
+            continue
+        images = root / config[split]
+        if not images.is_dir() and config[split].startswith('../'):
+            images = root / config[split][3:]
+        if not images.is_dir():
+            raise FileNotFoundError(f"{split} images folder of {data_yaml} not found: {images}")
+        dirs[split] = (images, Path(str(images).replace('/images', '/labels')))
+    return dirs
+
+
+def scan(directory, extensions):
+    """{stem: (name, path, size, mtime_ns)} from one os.scandir pass"""
+    entries = {}
+    if not os.path.isdir(directory):
+        return entries
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.lower().endswith(extensions) and entry.is_file():
+                st = entry.stat()
+                entries[os.path.splitext(entry.name)[0]] = (entry.name, entry.path, st.st_size, st.st_mtime_ns)
+    return entries
+
+
+def read_image_entry(path):
+    """Content hash and header dimensions of one image"""
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    size = image_size(path)
+    return digest, size
+
+
+def count_boxes(path):
+    """(valid box rows, malformed rows) of one label file"""
+    boxes = bad = 0
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if len(parts) == 5:
+                boxes += 1
+            else:
+                bad += 1
+    return boxes, bad
+
+
+class DatasetManifest:
+    """Per-image and per-label records of a dataset, kept in SQLite"""
+
+    def __init__(self, data_yaml=None, path=None, dirs=None):
+        if dirs is None:
+            dirs = split_dirs(data_yaml)
+        elif path is None:
+            raise ValueError("path is required when dirs are given without a data YAML")
+        self.dirs = {split: (Path(images), Path(labels)) for split, (images, labels) in dirs.items()}
+        self.path = Path(path) if path else manifest_path(data_yaml)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+
+    def refresh(self, workers=16):
+        """Scan every split in parallel and re-read only new or changed files"""
+        jobs = [(split, table, directory, IMAGE_EXTENSIONS if table == 'images' else ('.txt',))
+                for split, dirs in self.dirs.items() for table, directory in zip(('images', 'labels'), dirs)]
+        counts = {'images': 0, 'labels': 0, 'removed': 0}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            listings = list(pool.map(lambda job: scan(job[2], job[3]), jobs))
+            for (split, table, _, _), listing in zip(jobs, listings):
+                updated, removed = self._refresh_table(pool, table, split, listing)
+                counts[table] += updated
+                counts['removed'] += removed
+        self.conn.commit()
+        return counts
+
+    def _refresh_table(self, pool, table, split, listing):
+        known = {stem: (size, mtime) for stem, size, mtime in self.conn.execute(
+            f"SELECT stem, size, mtime_ns FROM {table} WHERE split = ?", (split,))}
+        changed = [(stem, entry) for stem, entry in listing.items() if known.get(stem) != entry[2:]]
+        reader = read_image_entry if table == 'images' else count_boxes
+        rows = []
+        for (stem, (name, path, size, mtime)), result in zip(changed, pool.map(lambda c: reader(c[1][1]), changed)):
+            if table == 'images':
+                digest, dims = result
+                rows.append((split, stem, name, size, mtime, digest) + (tuple(dims) if dims else (None, None)))
+            else:
+                rows.append((split, stem, size, mtime) + result)
+        placeholders = ', '.join('?' * (8 if table == 'images' else 6))
+        self.conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+        removed = [(split, stem) for stem in known if stem not in listing]
+        self.conn.executemany(f"DELETE FROM {table} WHERE split = ? AND stem = ?", removed)
+        return len(rows), len(removed)
+
+    def images_to_check(self, mode='full'):
+        """
+        [(split, stem, path, size, mtime_ns)] of images without a current integrity result.
+
+        A full-decode result also satisfies a fast check, but not the reverse.
+        """
+        modes = ('full',) if mode == 'full' else ('full', 'fast')
+        rows = self.conn.execute(
+            "SELECT i.split, i.stem, i.name, i.size, i.mtime_ns FROM images i LEFT JOIN integrity c "
+            "ON c.split = i.split AND c.stem = i.stem AND c.size = i.size AND c.mtime_ns = i.mtime_ns "
+            f"AND c.mode IN ({', '.join('?' * len(modes))}) WHERE c.stem IS NULL", modes)
+        return [(split, stem, self.dirs[split][0] / name, size, mtime)
+                for split, stem, name, size, mtime in rows if split in self.dirs]
+
+    def record_integrity(self, rows):
+        """Store (split, stem, size, mtime_ns, mode, status, error) scan results"""
+        self.conn.executemany("INSERT OR REPLACE INTO integrity VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def bad_images(self):
+        """[(split, stem, status, error)] of current images whose last scan failed"""
+        return self.conn.execute(
+            "SELECT c.split, c.stem, c.status, c.error FROM integrity c JOIN images i "
+            "ON c.split = i.split AND c.stem = i.stem AND c.size = i.size AND c.mtime_ns = i.mtime_ns "
+            "WHERE c.status != 'ok' ORDER BY c.split, c.stem").fetchall()
+
+    def forget(self, split, stem):
+        """Drop every record of an image and its label (e.g. after quarantining them)"""
+        for table in ('images', 'labels', 'integrity'):
+            self.conn.execute(f"DELETE FROM {table} WHERE split = ? AND stem = ?", (split, stem))
+
+    def summary(self):
+        """{split: integrity counts} computed from the manifest alone"""
+        q = self.conn.execute
+        report = {}
+        for split in self.dirs:
+            report[split] = {
+                'images': q("SELECT COUNT(*) FROM images WHERE split = ?", (split,)).fetchone()[0],
+                'labels': q("SELECT COUNT(*) FROM labels WHERE split = ?", (split,)).fetchone()[0],
+                'boxes': q("SELECT COALESCE(SUM(boxes), 0) FROM labels WHERE split = ?", (split,)).fetchone()[0],
+                'unlabeled_images': q("SELECT COUNT(*) FROM images i WHERE split = ? AND NOT EXISTS "
+                                      "(SELECT 1 FROM labels l WHERE l.split = i.split AND l.stem = i.stem)",
+                                      (split,)).fetchone()[0],
+                'orphan_labels': q("SELECT COUNT(*) FROM labels l WHERE split = ? AND NOT EXISTS "
+                                   "(SELECT 1 FROM images i WHERE i.split = l.split AND i.stem = l.stem)",
+                                   (split,)).fetchone()[0],
+                'empty_labels': q("SELECT COUNT(*) FROM labels WHERE split = ? AND boxes = 0",
+                                  (split,)).fetchone()[0],
+                'bad_label_lines': q("SELECT COALESCE(SUM(bad_lines), 0) FROM labels WHERE split = ?",
+                                     (split,)).fetchone()[0],
+                'unknown_size': q("SELECT COUNT(*) FROM images WHERE split = ? AND width IS NULL",
+                                  (split,)).fetchone()[0],
+                'corrupt': q("SELECT COUNT(*) FROM integrity c JOIN images i ON c.split = i.split "
+                             "AND c.stem = i.stem AND c.size = i.size AND c.mtime_ns = i.mtime_ns "
+                             "WHERE c.split = ? AND c.status != 'ok'", (split,)).fetchone()[0],
+                'duplicates': q("SELECT COALESCE(SUM(n - 1), 0) FROM (SELECT COUNT(*) AS n FROM images "
+                                "WHERE split = ? GROUP BY sha256)", (split,)).fetchone()[0],
+            }
+        report['cross_split_duplicates'] = q(
+            "SELECT COUNT(*) FROM (SELECT sha256 FROM images GROUP BY sha256 "
+            "HAVING COUNT(DISTINCT split) > 1)").fetchone()[0]
+        return report
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def print_summary(report):
+    """Print manifest integrity counts per split"""
+    for split, r in report.items():
+        if split == 'cross_split_duplicates':
+            continue
+        print(f"  {split}: {r['images']} images, {r['labels']} labels, {r['boxes']} boxes")
+        problems = [(k, r[k]) for k in ('unlabeled_images', 'orphan_labels', 'empty_labels',
+                                         'bad_label_lines', 'unknown_size', 'corrupt', 'duplicates') if r[k]]
+        for key, n in problems:
+            print(f"    ⚠️  {key.replace('_', ' ')}: {n}")
+    if report['cross_split_duplicates']:
+        print(f"  ⚠️  Identical images in more than one split: {report['cross_split_duplicates']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build or refresh the manifest of a YOLO dataset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # First run hashes every image; later runs only touch changed files
+  python dataset_manifest.py --data brssd_data.yaml
+
+  # Rebuild from scratch
+  python dataset_manifest.py --data brssd_data.yaml --rebuild
+        """
+    )
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--workers', type=int, default=16, help='I/O threads')
+    parser.add_argument('--rebuild', action='store_true', help='Discard the existing manifest first')
+    args = parser.parse_args()
+
+    if not Path(args.data).exists():
+        print(f"✗ Configuration file not found: {args.data}")
+        return 1
+    if args.rebuild and manifest_path(args.data).exists():
+        manifest_path(args.data).unlink()
+
+    start = time.perf_counter()
+    try:
+        manifest = DatasetManifest(args.data)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        return 1
+    counts = manifest.refresh(workers=args.workers)
+    report = manifest.summary()
+    manifest.close()
+
+    print(f"✓ Manifest {manifest.path}: {counts['images']} images and {counts['labels']} labels "
+          f"re-read, {counts['removed']} removed ({time.perf_counter() - start:.2f}s)")
+    print_summary(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
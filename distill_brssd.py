@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Knowledge Distillation for YOLOv10 on BRSSD
+Trains a small student (n/s) with the usual detection loss plus logit
+and feature distillation from a trained teacher (m/b)
+"""
+
+import csv
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+# Default loss gains, relative to the detection loss
+KD_LOGIT_WEIGHT = 1.0
+KD_FEATURE_WEIGHT = 1.0
+KD_TEMPERATURE = 2.0
+
+
+def head_outputs(preds):
+    """Per-level raw head maps (B, 4*reg_max + nc, H, W) from training-mode predictions"""
+    if isinstance(preds, tuple):
+        preds = preds[1]
+    if isinstance(preds, dict):
+        # YOLOv10: distil the one-to-many branch, which carries the dense signal
+        preds = preds['one2many']
+    return preds
+
+
+def load_teacher(weights, device):
+    """Load a frozen teacher that still returns raw head maps"""
+    from ultralytics import YOLO
+
+    teacher = YOLO(str(weights)).model.float().to(device)
+    # Training mode keeps the head returning raw maps; BatchNorm stays in
+    # eval mode so the teacher's running statistics never change
+    teacher.train()
+    for m in teacher.modules():
+        if isinstance(m, nn.modules.batchnorm._BatchNorm):
+            m.eval()
+    for p in teacher.parameters():
+        p.requires_grad = False
+    return teacher
+
+
+class FeatureTap:
+    """Capture the neck features fed into a model's detection head"""
+
+    def __init__(self, model):
+        self.features = None
+        self.handle = model.model[-1].register_forward_pre_hook(self._store)
+
+    def _store(self, module, args):
+        self.features = list(args[0])
+
+    def remove(self):
+        self.handle.remove()
+
+
+class DistillationLoss:
+    """Detection loss plus logit (cls + box distribution) and feature distillation"""
+
+    def __init__(self, base_criterion, teacher, student_tap, teacher_tap, adapters, reg_max,
+                 logit_weight=KD_LOGIT_WEIGHT, feature_weight=KD_FEATURE_WEIGHT,
+                 temperature=KD_TEMPERATURE):
+        self.base = base_criterion
+        self.teacher = teacher
+        self.student_tap = student_tap
+        self.teacher_tap = teacher_tap
+        self.adapters = adapters
+        self.reg_max = reg_max
+        self.logit_weight = logit_weight
+        self.feature_weight = feature_weight
+        self.temperature = temperature
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'logit': 0.0, 'feature': 0.0, 'steps': 0}
+
+    def logit_loss(self, student_maps, teacher_maps):
+        """Teacher-weighted KD on class scores and box distributions"""
+        T = self.temperature
+        nbox = 4 * self.reg_max
+        total = 0.0
+        for s, t in zip(student_maps, teacher_maps):
+            s_box, s_cls = s[:, :nbox].float(), s[:, nbox:].float()
+            t_box, t_cls = t[:, :nbox].float(), t[:, nbox:].float()
+
+            # Focus on locations the teacher believes contain a sign;
+            # background dominates the maps otherwise
+            t_prob = torch.sigmoid(t_cls / T)
+            weight = t_prob.max(1)[0]
+            norm = weight.sum().clamp(min=1.0)
+
+            cls_kd = F.binary_cross_entropy_with_logits(s_cls / T, t_prob, reduction='none').sum(1)
+
+            b, _, h, w = s_box.shape
+            s_dist = F.log_softmax(s_box.view(b, 4, self.reg_max, h, w) / T, dim=2)
+            t_dist = F.softmax(t_box.view(b, 4, self.reg_max, h, w) / T, dim=2)
+            box_kd = F.kl_div(s_dist, t_dist, reduction='none').sum((1, 2))
+
+            total = total + ((cls_kd + box_kd) * weight).sum() / norm * T * T
+        return total / len(student_maps)
+
+    def feature_loss(self, student_feats, teacher_feats):
+        """MSE between adapted student and teacher neck features (per-channel standardized)"""
+        total = 0.0
+        for adapter, s, t in zip(self.adapters, student_feats, teacher_feats):
+            s = adapter(s.float())
+            t = t.float()
+            s = (s - s.mean((2, 3), keepdim=True)) / (s.std((2, 3), keepdim=True) + 1e-6)
+            t = (t - t.mean((2, 3), keepdim=True)) / (t.std((2, 3), keepdim=True) + 1e-6)
+            total = total + F.mse_loss(s, t)
+        return total / len(self.adapters)
+
+    def __call__(self, preds, batch):
+        loss, loss_items = self.base(preds, batch)
+
+        with torch.no_grad():
+            teacher_preds = self.teacher(batch['img'])
+
+        kd_logit = self.logit_loss(head_outputs(preds), head_outputs(teacher_preds))
+        kd_feature = self.feature_loss(self.student_tap.features, self.teacher_tap.features)
+
+        self.stats['logit'] += float(kd_logit)
+        self.stats['feature'] += float(kd_feature)
+        self.stats['steps'] += 1
+
+        # The detection loss is scaled by batch size; match that scale
+        batch_size = batch['img'].shape[0]
+        kd = self.logit_weight * kd_logit + self.feature_weight * kd_feature
+        return loss + kd * batch_size, loss_items
+
+
+def setup_distillation(trainer, optimizer, teacher_weights, logit_weight, feature_weight, temperature):
+    """Attach the teacher, feature adapters and distillation loss to a trainer"""
+    from ultralytics.utils.torch_utils import de_parallel
+
+    student = de_parallel(trainer.model)
+    teacher = load_teacher(teacher_weights, trainer.device)
+
+    s_head, t_head = student.model[-1], teacher.model[-1]
+    if s_head.nc != t_head.nc or s_head.reg_max != t_head.reg_max:
+        raise ValueError(f"Teacher head (nc={t_head.nc}, reg_max={t_head.reg_max}) does not match "
+                         f"student head (nc={s_head.nc}, reg_max={s_head.reg_max})")
+
+    student_tap, teacher_tap = FeatureTap(student), FeatureTap(teacher)
+
+    # Probe the neck widths once to size the 1x1 adapters
+    was_training = student.training
+    student.eval()
+    with torch.no_grad():
+        probe = torch.zeros(1, 3, 64, 64, device=trainer.device)
+        student(probe)
+        teacher(probe)
+    student.train(was_training)
+    adapters = nn.ModuleList(
+        nn.Conv2d(s.shape[1], t.shape[1], kernel_size=1, bias=False)
+        for s, t in zip(student_tap.features, teacher_tap.features)
+    ).to(trainer.device)
+
+    # Adapters are trained alongside the student but are not part of the saved model.
+    # Adding them before the scheduler exists keeps warmup/LR schedule and
+    # optimizer-state resume working for the extra group
+    optimizer.add_param_group({'params': list(adapters.parameters()),
+                               'lr': optimizer.param_groups[0]['lr'], 'weight_decay': 0.0})
+
+    student.criterion = DistillationLoss(
+        student.init_criterion(), teacher, student_tap, teacher_tap, adapters, s_head.reg_max,
+        logit_weight=logit_weight, feature_weight=feature_weight, temperature=temperature,
+    )
+    print(f"✓ Distilling from {teacher_weights} "
+          f"(logit={logit_weight}, feature={feature_weight}, T={temperature})")
+
+
+def log_distillation(trainer):
+    """Append the epoch's mean distillation losses to distill.csv in the run directory"""
+    criterion = getattr(trainer.model, 'criterion', None)
+    if not isinstance(criterion, DistillationLoss) or criterion.stats['steps'] == 0:
+        return
+    steps = criterion.stats['steps']
+    row = {'epoch': trainer.epoch + 1,
+           'kd_logit': round(criterion.stats['logit'] / steps, 5),
+           'kd_feature': round(criterion.stats['feature'] / steps, 5)}
+    criterion.reset_stats()
+
+    path = Path(trainer.save_dir) / 'distill.csv'
+    new_file = not path.exists()
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(row))
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def make_distillation_trainer(teacher_weights, logit_weight=KD_LOGIT_WEIGHT,
+                              feature_weight=KD_FEATURE_WEIGHT, temperature=KD_TEMPERATURE):
+    """Build a DetectionTrainer subclass that distils from teacher_weights"""
+    from ultralytics.models.yolo.detect import DetectionTrainer
+
+    class DistillationTrainer(DetectionTrainer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.add_callback('on_train_epoch_end', log_distillation)
+
+        def build_optimizer(self, model, *args, **kwargs):
+            optimizer = super().build_optimizer(model, *args, **kwargs)
+            setup_distillation(self, optimizer, teacher_weights, logit_weight, feature_weight, temperature)
+            return optimizer
+
+    return DistillationTrainer
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Read-Ahead File Access for High-Latency Mounts (Google Drive FUSE)
+Prefetches upcoming files through a thread-pool window and stages writes
+locally before flushing them in the background, so throughput depends on
+bandwidth instead of per-file round trips. Paths inside zip archives
+(data.zip/valid/labels/x.txt) are read in place, without extraction
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import zipfile
+import argparse
+import contextlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LocalFileSystem:
+    """Plain local (or FUSE-mounted) file access"""
+
+    def __init__(self):
+        self._made_dirs = set()
+        self._lock = threading.Lock()
+
+    def read_bytes(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def write_bytes(self, path, data):
+        parent = os.path.dirname(path)
+        if parent and parent not in self._made_dirs:
+            os.makedirs(parent, exist_ok=True)
+            with self._lock:
+                self._made_dirs.add(parent)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def listdir(self, path):
+        with os.scandir(path) as it:
+            return [entry.name for entry in it]
+
+    def entries(self, path):
+        """[(name, size, mtime_ns)] of the files directly inside a folder"""
+        with os.scandir(path) as it:
+            return [(e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in it if e.is_file()]
+
+    def isdir(self, path):
+        return os.path.isdir(path)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+
+def split_archive(path):
+    """('data.zip', 'valid/labels') for a path inside a zip file, (None, path) otherwise"""
+    text = str(path).replace(os.sep, '/')
+    start = 0
+    while True:
+        i = text.lower().find('.zip', start)
+        if i < 0:
+            return None, path
+        end = i + 4
+        if (end == len(text) or text[end] == '/') and os.path.isfile(text[:end]):
+            return text[:end], text[end:].strip('/')
+        start = end
+
+
+def is_archive_path(path):
+    return split_archive(path)[0] is not None
+
+
+class ArchiveFileSystem(LocalFileSystem):
+    """
+    Local file access that also reads members of zip archives by path.
+
+    Archives are opened lazily and once per process (ZipFile handles are
+    not shared across fork), and their member tables are cached, so
+    listing a folder inside an archive needs no I/O after the first call.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._zips = {}
+        self._pid = os.getpid()
+
+    def _archive(self, archive):
+        if self._pid != os.getpid():
+            self._zips, self._pid = {}, os.getpid()
+        entry = self._zips.get(archive)
+        if entry is None:
+            with self._lock:
+                entry = self._zips.get(archive)
+                if entry is None:
+                    zf = zipfile.ZipFile(archive)
+                    members = {info.filename.rstrip('/'): info for info in zf.infolist()}
+                    entry = self._zips[archive] = (zf, members)
+        return entry
+
+    def _children(self, archive, inner):
+        """{name: ZipInfo or None (sub-folder)} directly inside a folder of an archive"""
+        _, members = self._archive(archive)
+        prefix = f"{inner}/" if inner else ''
+        children = {}
+        for member, info in members.items():
+            if not member.startswith(prefix) or member == inner:
+                continue
+            name, sep, _ = member[len(prefix):].partition('/')
+            if sep or info.is_dir():
+                children.setdefault(name, None)
+            else:
+                children[name] = info
+        return children
+
+    def read_bytes(self, path):
+        archive, inner = split_archive(path)
+        if archive is None:
+            return super().read_bytes(path)
+        zf, members = self._archive(archive)
+        if inner not in members:
+            raise FileNotFoundError(f"{inner} not in {archive}")
+        return zf.read(members[inner])
+
+    def write_bytes(self, path, data):
+        if is_archive_path(path):
+            raise OSError(f"Cannot write inside a zip archive: {path}")
+        super().write_bytes(path, data)
+
+    def listdir(self, path):
+        archive, inner = split_archive(path)
+        if archive is None:
+            return super().listdir(path)
+        return list(self._children(archive, inner))
+
+    def entries(self, path):
+        archive, inner = split_archive(path)
+        if archive is None:
+            return super().entries(path)
+        return [(name, info.file_size, int(time.mktime(info.date_time + (0, 0, -1)) * 1e9))
+                for name, info in self._children(archive, inner).items() if info is not None]
+
+    def isdir(self, path):
+        archive, inner = split_archive(path)
+        if archive is None:
+            return super().isdir(path)
+        _, members = self._archive(archive)
+        return not inner or (inner in members and members[inner].is_dir()) or \
+            any(m.startswith(inner + '/') for m in members)
+
+    def exists(self, path):
+        archive, inner = split_archive(path)
+        if archive is None:
+            return super().exists(path)
+        return inner in self._archive(archive)[1] or self.isdir(path)
+
+
+class LatencyFileSystem(LocalFileSystem):
+    """
+    Local stand-in for a network mount: every operation waits `latency`
+    seconds, and transfers are limited to `bandwidth` bytes per second
+    per operation if given.
+    """
+
+    def __init__(self, latency=0.05, bandwidth=None):
+        super().__init__()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.calls = 0
+
+    def _wait(self, nbytes=0):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency + (nbytes / self.bandwidth if self.bandwidth else 0))
+
+    def read_bytes(self, path):
+        data = super().read_bytes(path)
+        self._wait(len(data))
+        return data
+
+    def write_bytes(self, path, data):
+        self._wait(len(data))
+        super().write_bytes(path, data)
+
+    def listdir(self, path):
+        self._wait()
+        return super().listdir(path)
+
+
+def _read_or_none(fs, path):
+    try:
+        return fs.read_bytes(path)
+    except FileNotFoundError:
+        return None
+
+
+class ReadAhead:
+    """
+    Iterate (path, bytes) in the order of `paths` while up to `window`
+    later files are already being fetched. Missing files yield None.
+    """
+
+    def __init__(self, paths, fs=None, window=64, workers=16):
+        self.paths = paths
+        self.fs = fs or LocalFileSystem()
+        self.window = window
+        self.workers = workers
+
+    def __iter__(self):
+        paths = iter(self.paths)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for path in paths:
+                pending.append((path, pool.submit(_read_or_none, self.fs, path)))
+                if len(pending) >= self.window:
+                    break
+            while pending:
+                path, future = pending.popleft()
+                nxt = next(paths, None)
+                if nxt is not None:
+                    pending.append((nxt, pool.submit(_read_or_none, self.fs, nxt)))
+                yield path, future.result()
+
+
+class StagedWriter:
+    """
+    Write files through a local staging folder.
+
+    write() returns once the data is on local disk; background threads
+    then copy staged files to their destination. At most `max_pending`
+    files wait in staging, which bounds local disk use. close() waits for
+    every upload and raises if any failed.
+    """
+
+    def __init__(self, fs=None, workers=16, max_pending=256, staging_dir=None):
+        self.fs = fs or LocalFileSystem()
+        self.staging_dir = tempfile.mkdtemp(prefix='drive_io_', dir=staging_dir)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.futures = []
+        self.errors = []
+        self.count = 0
+
+    def _upload(self, staged, path):
+        try:
+            with open(staged, 'rb') as f:
+                self.fs.write_bytes(path, f.read())
+        except Exception as e:
+            self.errors.append(f"{path}: {e}")
+        finally:
+            # A leftover staged file is removed with the staging folder in close()
+            with contextlib.suppress(OSError):
+                os.remove(staged)
+            self.slots.release()
+
+    def write(self, path, data):
+        self.slots.acquire()
+        staged = os.path.join(self.staging_dir, str(self.count))
+        self.count += 1
+        try:
+            with open(staged, 'wb') as f:
+                f.write(data)
+        except BaseException:
+            self.slots.release()
+            raise
+        self.futures.append(self.pool.submit(self._upload, staged, path))
+        if len(self.futures) > 4096:
+            # Finished futures are dropped, so keep anything they raised
+            done = [f for f in self.futures if f.done()]
+            self.errors += [f"{f.exception()}" for f in done if f.exception()]
+            self.futures = [f for f in self.futures if not f.done()]
+
+    def close(self):
+        for future in self.futures:
+            future.result()
+        self.pool.shutdown()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        if self.errors:
+            raise OSError(f"{len(self.errors)} staged writes failed, first: {self.errors[0]}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def copy_many(pairs, fs=None, window=64, workers=16):
+    """Copy (src, dst) pairs with read-ahead on the sources and staged writes; returns files copied"""
+    fs = fs or LocalFileSystem()
+    pairs = list(pairs)
+    copied = 0
+    with StagedWriter(fs, workers=workers) as writer:
+        reads = ReadAhead([src for src, _ in pairs], fs, window=window, workers=workers)
+        for (_, dst), (_, data) in zip(pairs, reads):
+            if data is not None:
+                writer.write(dst, data)
+                copied += 1
+    return copied
+
+
+def read_texts(paths, fs=None, window=64, workers=16):
+    """{path: text} for many small text files (e.g. labels), prefetched in parallel"""
+    return {path: data.decode() for path, data in ReadAhead(paths, fs, window, workers) if data is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark read-ahead and staged writes against a simulated high-latency mount',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 200 files of 50 KB behind 50 ms of latency per operation
+  python drive_io.py --files 200 --size 50000 --latency 0.05
+
+  # Same, with each transfer limited to 5 MB/s
+  python drive_io.py --latency 0.05 --bandwidth 5000000
+        """
+    )
+    parser.add_argument('--files', type=int, default=200, help='Number of files')
+    parser.add_argument('--size', type=int, default=50000, help='Bytes per file')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every operation')
+    parser.add_argument('--bandwidth', type=float, default=None, help='Bytes per second per operation')
+    parser.add_argument('--window', type=int, default=64, help='Read-ahead window')
+    parser.add_argument('--workers', type=int, default=16, help='I/O threads')
+    args = parser.parse_args()
+
+    fs = LatencyFileSystem(args.latency, args.bandwidth)
+    root = tempfile.mkdtemp(prefix='drive_io_bench_')
+    try:
+        src = [os.path.join(root, 'src', f"{i:06d}.bin") for i in range(args.files)]
+        payload = os.urandom(args.size)
+        local = LocalFileSystem()
+        for path in src:
+            local.write_bytes(path, payload)
+
+        timings = {}
+        start = time.perf_counter()
+        for path in src:
+            fs.write_bytes(path.replace('src', 'seq'), fs.read_bytes(path))
+        timings['sequential copy'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        copy_many([(path, path.replace('src', 'staged')) for path in src], fs,
+                  window=args.window, workers=args.workers)
+        timings['read-ahead + staged copy'] = time.perf_counter() - start
+
+        ok = all(local.read_bytes(path.replace('src', 'staged')) == payload for path in src)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+    print(f"COPY {args.files} x {args.size / 1e3:.0f} KB, {args.latency * 1e3:.0f} ms latency")
+    print("=" * 60)
+    base = timings['sequential copy']
+    for name, seconds in timings.items():
+        print(f"  {name:<26} {seconds:>7.2f}s  {args.files / seconds:>8.1f} files/s  x{base / seconds:.1f}")
+    print(f"  {'✓' if ok else '✗'} Staged copies {'match' if ok else 'DO NOT match'} the sources")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Evaluate BRSSD Predictions Against Ground-Truth Labels
+Computes the confusion matrix, per-class precision/recall/F1 curves,
+mAP50 and mAP50-95 directly from label files and saved predictions,
+without loading a model; folders may live inside zip archives or an
+image store (image_store.py)
+"""
+
+import sys
+import json
+import argparse
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from image_store import StoreFileSystem
+
+FS = StoreFileSystem()
+
+# IoU thresholds 0.50:0.05:0.95, as in COCO and Ultralytics
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+# Confusion matrix settings (same defaults as Ultralytics validation plots)
+CM_CONF = 0.25
+CM_IOU = 0.45
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+# np.trapz was renamed in NumPy 2.0
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def parse_label_text(text, counts=None):
+    """
+    YOLO label text -> (classes, xywhn boxes, confidences).
+
+    Rows are 5 numbers, or 6 with a trailing confidence; rows without one
+    get NaN. Other rows are skipped and counted in counts['malformed'].
+    """
+    classes, boxes, conf = [], [], []
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if len(parts) not in (5, 6):
+                raise ValueError
+            values = [float(v) for v in parts]
+        except ValueError:
+            if counts is not None:
+                counts['malformed'] += 1
+            continue
+        classes.append(int(values[0]))
+        boxes.append(values[1:5])
+        conf.append(values[5] if len(values) == 6 else np.nan)
+    return np.array(classes, dtype=int), np.array(boxes, dtype=float).reshape(-1, 4), np.array(conf, dtype=float)
+
+
+def _as_list(paths):
+    return list(paths) if isinstance(paths, (list, tuple)) else [paths]
+
+
+def label_texts(directory):
+    """[(stem, text)] of the .txt files in a folder, which may be inside a zip archive or store"""
+    names = sorted(n for n in FS.listdir(directory) if n.endswith('.txt'))
+    return [(n[:-4], FS.read_bytes(f"{directory}/{n}").decode()) for n in names]
+
+
+def read_label_dir(labels_dir):
+    """{stem: (classes, boxes)} for every .txt file in one or more YOLO label directories"""
+    labels = {}
+    counts = Counter()
+    for directory in _as_list(labels_dir):
+        for stem, text in label_texts(directory):
+            cls, boxes, _ = parse_label_text(text, counts)
+            labels[stem] = (cls, boxes)
+    if counts['malformed']:
+        print(f"⚠️  Skipped {counts['malformed']} malformed label rows")
+    return labels
+
+
+def read_predictions(source):
+    """
+    {stem: (classes, boxes, confidences)} from prediction directories or JSONL files.
+
+    Directories hold YOLO txt files with a sixth confidence column (save_conf=True).
+    JSONL lines are either one detection each,
+        {"image": "x.jpg", "class": 3, "conf": 0.91, "box": [cx, cy, w, h]}
+    or one image each,
+        {"image": "x.jpg", "detections": [{"class": 3, "conf": 0.91, "box": [...]}, ...]}
+    with boxes in normalized xywh like the label files.
+    """
+    preds = {}
+    missing_conf = 0
+    counts = Counter()
+
+    for source in _as_list(source):
+        if FS.isdir(source):
+            for stem, text in label_texts(source):
+                cls, boxes, conf = parse_label_text(text, counts)
+                missing = np.isnan(conf)
+                missing_conf += int(missing.sum())
+                conf[missing] = 1.0
+                preds[stem] = (cls, boxes, conf)
+            continue
+        rows = {}
+        for line in FS.read_bytes(str(source)).decode().splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            stem = Path(record['image']).stem
+            dets = record.get('detections')
+            if dets is None:
+                dets = [record] if 'box' in record else []
+            bucket = rows.setdefault(stem, [])
+            for d in dets:
+                if 'conf' not in d:
+                    missing_conf += 1
+                bucket.append([d['class'], *d['box'], d.get('conf', 1.0)])
+        for stem, bucket in rows.items():
+            arr = np.array(bucket, dtype=float).reshape(-1, 6)
+            preds[stem] = (arr[:, 0].astype(int), arr[:, 1:5], arr[:, 5])
+
+    if counts['malformed']:
+        print(f"⚠️  Skipped {counts['malformed']} malformed prediction rows")
+    if missing_conf:
+        print(f"⚠️  {missing_conf} predictions have no confidence; treating them as 1.0 "
+              f"(PR curves and mAP need saved confidences)")
+    return preds
+
+
+def xywh2xyxy(boxes):
+    """Center-format boxes to corner format"""
+    out = np.empty_like(boxes)
+    out[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+    out[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+    return out
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (n, 4) and (m, 4) xyxy boxes -> (n, m)"""
+    # IoU is unchanged by per-axis scaling, so normalized boxes need no image size
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_predictions(pred_cls, true_cls, iou, iouv=IOU_THRESHOLDS):
+    """(m, len(iouv)) bool matrix: prediction j is a true positive at threshold i"""
+    correct = np.zeros((len(pred_cls), len(iouv)), dtype=bool)
+    if not len(pred_cls) or not len(true_cls):
+        return correct
+    iou = iou * (true_cls[:, None] == pred_cls[None, :])
+    for i, t in enumerate(iouv):
+        gt_idx, pred_idx = np.nonzero(iou >= t)
+        if not len(gt_idx):
+            continue
+        # Greedy one-to-one assignment by descending IoU
+        order = iou[gt_idx, pred_idx].argsort()[::-1]
+        gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+        _, first = np.unique(gt_idx, return_index=True)
+        correct[pred_idx[first], i] = True
+    return correct
+
+
+def image_stats(gt, pred, iouv=IOU_THRESHOLDS):
+    """Per-image match statistics: tp matrix, confidences, predicted and true classes"""
+    true_cls, true_boxes = gt
+    pred_cls, pred_boxes, conf = pred
+    iou = box_iou(xywh2xyxy(true_boxes), xywh2xyxy(pred_boxes))
+    return {
+        'tp': match_predictions(pred_cls, true_cls, iou, iouv),
+        'conf': conf,
+        'pred_cls': pred_cls,
+        'target_cls': true_cls,
+    }
+
+
+def update_confusion(matrix, gt, pred, conf_thres=CM_CONF, iou_thres=CM_IOU):
+    """Add one image to a (nc+1, nc+1) confusion matrix indexed [true, predicted]"""
+    background = matrix.shape[0] - 1
+    true_cls, true_boxes = gt
+    pred_cls, pred_boxes, conf = pred
+    keep = conf > conf_thres
+    pred_cls, pred_boxes = pred_cls[keep], pred_boxes[keep]
+
+    if not len(pred_cls):
+        np.add.at(matrix, (true_cls, background), 1)
+        return
+    if not len(true_cls):
+        np.add.at(matrix, (background, pred_cls), 1)
+        return
+
+    iou = box_iou(xywh2xyxy(true_boxes), xywh2xyxy(pred_boxes))
+    gt_idx, pred_idx = np.nonzero(iou > iou_thres)
+    if len(gt_idx):
+        order = iou[gt_idx, pred_idx].argsort()[::-1]
+        gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+        _, first = np.unique(gt_idx, return_index=True)
+        gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+
+    np.add.at(matrix, (true_cls[gt_idx], pred_cls[pred_idx]), 1)
+    missed = np.setdiff1d(np.arange(len(true_cls)), gt_idx)
+    np.add.at(matrix, (true_cls[missed], background), 1)
+    extra = np.setdiff1d(np.arange(len(pred_cls)), pred_idx)
+    np.add.at(matrix, (background, pred_cls[extra]), 1)
+
+
+def smooth(y, fraction=0.05):
+    """Box filter over a fraction of the curve length"""
+    nf = round(len(y) * fraction * 2) // 2 + 1
+    p = np.ones(nf // 2)
+    yp = np.concatenate((p * y[0], y, p * y[-1]), 0)
+    return np.convolve(yp, np.ones(nf) / nf, mode='valid')
+
+
+def compute_ap(recall, precision):
+    """COCO 101-point interpolated average precision of one PR curve"""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return _trapezoid(np.interp(x, mrec, mpre), x), mpre, mrec
+
+
+def ap_per_class(tp, conf, pred_cls, target_cls, nc, eps=1e-16):
+    """
+    Per-class AP at every IoU threshold plus P/R/F1 curves over confidence.
+
+    Returns arrays indexed by class id (classes without labels get zeros).
+    """
+    order = np.argsort(-conf, kind='stable')
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+    n_labels = np.bincount(target_cls, minlength=nc)[:nc]
+
+    px = np.linspace(0, 1, 1000)
+    ap = np.zeros((nc, tp.shape[1]))
+    p_curve, r_curve = np.zeros((nc, 1000)), np.zeros((nc, 1000))
+    pr_curve = np.zeros((nc, 101))
+
+    for c in range(nc):
+        mask = pred_cls == c
+        n_l, n_p = n_labels[c], mask.sum()
+        if n_p == 0 or n_l == 0:
+            continue
+        fpc = (1 - tp[mask]).cumsum(0)
+        tpc = tp[mask].cumsum(0)
+        recall = tpc / (n_l + eps)
+        precision = tpc / (tpc + fpc)
+        # Curves over confidence (negated because conf is decreasing)
+        r_curve[c] = np.interp(-px, -conf[mask], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-px, -conf[mask], precision[:, 0], left=1)
+        for j in range(tp.shape[1]):
+            ap[c, j], mpre, mrec = compute_ap(recall[:, j], precision[:, j])
+            if j == 0:
+                pr_curve[c] = np.interp(np.linspace(0, 1, 101), mrec, mpre)
+
+    f1_curve = 2 * p_curve * r_curve / (p_curve + r_curve + eps)
+    return {
+        'ap': ap,
+        'n_labels': n_labels,
+        'px': px,
+        'precision_curve': p_curve,
+        'recall_curve': r_curve,
+        'f1_curve': f1_curve,
+        'pr_curve': pr_curve,
+    }
+
+
+def collect_stats(labels, preds, image_stems=None, nc=None, iouv=IOU_THRESHOLDS):
+    """
+    Match every image and accumulate stats and the confusion matrix.
+
+    Images with predictions but no label file are scored as background,
+    so their detections count as false positives.
+    """
+    stems = sorted(set(labels) | set(image_stems or ()) | set(preds))
+    empty_gt = (np.zeros(0, dtype=int), np.zeros((0, 4)))
+    empty_pred = (np.zeros(0, dtype=int), np.zeros((0, 4)), np.zeros(0))
+
+    # Class ids beyond the dataset YAML still need a row/column of their own
+    observed = 1 + max([int(g[0].max()) for g in labels.values() if len(g[0])] +
+                       [int(p[0].max()) for p in preds.values() if len(p[0])] + [-1])
+    nc = max(nc or 0, observed)
+
+    matrix = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+    per_image = {}
+    for stem in stems:
+        gt = labels.get(stem, empty_gt)
+        pred = preds.get(stem, empty_pred)
+        per_image[stem] = image_stats(gt, pred, iouv)
+        update_confusion(matrix, gt, pred)
+    return per_image, matrix, nc
+
+
+def summarize(per_image, matrix, nc, names=None):
+    """Aggregate per-image stats into the evaluation report"""
+    stats = list(per_image.values())
+    tp = np.concatenate([s['tp'] for s in stats]) if stats else np.zeros((0, len(IOU_THRESHOLDS)), bool)
+    conf = np.concatenate([s['conf'] for s in stats]) if stats else np.zeros(0)
+    pred_cls = np.concatenate([s['pred_cls'] for s in stats]).astype(int) if stats else np.zeros(0, int)
+    target_cls = np.concatenate([s['target_cls'] for s in stats]).astype(int) if stats else np.zeros(0, int)
+
+    result = ap_per_class(tp.astype(float), conf, pred_cls, target_cls, nc)
+    present = result['n_labels'] > 0
+
+    # Operating point: the confidence that maximizes the mean (smoothed) F1
+    mean_f1 = smooth(result['f1_curve'][present].mean(0), 0.1) if present.any() else np.zeros(1000)
+    best = int(mean_f1.argmax())
+    p_at, r_at, f1_at = (result['precision_curve'][:, best], result['recall_curve'][:, best],
+                         result['f1_curve'][:, best])
+
+    ap50, ap = result['ap'][:, 0], result['ap'].mean(1)
+    names = names or {}
+    per_class = []
+    for c in range(nc):
+        f1c = result['f1_curve'][c]
+        per_class.append({
+            'class': c,
+            'name': names.get(c, str(c)),
+            'instances': int(result['n_labels'][c]),
+            'precision': round(float(p_at[c]), 5),
+            'recall': round(float(r_at[c]), 5),
+            'f1': round(float(f1_at[c]), 5),
+            'ap50': round(float(ap50[c]), 5),
+            'ap50_95': round(float(ap[c]), 5),
+            'best_f1': round(float(f1c.max()), 5),
+            'best_f1_conf': round(float(result['px'][f1c.argmax()]), 4),
+        })
+
+    def mean(values):
+        return round(float(values[present].mean()), 5) if present.any() else 0.0
+
+    # Curves are stored at 101 confidence points to keep the JSON small
+    idx = np.linspace(0, len(result['px']) - 1, 101).round().astype(int)
+    return {
+        'summary': {
+            'images': len(stats),
+            'instances': int(result['n_labels'].sum()),
+            'predictions': int(len(conf)),
+            'precision': mean(p_at),
+            'recall': mean(r_at),
+            'f1': mean(f1_at),
+            'conf_at_best_f1': round(float(result['px'][best]), 4),
+            'map50': mean(ap50),
+            'map50_95': mean(ap),
+        },
+        'per_class': per_class,
+        'curves': {
+            'conf': result['px'][idx].round(4).tolist(),
+            'precision': result['precision_curve'][:, idx].round(5).tolist(),
+            'recall': result['recall_curve'][:, idx].round(5).tolist(),
+            'f1': result['f1_curve'][:, idx].round(5).tolist(),
+            'pr_recall': np.linspace(0, 1, 101).round(4).tolist(),
+            'pr_precision': result['pr_curve'].round(5).tolist(),
+        },
+        'confusion_matrix': {
+            'rows': 'true class (last row: background / false positive)',
+            'cols': 'predicted class (last column: background / missed)',
+            'conf': CM_CONF,
+            'iou': CM_IOU,
+            'matrix': matrix.tolist(),
+        },
+    }
+
+
+def evaluate(labels_dir, predictions, images_dir=None, names=None, nc=None):
+    """Full evaluation of a prediction set against label directories (folders or zip paths)"""
+    labels = read_label_dir(labels_dir)
+    preds = read_predictions(predictions)
+    image_stems = None
+    if images_dir:
+        image_stems = [Path(n).stem for directory in _as_list(images_dir) for n in FS.listdir(directory)
+                       if n.lower().endswith(IMAGE_EXTENSIONS)]
+    unlabeled = len(set(preds) - set(labels))
+    if unlabeled:
+        print(f"⚠️  {unlabeled} images have predictions but no label file; scored as background")
+    if names and nc is None:
+        nc = len(names)
+    per_image, matrix, nc = collect_stats(labels, preds, image_stems, nc)
+    return summarize(per_image, matrix, nc, names)
+
+
+def load_class_names(data_yaml):
+    """Class names from a dataset YAML ({id: name}), or None"""
+    if not data_yaml or not Path(data_yaml).exists():
+        return None
+    with open(data_yaml) as f:
+        names = yaml.safe_load(f).get('names')
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    return {int(k): v for k, v in names.items()} if names else None
+
+
+def print_report(report):
+    """Print the summary and per-class table"""
+    s = report['summary']
+    print("\n" + "=" * 80)
+    print("EVALUATION RESULTS")
+    print("=" * 80)
+    print(f"  Images: {s['images']}   Instances: {s['instances']}   Predictions: {s['predictions']}")
+    print(f"  mAP50: {s['map50']:.4f}   mAP50-95: {s['map50_95']:.4f}")
+    print(f"  Precision: {s['precision']:.4f}   Recall: {s['recall']:.4f}   "
+          f"F1: {s['f1']:.4f} (conf {s['conf_at_best_f1']:.3f})")
+    print(f"\n  {'Class':<34} {'Inst':>6} {'P':>7} {'R':>7} {'AP50':>7} {'AP50-95':>8} {'F1 conf':>8}")
+    print(f"  {'-'*34} {'-'*6} {'-'*7} {'-'*7} {'-'*7} {'-'*8} {'-'*8}")
+    for c in report['per_class']:
+        if c['instances'] == 0:
+            continue
+        print(f"  {c['name'][:34]:<34} {c['instances']:>6} {c['precision']:>7.3f} {c['recall']:>7.3f} "
+              f"{c['ap50']:>7.3f} {c['ap50_95']:>8.3f} {c['best_f1_conf']:>8.3f}")
+    print("=" * 80 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Evaluate saved predictions against YOLO ground-truth labels',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Predictions saved by Ultralytics with save_txt=True, save_conf=True
+  python evaluate_brssd.py --labels BRSSD/valid/labels \\
+                           --predictions runs/detect/predict/labels --out eval.json
+
+  # Predictions as JSONL; include unlabeled images so their detections count as FPs
+  python evaluate_brssd.py --labels BRSSD/valid/labels --images BRSSD/valid/images \\
+                           --predictions preds.jsonl
+
+  # Ground truth read straight from Roboflow export zips, no extraction
+  python evaluate_brssd.py --labels BRSSD.zip/valid/labels BRSSD.zip/test/labels \\
+                           --predictions runs/detect/predict/labels
+
+  # Ground truth and image list from an image store built by image_store.py
+  python evaluate_brssd.py --labels BRSSD.imgdb/valid/labels --images BRSSD.imgdb/valid/images \\
+                           --predictions preds.jsonl
+        """
+    )
+    parser.add_argument('--labels', required=True, nargs='+',
+                        help='Ground-truth YOLO label directories (may be inside .zip files or .imgdb stores)')
+    parser.add_argument('--predictions', required=True, nargs='+',
+                        help='Prediction label directories (with confidences) or JSONL files')
+    parser.add_argument('--images', type=str, default=None, nargs='+',
+                        help='Image directories; images without a label file count as background')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml',
+                        help='Dataset YAML for class names')
+    parser.add_argument('--out', type=str, default=None, help='Write the full report to this JSON file')
+    args = parser.parse_args()
+
+    for path in args.labels + args.predictions + (args.images or []):
+        if not FS.exists(path):
+            print(f"✗ Not found: {path}")
+            return 1
+
+    report = evaluate(args.labels, args.predictions, args.images, load_class_names(args.data))
+    print_report(report)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f)
+        print(f"✓ Report saved to: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
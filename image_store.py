@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Random-Access Image and Label Store
+Packs train/valid/test images, labels and per-image metadata into one
+SQLite file keyed by "<split>/<stem>", read through memory-mapped pages
+that worker processes share via the OS page cache
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+
+from drive_io import ArchiveFileSystem, LocalFileSystem, ReadAhead
+from image_probe import image_size_of
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+SPLIT_FOLDERS = ('train', 'val', 'valid', 'test')
+STORE_SUFFIX = '.imgdb'
+# Upper bound for memory-mapped reads; SQLite clamps it to its compile-time limit
+MMAP_BYTES = 1 << 40
+
+# Blobs are the last columns so metadata queries never touch overflow pages
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id TEXT PRIMARY KEY,
+    split TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    label_size INTEGER,
+    label_mtime_ns INTEGER,
+    sha256 TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    boxes INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    image BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_split ON samples (split, name);
+CREATE TABLE IF NOT EXISTS classes (
+    class_id INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (class_id, id)
+) WITHOUT ROWID;
+"""
+
+
+def label_classes(text):
+    """(box count, set of class ids, malformed rows) of one YOLO label text"""
+    classes, bad = [], 0
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if len(parts) != 5:
+                raise ValueError
+            classes.append(int(float(parts[0])))
+        except ValueError:
+            bad += 1
+    return len(classes), set(classes), bad
+
+
+class ImageStore:
+    """
+    Images, labels and metadata of a dataset in one SQLite file.
+
+    Connections are opened lazily and again after fork, so a store can be
+    handed to multiprocessing or DataLoader workers; read-only connections
+    map the file into memory instead of copying pages into each process.
+    """
+
+    def __init__(self, path, readonly=True):
+        self.path = Path(path)
+        self.readonly = readonly
+        self._conn = None
+        self._pid = None
+
+    @property
+    def conn(self):
+        if self._conn is None or self._pid != os.getpid():
+            if self.readonly:
+                self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                self._conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+            else:
+                self._conn = sqlite3.connect(str(self.path))
+                self._conn.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def __getstate__(self):
+        return {'path': self.path, 'readonly': self.readonly, '_conn': None, '_pid': None}
+
+    def build(self, dataset_dir, workers=16, fs=None):
+        """
+        Add or refresh every split folder of dataset_dir (train, val/valid, test).
+
+        Only samples whose image or label size/mtime changed are re-read;
+        samples whose image disappeared are dropped. Malformed label rows are
+        kept in the stored label but not counted as boxes. Returns counts.
+        """
+        fs = fs or LocalFileSystem()
+        dataset_dir = Path(dataset_dir)
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'bad_label_lines': 0}
+        for split in SPLIT_FOLDERS:
+            images_dir, labels_dir = dataset_dir / split / 'images', dataset_dir / split / 'labels'
+            if not images_dir.is_dir():
+                continue
+            known = {row[0]: row[1:] for row in self.conn.execute(
+                "SELECT id, size, mtime_ns, label_size, label_mtime_ns FROM samples WHERE split = ?", (split,))}
+            labels = {name: (size, mtime) for name, size, mtime in
+                      (fs.entries(labels_dir) if labels_dir.is_dir() else [])}
+
+            todo = []
+            for name, size, mtime in fs.entries(images_dir):
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                stem = os.path.splitext(name)[0]
+                key = f"{split}/{stem}"
+                state = (size, mtime) + labels.get(f"{stem}.txt", (None, None))
+                old = known.pop(key, None)
+                if old == state:
+                    counts['unchanged'] += 1
+                    continue
+                counts['updated' if old else 'added'] += 1
+                todo.append((key, name, state))
+
+            paths = []
+            for key, name, state in todo:
+                paths += [str(images_dir / name), str(labels_dir / f"{os.path.splitext(name)[0]}.txt")]
+            reads = iter(ReadAhead(paths, fs, workers=workers))
+            for (key, name, state), (_, image), (_, label) in zip(todo, reads, reads):
+                if image is not None:
+                    counts['bad_label_lines'] += self._put(key, split, name, state, image, (label or b'').decode())
+
+            for key in known:
+                self._delete(key)
+                counts['removed'] += 1
+            self.conn.commit()
+        return counts
+
+    def _put(self, key, split, name, state, image, label):
+        """Insert or replace one sample; returns its number of malformed label rows"""
+        boxes, classes, bad = label_classes(label)
+        size = image_size_of(image)
+        self._delete(key)
+        self.conn.execute("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (key, split, name) + state + (hashlib.sha256(image).hexdigest(),) +
+                          (tuple(size) if size else (None, None)) + (boxes, label, image))
+        self.conn.executemany("INSERT INTO classes VALUES (?, ?)", [(c, key) for c in classes])
+        return bad
+
+    def _delete(self, key):
+        self.conn.execute("DELETE FROM classes WHERE id = ?", (key,))
+        self.conn.execute("DELETE FROM samples WHERE id = ?", (key,))
+
+    def splits(self):
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT split FROM samples ORDER BY split")]
+
+    def ids(self, split=None):
+        """Sample ids ("<split>/<stem>") in name order"""
+        if split is None:
+            return [r[0] for r in self.conn.execute("SELECT id FROM samples ORDER BY id")]
+        return [r[0] for r in self.conn.execute("SELECT id FROM samples WHERE split = ? ORDER BY name", (split,))]
+
+    def get(self, key):
+        """(image bytes, label text) of one sample, or None"""
+        return self.conn.execute("SELECT image, label FROM samples WHERE id = ?", (key,)).fetchone()
+
+    def read_member(self, split, kind, name):
+        """Bytes of images/<name> or labels/<stem>.txt of a split, as stored on disk, or None"""
+        if kind == 'images':
+            row = self.conn.execute("SELECT image FROM samples WHERE split = ? AND name = ?",
+                                    (split, name)).fetchone()
+            return row[0] if row else None
+        if kind == 'labels' and name.endswith('.txt'):
+            row = self.conn.execute("SELECT label FROM samples WHERE id = ? AND label_size IS NOT NULL",
+                                    (f"{split}/{name[:-4]}",)).fetchone()
+            return row[0].encode() if row else None
+        return None
+
+    def meta(self, key):
+        """{name, width, height, boxes, sha256} of one sample without reading its image"""
+        row = self.conn.execute("SELECT name, width, height, boxes, sha256 FROM samples WHERE id = ?",
+                                (key,)).fetchone()
+        return dict(zip(('name', 'width', 'height', 'boxes', 'sha256'), row)) if row else None
+
+    def with_class(self, class_id, split=None, limit=None):
+        """Ids of samples with at least one box of class_id"""
+        query = "SELECT id FROM classes WHERE class_id = ?"
+        params = (int(class_id),)
+        if split:
+            query += " AND id LIKE ?"
+            params += (f"{split}/%",)
+        query += " ORDER BY id"
+        if limit:
+            query += " LIMIT ?"
+            params += (int(limit),)
+        return [r[0] for r in self.conn.execute(query, params)]
+
+    def sample(self, class_id, n, split=None, seed=None):
+        """n random ids containing class_id"""
+        ids = self.with_class(class_id, split)
+        return random.Random(seed).sample(ids, min(n, len(ids)))
+
+    def class_counts(self, split=None):
+        """{class_id: images containing it}"""
+        if split:
+            rows = self.conn.execute("SELECT class_id, COUNT(*) FROM classes WHERE id LIKE ? "
+                                     "GROUP BY class_id", (f"{split}/%",))
+        else:
+            rows = self.conn.execute("SELECT class_id, COUNT(*) FROM classes GROUP BY class_id")
+        return dict(rows)
+
+    def close(self):
+        if self._conn is not None:
+            if not self.readonly:
+                self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+
+def split_store(path):
+    """('BRSSD.imgdb', 'valid/images/x.jpg') for a path inside a store, (None, path) otherwise"""
+    text = str(path).replace(os.sep, '/')
+    i = text.find(STORE_SUFFIX)
+    while i >= 0:
+        end = i + len(STORE_SUFFIX)
+        if (end == len(text) or text[end] == '/') and os.path.isfile(text[:end]):
+            return text[:end], text[end:].strip('/')
+        i = text.find(STORE_SUFFIX, end)
+    return None, path
+
+
+class StoreFileSystem(ArchiveFileSystem):
+    """
+    Reads paths inside a store as if it were a dataset folder:
+    BRSSD.imgdb/valid/images/x.jpg and BRSSD.imgdb/valid/labels/x.txt.
+    Other paths (plain files, zip members) are handled as before.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._stores = {}
+
+    def _store(self, path):
+        store = self._stores.get(path)
+        if store is None:
+            store = self._stores[path] = ImageStore(path)
+        return store
+
+    def _resolve(self, path):
+        """(store, split, kind, name) for a path inside a store, else None"""
+        store_path, inner = split_store(path)
+        if store_path is None:
+            return None
+        parts = inner.split('/') if inner else []
+        parts += [None] * (3 - len(parts))
+        return (self._store(store_path),) + tuple(parts[:3])
+
+    def read_bytes(self, path):
+        where = self._resolve(path)
+        if where is None:
+            return super().read_bytes(path)
+        store, split, kind, name = where
+        data = store.read_member(split, kind, name) if name else None
+        if data is None:
+            raise FileNotFoundError(f"{path} not in {store.path}")
+        return data
+
+    def write_bytes(self, path, data):
+        if split_store(path)[0] is not None:
+            raise OSError(f"Cannot write inside an image store: {path}")
+        super().write_bytes(path, data)
+
+    def entries(self, path):
+        where = self._resolve(path)
+        if where is None:
+            return super().entries(path)
+        store, split, kind, _ = where
+        if kind == 'images':
+            return [tuple(r) for r in store.conn.execute(
+                "SELECT name, size, mtime_ns FROM samples WHERE split = ? ORDER BY name", (split,))]
+        if kind == 'labels':
+            rows = store.conn.execute("SELECT name, label_size, label_mtime_ns FROM samples "
+                                      "WHERE split = ? AND label_size IS NOT NULL ORDER BY name", (split,))
+            return [(f"{os.path.splitext(name)[0]}.txt", size, mtime) for name, size, mtime in rows]
+        return []
+
+    def listdir(self, path):
+        where = self._resolve(path)
+        if where is None:
+            return super().listdir(path)
+        store, split, kind, _ = where
+        if split is None:
+            return store.splits()
+        if kind is None:
+            return ['images', 'labels']
+        return [e[0] for e in self.entries(path)]
+
+    def isdir(self, path):
+        where = self._resolve(path)
+        if where is None:
+            return super().isdir(path)
+        store, split, kind, name = where
+        return name is None and (split is None or split in store.splits()) and kind in (None, 'images', 'labels')
+
+    def exists(self, path):
+        where = self._resolve(path)
+        if where is None:
+            return super().exists(path)
+        if self.isdir(path):
+            return True
+        try:
+            self.read_bytes(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+class StoreDataset:
+    """
+    Map-style dataset over one split of a store: item i is
+    (BGR image array, labels as an (n, 5) float array, sample id).
+    Works as a torch DataLoader dataset; each worker opens its own mapping.
+    """
+
+    def __init__(self, path, split):
+        self.store = ImageStore(path)
+        self.ids = self.store.ids(split)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        import cv2
+        import numpy as np
+
+        image, label = self.store.get(self.ids[i])
+        img = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+        rows = [r.split()[:5] for r in label.splitlines() if len(r.split()) >= 5]
+        return img, np.array(rows, dtype=np.float32).reshape(-1, 5), self.ids[i]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build or query a random-access image/label store',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Pack BRSSD/{train,valid,test} (re-running only re-reads changed files)
+  python image_store.py build BRSSD BRSSD.imgdb
+
+  # Per-split counts and five random validation images containing class 3
+  python image_store.py info BRSSD.imgdb --class 3 --split valid --limit 5
+
+  # Evaluate and visualize straight from the store
+  python evaluate_brssd.py --labels BRSSD.imgdb/valid/labels --predictions runs/detect/predict/labels
+        """
+    )
+    parser.add_argument('command', choices=['build', 'info'], help='Action')
+    parser.add_argument('source', help='Dataset folder (build) or store file (info)')
+    parser.add_argument('store', nargs='?', default=None, help='Store file to build (default: <source>.imgdb)')
+    parser.add_argument('--class', dest='class_id', type=int, default=None, help='Sample images of this class')
+    parser.add_argument('--split', type=str, default=None, help='Restrict --class to one split')
+    parser.add_argument('--limit', type=int, default=10, help='Number of --class samples')
+    parser.add_argument('--workers', type=int, default=16, help='I/O threads while building')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if not Path(args.source).is_dir():
+            print(f"✗ Dataset folder not found: {args.source}")
+            return 1
+        path = args.store or f"{Path(args.source).resolve()}{STORE_SUFFIX}"
+        start = time.perf_counter()
+        store = ImageStore(path, readonly=False)
+        counts = store.build(args.source, workers=args.workers)
+        store.close()
+        print(f"✓ Store {path}: {counts['added']} added, {counts['updated']} updated, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged "
+              f"({time.perf_counter() - start:.1f}s)")
+        if counts['bad_label_lines']:
+            print(f"  ⚠️  Skipped {counts['bad_label_lines']} malformed label rows in re-read files")
+    else:
+        path = args.source
+        if not Path(path).is_file():
+            print(f"✗ Store not found: {path}")
+            return 1
+
+    store = ImageStore(path)
+    print("\n" + "=" * 60)
+    print(f"IMAGE STORE ({os.path.getsize(path) / 2**20:.1f} MB)")
+    print("=" * 60)
+    for split in store.splits():
+        n, boxes = store.conn.execute("SELECT COUNT(*), SUM(boxes) FROM samples WHERE split = ?",
+                                      (split,)).fetchone()
+        print(f"  {split:<6} {n:>7} images  {boxes or 0:>7} boxes  {len(store.class_counts(split)):>3} classes")
+    if args.class_id is not None:
+        picks = store.sample(args.class_id, args.limit, args.split)
+        print(f"\nClass {args.class_id}: {len(picks)} random image(s)")
+        for key in picks:
+            m = store.meta(key)
+            print(f"  {key}  {m['width']}x{m['height']}  {m['boxes']} boxes")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
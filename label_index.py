@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Inverted Class Index for YOLO Label Folders
+Maps class id -> (label file, box rows) in a SQLite file next to the
+labels folder (or the zip archive or image store holding it), refreshed
+incrementally from file size and mtime
+"""
+
+import sys
+import sqlite3
+import argparse
+from pathlib import Path
+
+from drive_io import split_archive
+from image_store import StoreFileSystem, split_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    n_boxes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    class_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    PRIMARY KEY (class_id, name)
+) WITHOUT ROWID;
+"""
+
+
+def index_path(labels_dir):
+    """
+    Index database of a labels folder (BRSSD/valid/labels -> BRSSD/valid/labels_index.db).
+    Folders inside an archive or store get one next to it (BRSSD.zip/valid/labels -> BRSSD_zip_valid_labels_index.db).
+    """
+    archive, inner = split_archive(labels_dir)
+    if archive is None:
+        archive, inner = split_store(labels_dir)
+    if archive is not None:
+        archive = Path(archive)
+        return archive.with_name(f"{archive.stem}_{archive.suffix[1:]}_{inner.replace('/', '_') or 'root'}_index.db")
+    labels_dir = Path(labels_dir)
+    return labels_dir.with_name(f"{labels_dir.name}_index.db")
+
+
+def parse_postings(text):
+    """{class_id: [row, ...]} for one label file; rows are line numbers of the boxes"""
+    postings = {}
+    for row, line in enumerate(text.splitlines()):
+        parts = line.split()
+        if len(parts) < 5:
+            continue
+        try:
+            class_id = int(float(parts[0]))
+        except ValueError:
+            continue
+        postings.setdefault(class_id, []).append(row)
+    return postings
+
+
+class LabelIndex:
+    """Inverted index over the .txt files of one labels folder"""
+
+    def __init__(self, labels_dir, path=None, fs=None):
+        self.labels_dir = Path(labels_dir)
+        self.fs = fs or StoreFileSystem()
+        self.path = Path(path) if path else index_path(labels_dir)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+
+    def update(self):
+        """Re-read only label files that were added or changed; drop removed ones"""
+        known = {name: (size, mtime) for name, size, mtime in
+                 self.conn.execute("SELECT name, size, mtime_ns FROM files")}
+        seen = set()
+        counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+        for name, size, mtime_ns in self.fs.entries(self.labels_dir):
+            if not name.endswith('.txt'):
+                continue
+            seen.add(name)
+            old = known.get(name)
+            if old == (size, mtime_ns):
+                counts['unchanged'] += 1
+                continue
+            counts['changed' if old else 'added'] += 1
+            postings = parse_postings(self.fs.read_bytes(str(self.labels_dir / name)).decode())
+            self._replace(name, size, mtime_ns, postings)
+
+        for name in set(known) - seen:
+            self._remove(name)
+            counts['removed'] += 1
+        self.conn.commit()
+        return counts
+
+    def _remove(self, name):
+        self.conn.execute("DELETE FROM postings WHERE name = ?", (name,))
+        self.conn.execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def _replace(self, name, size, mtime_ns, postings):
+        self._remove(name)
+        self.conn.execute("INSERT INTO files VALUES (?, ?, ?, ?)",
+                          (name, size, mtime_ns, sum(len(r) for r in postings.values())))
+        self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                              [(c, name, ','.join(map(str, rows))) for c, rows in postings.items()])
+
+    def lookup(self, class_id, limit=None):
+        """[(label path, [box rows])] of files containing class_id, in name order"""
+        query = "SELECT name, rows FROM postings WHERE class_id = ? ORDER BY name"
+        params = (int(class_id),)
+        if limit:
+            query += " LIMIT ?"
+            params += (int(limit),)
+        return [(self.labels_dir / name, [int(r) for r in rows.split(',')])
+                for name, rows in self.conn.execute(query, params)]
+
+    def first_per_class(self, class_ids=None):
+        """{class_id: label path} with one example file per class"""
+        rows = self.conn.execute("SELECT class_id, MIN(name) FROM postings GROUP BY class_id")
+        wanted = set(class_ids) if class_ids is not None else None
+        return {c: self.labels_dir / name for c, name in rows if wanted is None or c in wanted}
+
+    def class_counts(self):
+        """{class_id: (files, boxes)}"""
+        counts = {}
+        for c, rows in self.conn.execute("SELECT class_id, rows FROM postings"):
+            files, boxes = counts.get(c, (0, 0))
+            counts[c] = (files + 1, boxes + rows.count(',') + 1)
+        return dict(sorted(counts.items()))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def open_index(labels_dir, path=None, fs=None):
+    """Open the index of a labels folder and bring it up to date"""
+    index = LabelIndex(labels_dir, path, fs)
+    index.update()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build or query the class -> image index of a YOLO labels folder',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Build (or refresh) the index and show per-class counts
+  python label_index.py BRSSD/valid/labels
+
+  # Five label files containing class 36, with the rows of its boxes
+  python label_index.py predict/labels --class 36 --limit 5
+
+  # Labels inside a Roboflow export, read without extracting it
+  python label_index.py BRSSD.zip/valid/labels --class 3
+        """
+    )
+    parser.add_argument('labels', help='Labels folder (may be inside a .zip or .imgdb store)')
+    parser.add_argument('--class', dest='class_id', type=int, default=None, help='Class id to look up')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum files to list for --class')
+    parser.add_argument('--index', type=str, default=None, help='Index file (default: <labels>_index.db)')
+    args = parser.parse_args()
+
+    if not StoreFileSystem().isdir(args.labels):
+        print(f"✗ Labels folder not found: {args.labels}")
+        return 1
+
+    index = LabelIndex(args.labels, args.index)
+    counts = index.update()
+    print(f"✓ Index {index.path}: {counts['added']} added, {counts['changed']} changed, "
+          f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+
+    if args.class_id is not None:
+        matches = index.lookup(args.class_id, args.limit)
+        print(f"\nClass {args.class_id}: {len(matches)} file(s) shown")
+        for path, rows in matches:
+            print(f"  {path.name}  rows {rows}")
+    else:
+        print(f"\n  {'Class':>5} {'Files':>7} {'Boxes':>7}")
+        for c, (files, boxes) in index.class_counts().items():
+            print(f"  {c:>5} {files:>7} {boxes:>7}")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Single-Pass YOLO Label Pipeline
+Declares class filters, remaps and box checks once and applies them to
+every label file in one streaming pass: each label is read once, written
+once, and only images whose labels survive are copied
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+from drive_io import LocalFileSystem, ReadAhead, StagedWriter, copy_many
+from image_probe import box_too_small, probe_sizes
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _step(name, fn, needs_size=False):
+    fn.step_name = name
+    fn.needs_size = needs_size
+    return fn
+
+
+def class_id(parts):
+    return int(float(parts[0]))
+
+
+def exclude_classes(class_ids):
+    """Drop boxes of these classes"""
+    excluded = {int(c) for c in class_ids}
+    return _step('excluded class', lambda parts, size: None if class_id(parts) in excluded else parts)
+
+
+def keep_classes(class_ids):
+    """Drop boxes of every class except these"""
+    kept = {int(c) for c in class_ids}
+    return _step('not kept class', lambda parts, size: parts if class_id(parts) in kept else None)
+
+
+def remap_classes(mapping):
+    """Replace class ids through {old id: new id}; other boxes pass unchanged"""
+    mapping = {int(k): int(v) for k, v in mapping.items()}
+
+    def remap(parts, size):
+        new = mapping.get(class_id(parts))
+        return parts if new is None else [str(new)] + parts[1:]
+    return _step('remapped', remap)
+
+
+def check_bounds():
+    """Drop boxes with non-numeric or out-of-range [0, 1] coordinates"""
+    def bounds(parts, size):
+        try:
+            coords = [float(v) for v in parts[1:]]
+        except ValueError:
+            return None
+        return parts if all(0 <= v <= 1 for v in coords) else None
+    return _step('out of bounds', bounds)
+
+
+def min_box_size(min_px):
+    """Drop boxes narrower or shorter than min_px pixels (needs image sizes)"""
+    def big_enough(parts, size):
+        try:
+            return None if box_too_small(float(parts[3]), float(parts[4]), size, min_px) else parts
+        except ValueError:
+            return None
+    return _step(f"smaller than {min_px} px", big_enough, needs_size=True)
+
+
+def images_by_stem(image_dir, fs=None):
+    """{stem: image path} of a folder, preferring .jpg when several extensions exist"""
+    fs = fs or LocalFileSystem()
+    images = {}
+    for name in fs.listdir(image_dir):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in IMAGE_EXTENSIONS and (stem not in images or ext.lower() == '.jpg'):
+            images[stem] = os.path.join(image_dir, name)
+    return images
+
+
+class LabelPipeline:
+    """
+    Ordered box-level steps applied to every label file.
+
+    A step takes the five tokens of a box row and the image (width, height)
+    or None, and returns the row (possibly changed) or None to drop the box.
+    Rows without exactly five tokens are dropped as malformed. Kept rows
+    are written back unchanged apart from remapped class ids.
+    """
+
+    def __init__(self, steps=None, drop_empty=True):
+        self.steps = list(steps or [])
+        self.drop_empty = drop_empty
+
+    def add(self, step):
+        self.steps.append(step)
+        return self
+
+    @property
+    def needs_size(self):
+        return any(step.needs_size for step in self.steps)
+
+    def transform(self, text, size=None, dropped=None):
+        """Kept rows of one label text; dropped boxes are counted per step in `dropped`"""
+        dropped = dropped if dropped is not None else Counter()
+        kept = []
+        for line in text.splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            try:
+                if len(parts) != 5:
+                    raise ValueError
+                class_id(parts)
+            except ValueError:
+                dropped['malformed'] += 1
+                continue
+            for step in self.steps:
+                result = step(parts, size)
+                if result is None:
+                    dropped[step.step_name] += 1
+                    break
+                parts = result
+            else:
+                kept.append(' '.join(parts))
+        return kept
+
+    def run(self, src_lbl_dir, dst_lbl_dir=None, src_img_dir=None, dst_img_dir=None,
+            fs=None, window=64, workers=16):
+        """
+        Stream every label of src_lbl_dir through the steps.
+
+        Kept labels go to dst_lbl_dir and the images of those labels are then
+        copied from src_img_dir to dst_img_dir. Without dst_lbl_dir nothing
+        is written and the report only lists what would be dropped.
+        """
+        fs = fs or LocalFileSystem()
+        start = time.perf_counter()
+        names = sorted(n for n in fs.listdir(src_lbl_dir) if n.endswith('.txt'))
+        images = images_by_stem(src_img_dir, fs) if src_img_dir else {}
+        sizes = {}
+        if self.needs_size and images:
+            probed = probe_sizes(images.values())
+            sizes = {stem: probed[path] for stem, path in images.items()}
+
+        report = {'files': len(names), 'written': 0, 'empty': 0, 'boxes_in': 0, 'boxes_out': 0,
+                  'dropped': Counter(), 'files_with_drops': [], 'images': 0, 'missing_images': 0}
+        survivors = []
+        writer = StagedWriter(fs, workers=workers) if dst_lbl_dir else None
+        try:
+            paths = [os.path.join(src_lbl_dir, n) for n in names]
+            for name, (_, data) in zip(names, ReadAhead(paths, fs, window=window, workers=workers)):
+                if data is None:
+                    continue
+                stem = name[:-4]
+                text = data.decode()
+                dropped = Counter()
+                kept = self.transform(text, sizes.get(stem), dropped)
+                report['boxes_in'] += len(kept) + sum(dropped.values())
+                report['boxes_out'] += len(kept)
+                report['dropped'].update(dropped)
+                if dropped:
+                    report['files_with_drops'].append(name)
+                if not kept:
+                    report['empty'] += 1
+                    if self.drop_empty:
+                        continue
+                survivors.append(stem)
+                if writer:
+                    writer.write(os.path.join(dst_lbl_dir, name), ('\n'.join(kept) + '\n' if kept else '').encode())
+                    report['written'] += 1
+        finally:
+            if writer:
+                writer.close()
+
+        if dst_lbl_dir and src_img_dir and dst_img_dir:
+            copies = [(images[stem], os.path.join(dst_img_dir, os.path.basename(images[stem])))
+                      for stem in survivors if stem in images]
+            report['missing_images'] = len(survivors) - len(copies)
+            report['images'] = copy_many(copies, fs, window=window, workers=workers)
+        report['seconds'] = round(time.perf_counter() - start, 2)
+        return report
+
+
+def print_report(report, examples=10):
+    """Print box and file counts of a pipeline run"""
+    print(f"  Label files: {report['files']} read, {report['written']} written, "
+          f"{report['empty']} left without boxes")
+    print(f"  Boxes: {report['boxes_in']} in, {report['boxes_out']} kept")
+    for reason, n in report['dropped'].most_common():
+        print(f"    ⚠️  {reason}: {n}")
+    for name in report['files_with_drops'][:examples]:
+        print(f"      {name}")
+    if len(report['files_with_drops']) > examples:
+        print(f"      ... and {len(report['files_with_drops']) - examples} more files")
+    if report['images'] or report['missing_images']:
+        print(f"  Images copied: {report['images']} ({report['missing_images']} labels without an image)")
+    print(f"  Time: {report['seconds']}s")
+
+
+def parse_mapping(text):
+    """'3:5,7:5' -> {3: 5, 7: 5}"""
+    return dict(tuple(int(v) for v in pair.split(':')) for pair in text.split(',') if pair)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Filter, remap and check YOLO labels in one pass',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Report out-of-bounds, malformed and tiny boxes without writing anything
+  python label_pipeline.py BRSSD/train/labels --images BRSSD/train/images --check-bounds --min-box-px 4
+
+  # Drop two classes, merge 7 into 5, and write labels plus their images
+  python label_pipeline.py cleaned_labels --images cleaned_images --exclude 0,1 --remap 7:5 \\
+      --check-bounds --out-labels fused_labels --out-images fused_images
+        """
+    )
+    parser.add_argument('labels', help='Source labels folder')
+    parser.add_argument('--images', type=str, default=None, help='Source images folder')
+    parser.add_argument('--out-labels', type=str, default=None, help='Write kept labels here')
+    parser.add_argument('--out-images', type=str, default=None, help='Copy images of kept labels here')
+    parser.add_argument('--exclude', type=str, default=None, help='Comma-separated class ids to drop')
+    parser.add_argument('--keep', type=str, default=None, help='Comma-separated class ids to keep (others dropped)')
+    parser.add_argument('--remap', type=str, default=None, help='old:new class id pairs, e.g. 7:5,8:5')
+    parser.add_argument('--check-bounds', action='store_true', help='Drop boxes outside [0, 1]')
+    parser.add_argument('--min-box-px', type=int, default=None, help='Drop boxes smaller than this (needs --images)')
+    parser.add_argument('--keep-empty', action='store_true', help='Write label files left without boxes')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.labels):
+        print(f"✗ Labels folder not found: {args.labels}")
+        return 1
+
+    pipeline = LabelPipeline(drop_empty=not args.keep_empty)
+    if args.exclude:
+        pipeline.add(exclude_classes(args.exclude.split(',')))
+    if args.keep:
+        pipeline.add(keep_classes(args.keep.split(',')))
+    if args.remap:
+        pipeline.add(remap_classes(parse_mapping(args.remap)))
+    if args.check_bounds:
+        pipeline.add(check_bounds())
+    if args.min_box_px:
+        pipeline.add(min_box_size(args.min_box_px))
+
+    report = pipeline.run(args.labels, args.out_labels, args.images, args.out_images)
+    print("\n" + "=" * 60)
+    print("LABEL PIPELINE" + ("" if args.out_labels else " (dry run)"))
+    print("=" * 60)
+    print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,102 +1,379 @@
 #!/usr/bin/env python3
 """
 Analyze YOLOv10 Traffic Sign Predictions
-Shows statistics about predicted traffic signs
+Streams prediction label files (or a JSONL file) through a process pool
+and reports class distribution, detections per image, confidences and
+box sizes as JSON
 """
 
 import os
-from collections import Counter
+import re
+import sys
 import json
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+CONF_BINS = 20    # confidence histogram: 0.05-wide bins over [0, 1]
+SIZE_BINS = 500   # box width/height/sqrt(area) histograms over [0, 1]
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+IMAGE_KEY = re.compile(r'"image"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+class PredictionStats:
+    """Mergeable counters for a set of prediction files"""
+
+    def __init__(self):
+        self.images = 0
+        self.empty_images = 0
+        self.detections = 0
+        self.missing_conf = 0
+        self.malformed = 0             # skipped rows or JSONL lines
+        self.unreadable = 0            # label files that could not be read
+        self.class_counts = Counter()
+        self.per_image = Counter()     # detections in an image -> number of images
+        self.conf_hist = [0] * CONF_BINS
+        self.class_conf_hist = {}      # class -> confidence histogram
+        self.size_hist = {'width': [0] * SIZE_BINS, 'height': [0] * SIZE_BINS,
+                          'sqrt_area': [0] * SIZE_BINS}
+
+    @staticmethod
+    def _bin(value, bins):
+        return min(bins - 1, max(0, int(value * bins)))
+
+    def add_image(self, detections):
+        """detections: iterable of (class_id, w, h, conf or None)"""
+        n = 0
+        for cls, w, h, conf in detections:
+            n += 1
+            self.class_counts[cls] += 1
+            if conf is None:
+                self.missing_conf += 1
+            else:
+                b = self._bin(conf, CONF_BINS)
+                self.conf_hist[b] += 1
+                self.class_conf_hist.setdefault(cls, [0] * CONF_BINS)[b] += 1
+            self.size_hist['width'][self._bin(w, SIZE_BINS)] += 1
+            self.size_hist['height'][self._bin(h, SIZE_BINS)] += 1
+            self.size_hist['sqrt_area'][self._bin(max(w * h, 0.0) ** 0.5, SIZE_BINS)] += 1
+        self.images += 1
+        self.detections += n
+        self.per_image[n] += 1
+        if n == 0:
+            self.empty_images += 1
+
+    def merge(self, other):
+        self.images += other.images
+        self.empty_images += other.empty_images
+        self.detections += other.detections
+        self.missing_conf += other.missing_conf
+        self.malformed += other.malformed
+        self.unreadable += other.unreadable
+        self.class_counts.update(other.class_counts)
+        self.per_image.update(other.per_image)
+        self.conf_hist = [a + b for a, b in zip(self.conf_hist, other.conf_hist)]
+        for cls, hist in other.class_conf_hist.items():
+            mine = self.class_conf_hist.setdefault(cls, [0] * CONF_BINS)
+            self.class_conf_hist[cls] = [a + b for a, b in zip(mine, hist)]
+        for key, hist in other.size_hist.items():
+            self.size_hist[key] = [a + b for a, b in zip(self.size_hist[key], hist)]
+        return self
+
+
+def parse_label_lines(lines, stats):
+    """
+    YOLO rows (class cx cy w h [conf]) -> list of detection tuples.
+
+    Rows that are not 5 or 6 numbers are skipped and counted in stats.malformed.
+    """
+    dets = []
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        try:
+            if len(parts) not in (5, 6):
+                raise ValueError
+            values = [float(v) for v in parts]
+        except ValueError:
+            stats.malformed += 1
+            continue
+        dets.append((int(values[0]), values[3], values[4], values[5] if len(values) == 6 else None))
+    return dets
+
+
+def stats_for_files(paths):
+    """Worker: aggregate a chunk of label files"""
+    stats = PredictionStats()
+    for path in paths:
+        try:
+            with open(path) as f:
+                lines = f.readlines()
+        except (OSError, UnicodeDecodeError):
+            stats.unreadable += 1
+            continue
+        stats.add_image(parse_label_lines(lines, stats))
+    return stats
+
+
+def parse_detection(d):
+    """(class_id, w, h, conf or None) of one JSONL detection; ValueError if malformed"""
+    try:
+        conf = d.get('conf')
+        return int(d['class']), float(d['box'][2]), float(d['box'][3]), None if conf is None else float(conf)
+    except (KeyError, IndexError, TypeError) as e:
+        raise ValueError(e)
+
+
+def stats_for_jsonl(lines):
+    """Worker: aggregate a chunk of JSONL lines (one image or one detection per line)"""
+    stats = PredictionStats()
+    images = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            dets = record.get('detections')
+            if dets is None:
+                dets = [record] if 'box' in record else []
+            parsed = []
+            for d in dets:
+                try:
+                    parsed.append(parse_detection(d))
+                except ValueError:
+                    stats.malformed += 1
+        except (ValueError, AttributeError, TypeError):
+            # Not JSON, or not an object with a list of detections
+            stats.malformed += 1
+            continue
+        images.setdefault(record.get('image'), []).extend(parsed)
+    for dets in images.values():
+        stats.add_image(dets)
+    return stats
+
+
+def iter_label_chunks(labels_dir, chunk_size):
+    """Lists of label file paths, streamed from os.scandir without a full listing"""
+    chunk = []
+    with os.scandir(labels_dir) as it:
+        for entry in it:
+            if entry.name.endswith('.txt') and entry.is_file():
+                chunk.append(entry.path)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_jsonl_chunks(source, chunk_size):
+    """Lists of JSONL lines from a file or stdin ('-'), never splitting one image's lines"""
+    f = sys.stdin if str(source) == '-' else open(source)
+    try:
+        chunk, last_image = [], None
+        for line in f:
+            match = IMAGE_KEY.search(line)
+            image = match.group(1) if match else None
+            # Per-detection records of one image must reach the same worker
+            if len(chunk) >= chunk_size and image != last_image:
+                yield chunk
+                chunk = []
+            chunk.append(line)
+            last_image = image
+        if chunk:
+            yield chunk
+    finally:
+        if f is not sys.stdin:
+            f.close()
 
-def analyze_predictions():
-    """Analyze prediction results in the predict folder"""
-    
-    labels_dir = "labels"
-    images_dir = "."
-    
-    # Count images and labels
-    images = [f for f in os.listdir(images_dir) if f.endswith('.jpg')]
-    labels = [f for f in os.listdir(labels_dir) if f.endswith('.txt')]
-    
+
+def count_images(images_dir):
+    """Number of image files in a directory (streamed)"""
+    if not images_dir or not Path(images_dir).is_dir():
+        return None
+    with os.scandir(images_dir) as it:
+        return sum(1 for e in it if e.name.lower().endswith(IMAGE_EXTENSIONS) and e.is_file())
+
+
+def aggregate(source, workers=None, chunk_size=2000):
+    """Stream source through a process pool and merge the partial statistics"""
+    source = Path(source) if str(source) != '-' else source
+    if source != '-' and Path(source).is_dir():
+        chunks, worker = iter_label_chunks(source, chunk_size), stats_for_files
+    else:
+        chunks, worker = iter_jsonl_chunks(source, chunk_size), stats_for_jsonl
+
+    total = PredictionStats()
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2  # bounded, so chunks are read only as fast as they are processed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in chunks:
+            pending.add(pool.submit(worker, chunk))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total.merge(future.result())
+        for future in pending:
+            total.merge(future.result())
+    return total
+
+
+def hist_quantiles(hist, quantiles=QUANTILES):
+    """Approximate quantiles (bin centres) of a [0, 1] histogram"""
+    total = sum(hist)
+    if total == 0:
+        return {}
+    out, cum, i = {}, 0, 0
+    for q in quantiles:
+        target = q * total
+        while i < len(hist) - 1 and cum + hist[i] < target:
+            cum += hist[i]
+            i += 1
+        out[f"p{int(q * 100)}"] = round((i + 0.5) / len(hist), 4)
+    return out
+
+
+def build_report(stats, total_images=None, names=None):
+    """JSON-serializable report"""
+    names = names or {}
+    conf_edges = [round(i / CONF_BINS, 3) for i in range(CONF_BINS + 1)]
+    return {
+        'images': {
+            'total': total_images,
+            'with_prediction_file': stats.images,
+            'without_prediction_file': (total_images - stats.images) if total_images is not None else None,
+            'with_detections': stats.images - stats.empty_images,
+        },
+        'detections': {
+            'total': stats.detections,
+            'per_image_mean': round(stats.detections / stats.images, 4) if stats.images else 0.0,
+            'per_image_histogram': {str(k): v for k, v in sorted(stats.per_image.items())},
+            'missing_confidence': stats.missing_conf,
+            'malformed_rows': stats.malformed,
+            'unreadable_files': stats.unreadable,
+        },
+        'classes': [
+            {'class': cls, 'name': names.get(cls, str(cls)), 'count': n,
+             'fraction': round(n / stats.detections, 5) if stats.detections else 0.0}
+            for cls, n in stats.class_counts.most_common()
+        ],
+        'confidence': {
+            'bin_edges': conf_edges,
+            'histogram': stats.conf_hist,
+            'per_class': {str(c): h for c, h in sorted(stats.class_conf_hist.items())},
+        },
+        'box_size_quantiles': {key: hist_quantiles(h) for key, h in stats.size_hist.items()},
+    }
+
+
+def print_report(report):
+    """Human-readable summary"""
+    imgs, dets = report['images'], report['detections']
     print("=" * 60)
     print("TRAFFIC SIGN PREDICTION ANALYSIS")
     print("=" * 60)
     print(f"\n📊 Dataset Overview:")
-    print(f"  • Total images: {len(images)}")
-    print(f"  • Images with labels: {len(labels)}")
-    print(f"  • Images without labels: {len(images) - len(labels)}")
-    print(f"  • Coverage: {len(labels)/len(images)*100:.1f}%")
-    
-    # Analyze class distribution
-    class_counts = Counter()
-    total_detections = 0
-    multi_object_images = 0
-    
-    for label_file in labels:
-        label_path = os.path.join(labels_dir, label_file)
-        with open(label_path, 'r') as f:
-            lines = f.readlines()
-            if len(lines) > 1:
-                multi_object_images += 1
-            for line in lines:
-                parts = line.strip().split()
-                if len(parts) >= 5:
-                    class_id = int(parts[0])
-                    class_counts[class_id] += 1
-                    total_detections += 1
-    
+    if imgs['total'] is not None:
+        print(f"  • Total images: {imgs['total']}")
+        coverage = imgs['with_prediction_file'] / imgs['total'] * 100 if imgs['total'] else 0.0
+        print(f"  • Images with labels: {imgs['with_prediction_file']} ({coverage:.1f}%)")
+    else:
+        print(f"  • Images with labels: {imgs['with_prediction_file']}")
+
     print(f"\n🎯 Detection Statistics:")
-    print(f"  • Total detections: {total_detections}")
-    print(f"  • Average detections per image: {total_detections/len(labels):.2f}")
-    print(f"  • Images with multiple signs: {multi_object_images}")
-    print(f"  • Unique traffic sign classes: {len(class_counts)}")
-    
-    print(f"\n🚦 Traffic Sign Class Distribution:")
-    print(f"  {'Class ID':<12} {'Count':<8} {'Percentage':<12} {'Bar'}")
-    print(f"  {'-'*12} {'-'*8} {'-'*12} {'-'*30}")
-    
-    for class_id, count in sorted(class_counts.items(), key=lambda x: x[1], reverse=True):
-        percentage = (count / total_detections) * 100
-        bar = '█' * int(percentage / 2)
-        print(f"  Class {class_id:<6} {count:<8} {percentage:>6.2f}%      {bar}")
-    
-    # Sample detections
-    print(f"\n📝 Sample Predictions:")
-    sample_count = 0
-    for label_file in sorted(labels)[:3]:
-        if sample_count >= 3:
-            break
-        label_path = os.path.join(labels_dir, label_file)
-        image_name = label_file.replace('.txt', '.jpg')
-        print(f"\n  Image: {image_name}")
-        with open(label_path, 'r') as f:
-            for i, line in enumerate(f.readlines(), 1):
-                parts = line.strip().split()
-                if len(parts) >= 5:
-                    class_id, x, y, w, h = parts[0], parts[1], parts[2], parts[3], parts[4]
-                    print(f"    Detection {i}: Class {class_id} at ({x}, {y}) size ({w}, {h})")
-        sample_count += 1
-    
-    # Class mapping suggestion
-    print(f"\n💡 Class ID Mapping (examples based on common traffic signs):")
-    class_mapping = {
-        22: "Speed limit or regulatory sign",
-        23: "Warning sign",
-        26: "Priority/give way sign",
-        28: "Information sign",
-        29: "Direction sign",
-        32: "Parking or stop sign",
-        35: "Pedestrian crossing sign",
-        36: "General warning/caution sign"
-    }
-    
-    for class_id, description in class_mapping.items():
-        if class_id in class_counts:
-            print(f"  Class {class_id}: {description}")
-    
-    print(f"\n{'='*60}")
-    print(f"Note: Exact sign meanings require the original class.yaml file")
-    print(f"{'='*60}\n")
+    print(f"  • Total detections: {dets['total']}")
+    print(f"  • Average detections per image: {dets['per_image_mean']:.2f}")
+    multi = sum(v for k, v in dets['per_image_histogram'].items() if int(k) > 1)
+    print(f"  • Images with multiple signs: {multi}")
+    print(f"  • Unique traffic sign classes: {len(report['classes'])}")
+    if dets['missing_confidence']:
+        print(f"  • Detections without confidence: {dets['missing_confidence']}")
+    if dets['malformed_rows']:
+        print(f"  ⚠️  Skipped malformed rows: {dets['malformed_rows']}")
+    if dets['unreadable_files']:
+        print(f"  ⚠️  Unreadable prediction files: {dets['unreadable_files']}")
+
+    if report['classes']:
+        print(f"\n🚦 Traffic Sign Class Distribution:")
+        print(f"  {'Class':<24} {'Count':<8} {'Percentage':<12} {'Bar'}")
+        print(f"  {'-'*24} {'-'*8} {'-'*12} {'-'*30}")
+        for c in report['classes']:
+            percentage = c['fraction'] * 100
+            print(f"  {c['name'][:24]:<24} {c['count']:<8} {percentage:>6.2f}%      {'█' * int(percentage / 2)}")
+
+    q = report['box_size_quantiles'].get('sqrt_area')
+    if q:
+        print(f"\n📐 Box size (sqrt of normalized area): "
+              + ", ".join(f"{k}={v:.3f}" for k, v in q.items()))
+    print(f"\n{'='*60}\n")
+
+
+def load_names(data_yaml):
+    if not data_yaml:
+        return None
+    import yaml
+    with open(data_yaml) as f:
+        names = yaml.safe_load(f).get('names') or {}
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    return {int(k): v for k, v in names.items()}
+
+
+def analyze_predictions(source=None, images_dir=None, workers=None, chunk_size=2000, data_yaml=None):
+    """Aggregate prediction statistics; defaults to the labels next to this script"""
+    source = source or SCRIPT_DIR / 'labels'
+    if images_dir is None and str(source) != '-' and Path(source).is_dir():
+        images_dir = Path(source).parent  # predict/ layout: images beside labels/
+    stats = aggregate(source, workers=workers, chunk_size=chunk_size)
+    return build_report(stats, count_images(images_dir), load_names(data_yaml))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Aggregate statistics over YOLO prediction files or a JSONL stream',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python analyze_predictions.py                          # predict/labels
+  python analyze_predictions.py runs/brssd_predict/labels --out stats.json
+  python analyze_predictions.py runs/brssd_predict/predictions.jsonl --workers 8
+  cat predictions.jsonl | python analyze_predictions.py - --json
+        """
+    )
+    parser.add_argument('source', nargs='?', default=None,
+                        help="Label directory, JSONL file or '-' for stdin (default: labels/ next to this script)")
+    parser.add_argument('--images', type=str, default=None,
+                        help='Image directory for coverage (default: parent of the label directory)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Files or lines per task')
+    parser.add_argument('--data', type=str, default=None, help='Dataset YAML for class names')
+    parser.add_argument('--out', type=str, default=None, help='Write the JSON report to this file')
+    parser.add_argument('--json', action='store_true', help='Print the JSON report instead of the summary')
+    args = parser.parse_args()
+
+    source = args.source or SCRIPT_DIR / 'labels'
+    if str(source) != '-' and not Path(source).exists():
+        print(f"✗ Not found: {source}")
+        return 1
+
+    report = analyze_predictions(source, args.images, args.workers, args.chunk_size, args.data)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report saved to: {args.out}")
+    return 0
+
 
 if __name__ == "__main__":
-    analyze_predictions()
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+HTML Review Gallery for YOLOv10 Predictions
+Builds static, paginated pages of lazy-loaded WebP thumbnails; boxes are
+drawn in the browser from compact JSON, so originals are never re-encoded
+"""
+
+import os
+import sys
+import json
+import argparse
+from multiprocessing import Pool
+
+from PIL import Image
+
+from visualize_predictions import CLASS_COLORS, CLASS_NAMES
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+STATE_FILE = 'thumbs.json'
+
+CSS = """body { font-family: sans-serif; background: #181818; color: #ddd; margin: 12px; }
+nav { margin: 8px 0; } nav a { color: #8cf; margin-right: 8px; }
+#grid { display: flex; flex-wrap: wrap; gap: 6px; }
+.tile { position: relative; display: block; line-height: 0; }
+.tile img { display: block; background: #333; }
+.box { position: absolute; border: 2px solid; box-sizing: border-box; pointer-events: none; }
+.box span { position: absolute; top: -14px; left: -2px; font-size: 10px; line-height: 12px;
+            padding: 0 2px; color: #000; white-space: nowrap; }
+.tile.empty { outline: 1px dashed #555; }
+"""
+
+JS = """const page = JSON.parse(document.getElementById('data').textContent);
+const grid = document.getElementById('grid');
+const slider = document.getElementById('conf');
+function color(c) {
+  const rgb = page.colors[c];
+  return rgb ? `rgb(${rgb.join(',')})` : `hsl(${(c * 47) % 360}, 90%, 55%)`;
+}
+for (const [name, w, h, dets] of page.items) {
+  const a = document.createElement('a');
+  a.className = dets.length ? 'tile' : 'tile empty';
+  a.href = page.base + name;
+  a.title = name;
+  const img = document.createElement('img');
+  img.loading = 'lazy'; img.width = w; img.height = h;
+  img.src = 'thumbs/' + name + '.webp';
+  a.appendChild(img);
+  for (const [c, x, y, bw, bh, p] of dets) {
+    const b = document.createElement('div');
+    b.className = 'box';
+    b.dataset.conf = p;
+    b.style.left = (x - bw / 2) * 100 + '%'; b.style.top = (y - bh / 2) * 100 + '%';
+    b.style.width = bw * 100 + '%'; b.style.height = bh * 100 + '%';
+    b.style.borderColor = color(c);
+    const label = document.createElement('span');
+    label.style.background = color(c);
+    label.textContent = (page.names[c] || c) + (p < 1 ? ' ' + p.toFixed(2) : '');
+    b.appendChild(label);
+    a.appendChild(b);
+  }
+  grid.appendChild(a);
+}
+function filter() {
+  document.getElementById('conf-value').textContent = slider.value;
+  for (const b of document.querySelectorAll('.box'))
+    b.style.display = parseFloat(b.dataset.conf) >= parseFloat(slider.value) ? '' : 'none';
+}
+slider.addEventListener('input', filter);
+"""
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<link rel="stylesheet" href="gallery.css"></head>
+<body>
+<h3>{title}</h3>
+<nav>{nav}</nav>
+<label>Min confidence <input id="conf" type="range" min="0" max="1" step="0.05" value="0">
+<span id="conf-value">0</span></label>
+<div id="grid"></div>
+<nav>{nav}</nav>
+<script id="data" type="application/json">{data}</script>
+<script src="gallery.js"></script>
+</body></html>
+"""
+
+
+def page_name(page):
+    return 'index.html' if page == 0 else f"page{page + 1}.html"
+
+
+def thumb_name(name):
+    """Thumbnail file of an image; the extension is kept so a.jpg and a.png do not collide"""
+    return f"{name}.webp"
+
+
+def read_detections(label_path):
+    """[[class, x, y, w, h, conf]] from a YOLO label file (conf 1 when absent)"""
+    dets = []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 5:
+                    conf = float(parts[5]) if len(parts) > 5 else 1.0
+                    dets.append([int(parts[0])] + [round(float(v), 4) for v in parts[1:5]]
+                                + [round(conf, 3)])
+    return dets
+
+
+def _thumbnail_task(task):
+    """Worker: write one WebP thumbnail; returns (name, width, height, error)"""
+    name, image_path, thumb_path, size, quality = task
+    try:
+        img = Image.open(image_path)
+        img.draft('RGB', (size, size))
+        img = img.convert('RGB')
+        img.thumbnail((size, size))
+        tmp_path = thumb_path + '.tmp'
+        img.save(tmp_path, format='WEBP', quality=quality, method=4)
+        os.replace(tmp_path, thumb_path)
+        return name, img.width, img.height, None
+    except Exception as e:
+        return name, None, None, f"{image_path}: {e}"
+
+
+def write_if_changed(path, text):
+    """Write text unless the file already holds exactly that; True if written"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+def build_gallery(images_dir=".", labels_dir="labels", output_dir="gallery", per_page=500,
+                  thumb_size=320, quality=75, only_detected=False, workers=None):
+    """
+    Build or refresh the gallery in output_dir.
+
+    Thumbnails are remade only for images whose mtime changed since the last
+    run (all of them if thumb_size or quality changed), and a page file is
+    rewritten only if its contents differ.
+    """
+    thumbs_dir = os.path.join(output_dir, 'thumbs')
+    os.makedirs(thumbs_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    settings = {'thumb_size': thumb_size, 'quality': quality}
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            saved = json.load(f)
+        if saved.get('settings') == settings:
+            state = saved['thumbs']
+
+    with os.scandir(images_dir) as it:
+        images = sorted((e.name, e.path, e.stat().st_mtime_ns) for e in it
+                        if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS))
+
+    items, tasks, mtimes = [], [], {}
+    for name, path, mtime in images:
+        dets = read_detections(os.path.join(labels_dir, os.path.splitext(name)[0] + '.txt'))
+        if only_detected and not dets:
+            continue
+        items.append((name, dets))
+        mtimes[name] = mtime
+        thumb_path = os.path.join(thumbs_dir, thumb_name(name))
+        cached = state.get(name)
+        if cached is None or cached[2] != mtime or not os.path.exists(thumb_path):
+            tasks.append((name, path, thumb_path, thumb_size, quality))
+
+    # thumbs: {image name: [thumb width, thumb height, image mtime_ns]}
+    state = {name: v for name, v in state.items() if name in mtimes}
+    errors = []
+    if tasks:
+        with Pool(processes=workers or os.cpu_count()) as pool:
+            for name, w, h, error in pool.imap_unordered(_thumbnail_task, tasks, chunksize=8):
+                if error:
+                    errors.append(error)
+                    state.pop(name, None)
+                else:
+                    state[name] = [w, h, mtimes[name]]
+    with open(state_path, 'w') as f:
+        json.dump({'settings': settings, 'thumbs': state}, f, separators=(',', ':'))
+
+    # Thumbnails of images that are gone (or of an older naming scheme)
+    wanted = {thumb_name(name) for name in state}
+    with os.scandir(thumbs_dir) as it:
+        for entry in it:
+            if entry.name not in wanted:
+                os.remove(entry.path)
+
+    items = [(name, dets) for name, dets in items if name in state]
+    base = os.path.relpath(images_dir, output_dir).replace(os.sep, '/') + '/'
+    write_if_changed(os.path.join(output_dir, 'gallery.css'), CSS)
+    write_if_changed(os.path.join(output_dir, 'gallery.js'), JS)
+
+    n_pages = max(1, (len(items) + per_page - 1) // per_page)
+    nav = ' '.join(f'<a href="{page_name(p)}">{p + 1}</a>' for p in range(n_pages)) if n_pages > 1 else ''
+    pages_written = 0
+    for p in range(n_pages):
+        chunk = items[p * per_page:(p + 1) * per_page]
+        data = {
+            'base': base,
+            'names': CLASS_NAMES,
+            'colors': CLASS_COLORS,
+            'items': [[name, state[name][0], state[name][1], dets] for name, dets in chunk],
+        }
+        html = PAGE.format(title=f"Predictions {p * per_page + 1}-{p * per_page + len(chunk)} of {len(items)}",
+                           nav=nav, data=json.dumps(data, separators=(',', ':')).replace('</', '<\\/'))
+        pages_written += write_if_changed(os.path.join(output_dir, page_name(p)), html)
+
+    # Pages left over from a larger previous run
+    p = n_pages
+    while os.path.exists(os.path.join(output_dir, page_name(p))):
+        os.remove(os.path.join(output_dir, page_name(p)))
+        p += 1
+
+    return {'images': len(items), 'thumbnails': len(tasks) - len(errors), 'pages': n_pages,
+            'pages_written': pages_written, 'errors': errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build a lazy-loading HTML gallery of predictions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # From the predict/ folder: gallery/index.html over all images
+  python build_gallery.py
+
+  # Prediction CLI output, only images with detections, 1000 per page
+  python build_gallery.py --images ../BRSSD/test/images --labels ../runs/brssd_predict/labels \\
+                          --out ../runs/brssd_predict/gallery --only-detected --per-page 1000
+
+Re-running only re-encodes thumbnails of changed images, or all of them
+after a --thumb-size or --quality change.
+        """
+    )
+    parser.add_argument('--images', type=str, default='.', help='Folder with the original images')
+    parser.add_argument('--labels', type=str, default='labels', help='Folder with prediction label files')
+    parser.add_argument('--out', type=str, default='gallery', help='Output folder')
+    parser.add_argument('--per-page', type=int, default=500, help='Images per page')
+    parser.add_argument('--thumb-size', type=int, default=320, help='Longest thumbnail side in pixels')
+    parser.add_argument('--quality', type=int, default=75, help='WebP quality')
+    parser.add_argument('--only-detected', action='store_true', help='Skip images without detections')
+    parser.add_argument('--workers', type=int, default=None, help='Thumbnail processes (default: all cores)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.images):
+        print(f"✗ Images folder not found: {args.images}")
+        return 1
+
+    summary = build_gallery(args.images, args.labels, args.out, per_page=args.per_page,
+                            thumb_size=args.thumb_size, quality=args.quality,
+                            only_detected=args.only_detected, workers=args.workers)
+    for error in summary['errors']:
+        print(f"⚠️  {error}")
+    print(f"✅ Gallery: {summary['images']} images on {summary['pages']} page(s), "
+          f"{summary['thumbnails']} thumbnails made, {summary['pages_written']} page(s) rewritten")
+    print(f"   Open {os.path.join(args.out, 'index.html')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
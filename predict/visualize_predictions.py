@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 """
 Visualize YOLOv10 Traffic Sign Predictions
-Draws bounding boxes on images with class labels
+Draws bounding boxes on images with class labels; image and label
+folders may be inside zip archives (predict.zip/labels) or an image
+store (BRSSD.imgdb/valid/labels)
 """
 
+import io
 import os
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import sys
+import queue
+import threading
+from functools import lru_cache
+from multiprocessing import Pool
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from drive_io import split_archive
+from image_store import StoreFileSystem, split_store
+from label_index import open_index
+
+FS = StoreFileSystem()
+
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# Contact sheets with at most this many images make their thumbnails without a process pool
+INLINE_THUMBNAILS = 16
+
 # Class mapping (estimated from analysis)
 CLASS_NAMES = {
     22: "Speed Limit",
@@ -34,55 +53,65 @@ CLASS_COLORS = {
     36: (0, 255, 0)       # Green
 }
 
+@lru_cache(maxsize=None)
+def get_font(size=20):
+    """Load the label font once per process"""
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+def open_image(image_path):
+    """PIL image from a file, a zip archive member or an image store"""
+    return Image.open(io.BytesIO(FS.read_bytes(str(image_path))))
+
+def read_labels(label_path):
+    """YOLO label rows as (class_id, x_center, y_center, width, height) tuples"""
+    boxes = []
+    if FS.exists(label_path):
+        for line in FS.read_bytes(str(label_path)).decode().splitlines():
+            parts = line.split()
+            if len(parts) >= 5:
+                boxes.append((int(parts[0]), float(parts[1]), float(parts[2]),
+                              float(parts[3]), float(parts[4])))
+    return boxes
+
+def draw_labels(img, boxes, font):
+    """Draw YOLO boxes with class labels onto a PIL image in place"""
+    w, h = img.size
+    draw = ImageDraw.Draw(img)
+    for class_id, x_center, y_center, width, height in boxes:
+        # Convert YOLO format to pixel coordinates
+        x1 = int((x_center - width/2) * w)
+        y1 = int((y_center - height/2) * h)
+        x2 = int((x_center + width/2) * w)
+        y2 = int((y_center + height/2) * h)
+        
+        # Get class name and color
+        class_name = CLASS_NAMES.get(class_id, f"Class {class_id}")
+        color = CLASS_COLORS.get(class_id, (255, 255, 255))
+        
+        # Draw bounding box
+        draw.rectangle([x1, y1, x2, y2], outline=color, width=3)
+        
+        # Draw label background and text
+        label_text = f"{class_name}"
+        bbox = draw.textbbox((x1, y1), label_text, font=font)
+        draw.rectangle([bbox[0]-2, bbox[1]-2, bbox[2]+2, bbox[3]+2], fill=color)
+        draw.text((x1, y1-20), label_text, fill=(255, 255, 255), font=font)
+    return img
+
 def draw_boxes_on_image(image_path, label_path, output_path=None):
     """Draw bounding boxes on a single image"""
     
     # Read image
     try:
-        img = Image.open(image_path).convert('RGB')
+        img = open_image(image_path).convert('RGB')
     except Exception as e:
         print(f"Error: Could not read {image_path}: {e}")
         return None
     
-    w, h = img.size
-    draw = ImageDraw.Draw(img)
-    
-    # Try to load font
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)
-    except:
-        font = ImageFont.load_default()
-    
-    # Read labels if they exist
-    if os.path.exists(label_path):
-        with open(label_path, 'r') as f:
-            for line in f.readlines():
-                parts = line.strip().split()
-                if len(parts) >= 5:
-                    class_id = int(parts[0])
-                    x_center = float(parts[1])
-                    y_center = float(parts[2])
-                    width = float(parts[3])
-                    height = float(parts[4])
-                    
-                    # Convert YOLO format to pixel coordinates
-                    x1 = int((x_center - width/2) * w)
-                    y1 = int((y_center - height/2) * h)
-                    x2 = int((x_center + width/2) * w)
-                    y2 = int((y_center + height/2) * h)
-                    
-                    # Get class name and color
-                    class_name = CLASS_NAMES.get(class_id, f"Class {class_id}")
-                    color = CLASS_COLORS.get(class_id, (255, 255, 255))
-                    
-                    # Draw bounding box
-                    draw.rectangle([x1, y1, x2, y2], outline=color, width=3)
-                    
-                    # Draw label background and text
-                    label_text = f"{class_name}"
-                    bbox = draw.textbbox((x1, y1), label_text, font=font)
-                    draw.rectangle([bbox[0]-2, bbox[1]-2, bbox[2]+2, bbox[3]+2], fill=color)
-                    draw.text((x1, y1-20), label_text, fill=(255, 255, 255), font=font)
+    draw_labels(img, read_labels(label_path), get_font())
     
     # Save or return image
     if output_path:
@@ -91,125 +120,224 @@ def draw_boxes_on_image(image_path, label_path, output_path=None):
     
     return img
 
-def visualize_grid(num_images=9, save_output=True):
+def make_thumbnail(image_path, label_path, size=256):
+    """Downscaled image as a uint8 array with its boxes drawn directly on the pixels"""
+    img = open_image(image_path)
+    img.draft('RGB', (size, size))  # JPEG: decode at reduced scale
+    img = img.convert('RGB')
+    img.thumbnail((size, size))
+    arr = np.asarray(img).copy()
+    h, w = arr.shape[:2]
+    t = max(1, size // 128)  # line thickness
+    for class_id, xc, yc, bw, bh in read_labels(label_path):
+        color = CLASS_COLORS.get(class_id, (255, 255, 255))
+        x1 = min(max(int((xc - bw/2) * w), 0), w - 1)
+        y1 = min(max(int((yc - bh/2) * h), 0), h - 1)
+        x2 = min(max(int((xc + bw/2) * w), 0), w - 1)
+        y2 = min(max(int((yc + bh/2) * h), 0), h - 1)
+        arr[y1:y1+t, x1:x2+1] = color
+        arr[max(y2-t+1, 0):y2+1, x1:x2+1] = color
+        arr[y1:y2+1, x1:x1+t] = color
+        arr[y1:y2+1, max(x2-t+1, 0):x2+1] = color
+    return arr
+
+def _thumbnail_task(task):
+    image_path, label_path, size = task
+    try:
+        return make_thumbnail(image_path, label_path, size)
+    except Exception as e:
+        print(f"Error: Could not read {image_path}: {e}")
+        return None
+
+def page_path(output_file, page):
+    """predictions_grid.png, predictions_grid_p2.png, ..."""
+    if page == 0:
+        return output_file
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_p{page + 1}{ext}"
+
+def contact_sheet(items, output_file, cols=None, tile=256, per_page=100, pad=4, workers=None):
+    """
+    Composite (image, label) pairs into paginated thumbnail mosaics.
+
+    Thumbnails are made in a process pool (inline for a handful of images)
+    and pasted into one preallocated canvas per page, which is encoded once.
+    A text file next to each page lists its images in tile order.
+    """
+    if not items:
+        return []
+    cols = cols or min(10, max(1, int(np.ceil(np.sqrt(min(len(items), per_page))))))
+    pages = []
+    tasks = [(img, lbl, tile) for img, lbl in items]
+    # Starting worker processes costs more than a few thumbnails
+    inline = len(items) <= INLINE_THUMBNAILS
+    pool = None if inline else Pool(processes=min(workers or os.cpu_count(), len(items)))
+    try:
+        for start in range(0, len(items), per_page):
+            page_items = items[start:start + per_page]
+            rows = (len(page_items) + cols - 1) // cols
+            canvas = np.full((rows * (tile + pad) + pad, cols * (tile + pad) + pad, 3), 24, dtype=np.uint8)
+            page_tasks = tasks[start:start + per_page]
+            thumbs = map(_thumbnail_task, page_tasks) if inline else \
+                pool.imap(_thumbnail_task, page_tasks, chunksize=4)
+            for idx, thumb in enumerate(thumbs):
+                if thumb is None:
+                    continue
+                r, c = divmod(idx, cols)
+                h, w = thumb.shape[:2]
+                y = pad + r * (tile + pad) + (tile - h) // 2
+                x = pad + c * (tile + pad) + (tile - w) // 2
+                canvas[y:y+h, x:x+w] = thumb
+            
+            out = page_path(output_file, start // per_page)
+            Image.fromarray(canvas).save(out)
+            with open(os.path.splitext(out)[0] + '.txt', 'w') as f:
+                f.write('\n'.join(os.path.basename(img) for img, _ in page_items) + '\n')
+            pages.append(out)
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return pages
+
+def visualize_grid(num_images=9, save_output=True, labels_dir="labels", images_dir=".",
+                   tile=256, per_page=100):
     """Create a grid visualization of predictions"""
     
-    labels_dir = "labels"
-    images_dir = "."
-    
     # Get images with labels
     labeled_images = []
-    for label_file in sorted(os.listdir(labels_dir)):
+    for label_file in sorted(FS.listdir(labels_dir)):
         if label_file.endswith('.txt'):
             image_name = label_file.replace('.txt', '.jpg')
             image_path = os.path.join(images_dir, image_name)
-            if os.path.exists(image_path):
+            if FS.exists(image_path):
                 labeled_images.append((image_path, os.path.join(labels_dir, label_file)))
     
-    # Create grid
-    rows = int(num_images ** 0.5)
-    cols = (num_images + rows - 1) // rows
-    
-    fig, axes = plt.subplots(rows, cols, figsize=(20, 20))
-    axes = axes.flatten() if num_images > 1 else [axes]
-    
-    for idx, ax in enumerate(axes):
-        if idx < len(labeled_images) and idx < num_images:
-            img_path, label_path = labeled_images[idx]
-            
-            # Draw boxes
-            img = draw_boxes_on_image(img_path, label_path)
-            
-            if img is not None:
-                ax.imshow(img)
-                ax.set_title(os.path.basename(img_path), fontsize=8)
-                ax.axis('off')
-        else:
-            ax.axis('off')
-    
-    plt.tight_layout()
-    
-    if save_output:
-        output_file = "predictions_grid.png"
-        plt.savefig(output_file, dpi=150, bbox_inches='tight')
-        print(f"\n✅ Saved grid visualization: {output_file}")
-    
-    plt.close()
+    if not save_output:
+        return
+    pages = contact_sheet(labeled_images[:num_images], "predictions_grid.png", tile=tile, per_page=per_page)
+    for page in pages:
+        print(f"\n✅ Saved grid visualization: {page}")
 
-def visualize_by_class(class_id, max_images=6):
-    """Visualize all predictions for a specific class"""
-    
-    labels_dir = "labels"
-    images_dir = "."
+def visualize_by_class(class_id, max_images=6, labels_dir="labels", images_dir=".",
+                       tile=256, per_page=100, index=None):
+    """Visualize predictions for a specific class, found through the label index"""
     
     # Find images containing this class
+    if index is None:
+        index = open_index(labels_dir)
     class_images = []
-    for label_file in sorted(os.listdir(labels_dir)):
-        if label_file.endswith('.txt'):
-            label_path = os.path.join(labels_dir, label_file)
-            with open(label_path, 'r') as f:
-                for line in f.readlines():
-                    parts = line.strip().split()
-                    if len(parts) >= 5 and int(parts[0]) == class_id:
-                        image_name = label_file.replace('.txt', '.jpg')
-                        image_path = os.path.join(images_dir, image_name)
-                        if os.path.exists(image_path):
-                            class_images.append((image_path, label_path))
-                        break
+    for label_path, _ in index.lookup(class_id):
+        image_path = os.path.join(images_dir, label_path.stem + '.jpg')
+        if FS.exists(image_path):
+            class_images.append((image_path, str(label_path)))
+            if len(class_images) == max_images:
+                break
     
     if not class_images:
         print(f"No images found for class {class_id}")
         return
     
-    # Create grid
-    num_images = min(len(class_images), max_images)
-    rows = 2
-    cols = (num_images + 1) // 2
-    
-    fig, axes = plt.subplots(rows, cols, figsize=(15, 10))
-    axes = axes.flatten() if num_images > 1 else [axes]
-    
     class_name = CLASS_NAMES.get(class_id, f"Class {class_id}")
-    fig.suptitle(f"Traffic Sign Class: {class_name} (ID: {class_id})", fontsize=16, fontweight='bold')
-    
-    for idx, ax in enumerate(axes):
-        if idx < len(class_images):
-            img_path, label_path = class_images[idx]
-            img = draw_boxes_on_image(img_path, label_path)
-            
-            if img is not None:
-                ax.imshow(img)
-                ax.set_title(os.path.basename(img_path), fontsize=8)
-                ax.axis('off')
-        else:
-            ax.axis('off')
-    
-    plt.tight_layout()
     output_file = f"class_{class_id}_{class_name.replace('/', '_')}.png"
-    plt.savefig(output_file, dpi=150, bbox_inches='tight')
-    print(f"✅ Saved class visualization: {output_file}")
-    plt.close()
+    for page in contact_sheet(class_images[:max_images], output_file, tile=tile, per_page=per_page):
+        print(f"✅ Saved class visualization: {page}")
+
+def _init_render_worker(font_size):
+    """Pool initializer: load the font once per worker process"""
+    global _WORKER_FONT
+    _WORKER_FONT = get_font(font_size)
+
+def _render_task(task):
+    """Worker: annotate one image and return its encoded bytes"""
+    image_path, label_path, output_path = task
+    try:
+        img = open_image(image_path).convert('RGB')
+        draw_labels(img, read_labels(label_path), _WORKER_FONT)
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=90)
+        return output_path, buf.getvalue(), None
+    except Exception as e:
+        return output_path, None, f"{image_path}: {e}"
+
+def _write_outputs(write_queue, errors):
+    """Writer thread: drain the bounded queue and write files atomically"""
+    while True:
+        item = write_queue.get()
+        if item is None:
+            break
+        output_path, data = item
+        try:
+            tmp_path = output_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, output_path)
+        except OSError as e:
+            errors.append(f"{output_path}: {e}")
 
-def create_individual_visualizations(output_dir="visualized"):
+def is_up_to_date(output_path, *inputs):
+    """True if output exists and is newer than every existing input (or the archive/store holding it)"""
+    try:
+        out_mtime = os.stat(output_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    inputs = [split_archive(p)[0] or split_store(p)[0] or p for p in inputs]
+    return all(os.stat(p).st_mtime_ns <= out_mtime for p in inputs if os.path.exists(p))
+
+def render_batch(tasks, workers=None, queue_size=64, font_size=20):
+    """
+    Render (image, label, output) tasks in a process pool.
+
+    Workers return encoded JPEGs; a single writer thread saves them through
+    a bounded queue, so a slow disk holds back rendering instead of letting
+    finished images pile up in memory.
+    """
+    write_queue = queue.Queue(maxsize=queue_size)
+    errors = []
+    writer = threading.Thread(target=_write_outputs, args=(write_queue, errors), daemon=True)
+    writer.start()
+    
+    rendered = 0
+    try:
+        with Pool(processes=workers or os.cpu_count(), initializer=_init_render_worker,
+                  initargs=(font_size,)) as pool:
+            for output_path, data, error in pool.imap_unordered(_render_task, tasks, chunksize=8):
+                if error:
+                    errors.append(error)
+                    continue
+                write_queue.put((output_path, data))
+                rendered += 1
+    finally:
+        write_queue.put(None)
+        writer.join()
+    return rendered, errors
+
+def create_individual_visualizations(output_dir="visualized", labels_dir="labels", images_dir=".",
+                                     workers=None, force=False):
     """Create individual visualizations for all labeled images"""
     
     os.makedirs(output_dir, exist_ok=True)
-    labels_dir = "labels"
-    images_dir = "."
     
-    count = 0
-    for label_file in sorted(os.listdir(labels_dir)):
+    tasks, skipped = [], 0
+    for label_file in sorted(FS.listdir(labels_dir)):
         if label_file.endswith('.txt'):
             image_name = label_file.replace('.txt', '.jpg')
             image_path = os.path.join(images_dir, image_name)
             label_path = os.path.join(labels_dir, label_file)
             output_path = os.path.join(output_dir, image_name)
             
-            if os.path.exists(image_path):
-                draw_boxes_on_image(image_path, label_path, output_path)
-                count += 1
+            if not FS.exists(image_path):
+                continue
+            if not force and is_up_to_date(output_path, image_path, label_path):
+                skipped += 1
+                continue
+            tasks.append((image_path, label_path, output_path))
+    
+    count, errors = render_batch(tasks, workers=workers) if tasks else (0, [])
+    for error in errors:
+        print(f"Error: {error}")
     
-    print(f"\n✅ Created {count} individual visualizations in '{output_dir}/' folder")
+    print(f"\n✅ Created {count} individual visualizations in '{output_dir}/' folder "
+          f"({skipped} already up to date)")
 
 def main():
     """Main visualization function"""
@@ -222,11 +350,13 @@ def main():
     visualize_grid(num_images=9)
     
     print("\n2️⃣  Creating visualizations by class...")
-    # Visualize top 3 classes
+    # Visualize top 3 classes (one index refresh, then a lookup per class)
+    index = open_index("labels")
     for class_id in [36, 26, 23]:
         class_name = CLASS_NAMES.get(class_id, f"Class {class_id}")
         print(f"  - Class {class_id} ({class_name})")
-        visualize_by_class(class_id, max_images=6)
+        visualize_by_class(class_id, max_images=6, index=index)
+    index.close()
     
     print("\n3️⃣  Creating individual visualizations...")
     create_individual_visualizations()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+YOLOv10 Prediction Script for BRSSD
+Runs a trained model on images and applies per-class confidence
+thresholds saved by thresholds_brssd.py; images may be read straight
+from a zip archive (BRSSD.zip/test/images) or streamed from tar shards
+"""
+
+import sys
+import json
+import argparse
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from drive_io import ArchiveFileSystem, ReadAhead, is_archive_path
+from shards_brssd import INDEX_FILE, image_member, iter_samples, shard_paths
+from thresholds_brssd import DEFAULT_CONF, apply_class_thresholds, load_thresholds, threshold_table
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def decoded_batches(encoded, batch=16):
+    """(names, BGR arrays) batches from an iterable of (name, encoded image bytes)"""
+    import cv2
+
+    batch_names, arrays = [], []
+    for name, data in encoded:
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if data else None
+        if img is None:
+            print(f"⚠️  Could not decode {name}")
+            continue
+        batch_names.append(name)
+        arrays.append(img)
+        if len(arrays) == batch:
+            yield batch_names, arrays
+            batch_names, arrays = [], []
+    if arrays:
+        yield batch_names, arrays
+
+
+def archive_images(source, batch=16, fs=None):
+    """(name, bytes) of the images of a folder inside a zip, read ahead without extracting"""
+    fs = fs or ArchiveFileSystem()
+    names = sorted(n for n in fs.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+    for path, data in ReadAhead([f"{source}/{n}" for n in names], fs, window=4 * batch):
+        yield Path(path).name, data
+
+
+def shard_images(source, split=None):
+    """(name, bytes) of the images in tar shards, streamed shard by shard"""
+    for key, files in iter_samples(shard_paths(source, split)):
+        ext, data = image_member(files)
+        if data is not None:
+            yield f"{key}{ext}", data
+
+
+def is_shard_source(source):
+    source = Path(source)
+    return source.suffix == '.tar' or (source / INDEX_FILE).exists()
+
+
+def predict(weights, source, out_dir='runs/brssd_predict', thresholds=None, conf=DEFAULT_CONF,
+            iou=0.7, imgsz=640, device='cpu', batch=16, save_txt=True, split=None):
+    """
+    Predict on source and write kept detections as YOLO txt files and JSONL.
+
+    With per-class thresholds the model runs at the lowest class threshold,
+    and each detection is then checked against its own class's threshold.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(str(weights))
+    nc = len(model.names)
+    if thresholds:
+        table = threshold_table(thresholds, nc)
+        default = thresholds.get('default_conf', conf)
+        run_conf = float(min(table.min(), default)) if len(table) else default
+    else:
+        table, default, run_conf = np.full(nc, conf, dtype=np.float32), conf, conf
+
+    out_dir = Path(out_dir)
+    labels_dir = out_dir / 'labels'
+    labels_dir.mkdir(parents=True, exist_ok=True)
+
+    def named_results():
+        settings = dict(conf=run_conf, iou=iou, imgsz=imgsz, device=device, batch=batch,
+                        stream=True, verbose=False)
+        if is_shard_source(source):
+            encoded = shard_images(source, split)
+        elif is_archive_path(source):
+            encoded = archive_images(source, batch)
+        else:
+            for result in model.predict(source=str(source), **settings):
+                yield Path(result.path).name, result
+            return
+        for names, arrays in decoded_batches(encoded, batch):
+            yield from zip(names, model.predict(source=arrays, **settings))
+
+    kept, dropped = Counter(), Counter()
+    images = 0
+    with open(out_dir / 'predictions.jsonl', 'w') as jsonl:
+        for name, result in named_results():
+            images += 1
+            boxes = result.boxes
+            cls = boxes.cls.cpu().numpy().astype(int)
+            scores = boxes.conf.cpu().numpy()
+            xywhn = boxes.xywhn.cpu().numpy()
+
+            keep = apply_class_thresholds(cls, scores, table, default)
+            kept.update(cls[keep].tolist())
+            dropped.update(cls[~keep].tolist())
+            cls, scores, xywhn = cls[keep], scores[keep], xywhn[keep]
+
+            jsonl.write(json.dumps({
+                'image': name,
+                'detections': [{'class': int(c), 'conf': round(float(s), 5),
+                                'box': [round(float(v), 6) for v in b]}
+                               for c, s, b in zip(cls, scores, xywhn)],
+            }) + '\n')
+            if save_txt and len(cls):
+                rows = np.column_stack([cls, xywhn, scores])
+                np.savetxt(labels_dir / f"{Path(name).stem}.txt", rows,
+                           fmt=['%d', '%.6f', '%.6f', '%.6f', '%.6f', '%.5f'])
+
+    return {'images': images, 'kept': kept, 'dropped': dropped, 'run_conf': run_conf,
+            'names': model.names, 'out_dir': out_dir}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a trained YOLOv10 model on BRSSD images',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Uses best_thresholds.json next to best.pt when present
+  python predict_brssd.py --weights runs/brssd/YOLOv10m_BRSSD/weights/best.pt \\
+                          --source BRSSD/test/images
+
+  # Images read from a zip archive without extracting it
+  python predict_brssd.py --weights best.pt --source BRSSD.zip/test/images
+
+  # Test split of a shard folder written by shards_brssd.py
+  python predict_brssd.py --weights best.pt --source BRSSD_shards --split test
+
+  # One global threshold, ignoring saved per-class thresholds
+  python predict_brssd.py --weights best.pt --source images/ --thresholds none --conf 0.4
+        """
+    )
+    parser.add_argument('--weights', required=True, help='Trained checkpoint')
+    parser.add_argument('--source', required=True, help='Image, directory, video, glob, folder inside a .zip, or shard folder/.tar')
+    parser.add_argument('--split', type=str, default=None,
+                        help='Split to read when --source is a shard folder (default: all)')
+    parser.add_argument('--thresholds', type=str, default='auto',
+                        help="Per-class thresholds JSON, 'auto' (sidecar of --weights) or 'none'")
+    parser.add_argument('--conf', type=float, default=DEFAULT_CONF,
+                        help='Global confidence threshold when no per-class thresholds are used')
+    parser.add_argument('--iou', type=float, default=0.7, help='NMS IoU threshold')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--device', type=str, default='cpu', help='Device: cpu, 0, 0,1, etc.')
+    parser.add_argument('--batch', type=int, default=16, help='Images per inference batch')
+    parser.add_argument('--out', type=str, default='runs/brssd_predict', help='Output directory')
+    args = parser.parse_args()
+
+    if not Path(args.weights).exists():
+        print(f"✗ Checkpoint not found: {args.weights}")
+        return 1
+
+    thresholds = None
+    if args.thresholds == 'auto':
+        thresholds = load_thresholds(args.weights)
+    elif args.thresholds != 'none':
+        thresholds = load_thresholds(args.thresholds)
+        if thresholds is None:
+            print(f"✗ Thresholds file not found: {args.thresholds}")
+            return 1
+
+    if thresholds:
+        print(f"✓ Per-class thresholds ({thresholds['mode']}) for {len(thresholds['classes'])} classes")
+    else:
+        print(f"Using global confidence threshold {args.conf}")
+
+    summary = predict(args.weights, args.source, out_dir=args.out, thresholds=thresholds,
+                      conf=args.conf, iou=args.iou, imgsz=args.imgsz, device=args.device,
+                      batch=args.batch, split=args.split)
+
+    print("\n" + "=" * 60)
+    print("PREDICTION SUMMARY")
+    print("=" * 60)
+    print(f"  Images: {summary['images']}")
+    print(f"  Detections kept: {sum(summary['kept'].values())}")
+    if thresholds:
+        print(f"  Dropped by class thresholds: {sum(summary['dropped'].values())}")
+    for c, n in summary['kept'].most_common():
+        print(f"    {summary['names'].get(c, c)}: {n}")
+    print(f"\n✓ Results saved to: {summary['out_dir']}/ (labels/, predictions.jsonl)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
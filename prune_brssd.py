@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Structured Channel Pruning for YOLOv10 on BRSSD
+Ranks convolution channels by importance, removes them until the model
+reaches each target FLOPs ratio, fine-tunes briefly and exports the result
+"""
+
+import os
+import sys
+import copy
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+from ultralytics import YOLO
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.nn.modules import C2f
+
+from benchmark_brssd import benchmark, print_comparison, save_benchmark
+
+# Modules whose internal channels are tied to head counts or reshapes and
+# must keep their width (their input channels may still shrink)
+KEEP_WIDTH_MODULES = ('PSA', 'C2PSA', 'Attention')
+
+
+def import_torch_pruning():
+    """Import torch_pruning, installing it on first use"""
+    try:
+        import torch_pruning as tp
+        return tp
+    except ImportError:
+        print("⚠ torch-pruning package not installed. Installing...")
+        os.system("pip install 'torch-pruning>=1.3' -q")
+        import torch_pruning as tp
+        return tp
+
+
+class C2fSplit(nn.Module):
+    """C2f with its input projection split in two convolutions"""
+
+    # C2f halves one convolution's output with chunk(), which forces both
+    # halves to keep the same width; separate convolutions can be pruned
+    # independently and compute exactly the same function
+
+    def __init__(self, c2f):
+        super().__init__()
+        c = c2f.c
+        self.cv0 = self._slice_conv(c2f.cv1, slice(0, c))
+        self.cv1 = self._slice_conv(c2f.cv1, slice(c, 2 * c))
+        self.cv2 = c2f.cv2
+        self.m = c2f.m
+        # Layer bookkeeping used by the model's forward pass
+        for attr in ('i', 'f', 'type', 'np'):
+            if hasattr(c2f, attr):
+                setattr(self, attr, getattr(c2f, attr))
+
+    @staticmethod
+    def _slice_conv(conv, channels):
+        half = copy.deepcopy(conv)
+        half.conv.weight = nn.Parameter(conv.conv.weight.data[channels].clone())
+        half.conv.out_channels = half.conv.weight.shape[0]
+        bn = half.bn
+        bn.weight = nn.Parameter(conv.bn.weight.data[channels].clone())
+        bn.bias = nn.Parameter(conv.bn.bias.data[channels].clone())
+        bn.running_mean = conv.bn.running_mean[channels].clone()
+        bn.running_var = conv.bn.running_var[channels].clone()
+        bn.num_features = half.conv.out_channels
+        return half
+
+    def forward(self, x):
+        y = [self.cv0(x), self.cv1(x)]
+        y.extend(m(y[-1]) for m in self.m)
+        return self.cv2(torch.cat(y, 1))
+
+
+def split_c2f_blocks(model):
+    """Replace every C2f-style block (C2f, C2fCIB, ...) with a prunable C2fSplit"""
+    count = 0
+    for i, m in enumerate(model.model):
+        if isinstance(m, C2f):
+            model.model[i] = C2fSplit(m)
+            count += 1
+    return count
+
+
+def count_macs(model, imgsz, tp):
+    """Forward MACs and parameter count at the given image size"""
+    example = torch.zeros(1, 3, imgsz, imgsz)
+    return tp.utils.count_ops_and_params(model, example)
+
+
+def prune_to_flops(model, target_macs, imgsz=640, importance='l2', round_to=8, max_steps=100):
+    """
+    Prune model in place until its MACs drop to target_macs.
+
+    Channels are removed in small uniform steps; after every step the MACs
+    are measured again, so the target is met regardless of how FLOPs are
+    distributed across layers.
+    """
+    tp = import_torch_pruning()
+    model.float().cpu().eval()
+    for p in model.parameters():
+        p.requires_grad = True
+
+    ignored = [model.model[-1]]  # detection head: output layout is fixed
+    ignored += [m for m in model.modules() if type(m).__name__ in KEEP_WIDTH_MODULES]
+
+    if importance == 'bn':
+        imp = tp.importance.BNScaleImportance()
+    else:
+        imp = tp.importance.MagnitudeImportance(p=2)
+
+    example = torch.zeros(1, 3, imgsz, imgsz)
+    pruner = tp.pruner.MagnitudePruner(
+        model, example,
+        importance=imp,
+        iterative_steps=max_steps,
+        pruning_ratio=0.9,
+        ignored_layers=ignored,
+        round_to=round_to,
+    )
+
+    macs, params = count_macs(model, imgsz, tp)
+    steps = 0
+    while macs > target_macs and steps < max_steps:
+        pruner.step()
+        steps += 1
+        macs, params = count_macs(model, imgsz, tp)
+
+    if macs > target_macs:
+        print(f"⚠️  Stopped at {macs / 1e9:.2f} GMACs (target {target_macs / 1e9:.2f})")
+    return {'macs': macs, 'params': params, 'steps': steps}
+
+
+def save_pruned(model, path, train_args=None):
+    """Save a pruned model in the Ultralytics checkpoint layout"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    torch.save({
+        'date': datetime.now().isoformat(),
+        'epoch': -1,
+        'model': copy.deepcopy(model).half(),
+        'ema': None,
+        'updates': None,
+        'optimizer': None,
+        'train_args': train_args or {},
+    }, path)
+    return path
+
+
+class PrunedModelTrainer(DetectionTrainer):
+    """DetectionTrainer that fine-tunes the loaded (pruned) model as-is"""
+
+    def get_model(self, cfg=None, weights=None, verbose=True):
+        # The stock trainer rebuilds the network from its YAML and copies
+        # matching weights in, which would restore the original widths
+        return weights
+
+
+def finetune(weights, data_yaml, epochs, imgsz, batch, device, workers, project, name):
+    """Briefly retrain a pruned checkpoint and return the path of its best weights"""
+    model = YOLO(str(weights))
+    model.train(
+        trainer=PrunedModelTrainer,
+        data=data_yaml,
+        epochs=epochs,
+        imgsz=imgsz,
+        batch=batch,
+        device=device,
+        workers=workers,
+        project=project,
+        name=name,
+        exist_ok=True,
+        warmup_epochs=0,
+        close_mosaic=min(epochs, 10),
+        plots=False,
+    )
+    save_dir = Path(project) / name / 'weights'
+    best = save_dir / 'best.pt'
+    return best if best.exists() else save_dir / 'last.pt'
+
+
+def export_model(weights, export_format, imgsz):
+    """Export a checkpoint (e.g. to ONNX) and return the exported file path"""
+    try:
+        return str(YOLO(str(weights)).export(format=export_format, imgsz=imgsz))
+    except Exception as e:
+        print(f"⚠️  Export to {export_format} failed: {e}")
+        return None
+
+
+def prune_levels(weights, flops_ratios, data_yaml='brssd_data.yaml', imgsz=640,
+                 finetune_epochs=10, batch=16, device='cpu', workers=4,
+                 importance='l2', project='runs/brssd_prune', export_format='onnx'):
+    """
+    Prune a trained checkpoint to each FLOPs ratio in turn.
+
+    Levels are applied progressively from the largest ratio down: each
+    level starts from the previous level's fine-tuned weights, so deeper
+    cuts build on a model that has already recovered.
+    """
+    tp = import_torch_pruning()
+    ratios = sorted(set(flops_ratios), reverse=True)
+
+    print("\n" + "=" * 60)
+    print("Structured Channel Pruning")
+    print("=" * 60)
+    print(f"  Model: {weights}")
+    print(f"  FLOPs ratios: {ratios}")
+    print(f"  Importance: {importance}")
+    print(f"  Fine-tune epochs: {finetune_epochs}")
+
+    original = YOLO(str(weights)).model.float().cpu()
+    base_macs, base_params = count_macs(original, imgsz, tp)
+    print(f"  Original: {base_macs / 1e9:.2f} GMACs, {base_params / 1e6:.2f}M params")
+
+    print("\nBenchmarking original model...")
+    report = {'original': benchmark(weights, data_yaml, imgsz=imgsz, device=device), 'levels': []}
+
+    current = weights
+    for ratio in ratios:
+        name = f"flops{int(round(ratio * 100))}"
+        level_dir = Path(project) / name
+        print(f"\n[{name}] Pruning to {ratio:.0%} of original FLOPs...")
+
+        model = YOLO(str(current)).model.float().cpu()
+        split_c2f_blocks(model)
+        pruned = prune_to_flops(model, ratio * base_macs, imgsz=imgsz, importance=importance)
+        print(f"  ✓ {pruned['macs'] / 1e9:.2f} GMACs, {pruned['params'] / 1e6:.2f}M params "
+              f"after {pruned['steps']} steps")
+
+        pruned_path = save_pruned(model, level_dir / 'pruned.pt',
+                                  train_args={'data': data_yaml, 'imgsz': imgsz})
+        if finetune_epochs > 0:
+            print(f"  Fine-tuning for {finetune_epochs} epochs...")
+            current = finetune(pruned_path, data_yaml, finetune_epochs, imgsz, batch,
+                               device, workers, project, name)
+        else:
+            current = pruned_path
+
+        print("  Benchmarking...")
+        result = benchmark(current, data_yaml, imgsz=imgsz, device=device)
+        result.update({
+            'level': name,
+            'target_flops_ratio': ratio,
+            'flops_ratio': round(pruned['macs'] / base_macs, 4),
+        })
+        if export_format != 'none':
+            result['exported'] = export_model(current, export_format, imgsz)
+        save_benchmark(result, level_dir)  # picked up by registry_brssd.py
+        report['levels'].append(result)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prune a trained YOLOv10 model to target FLOPs ratios and fine-tune',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Prune YOLOv10m to 75% and 50% of its FLOPs, 10 fine-tune epochs each
+  python prune_brssd.py runs/brssd/YOLOv10m_BRSSD/weights/best.pt --flops-ratio 0.75 0.5
+
+  # Rank channels by BatchNorm scale, quick check without fine-tuning
+  python prune_brssd.py best.pt --flops-ratio 0.6 --importance bn --finetune-epochs 0
+
+Pruned checkpoints contain prune_brssd.C2fSplit blocks; load them from the
+repository root, or use the exported ONNX file for deployment.
+        """
+    )
+    parser.add_argument('weights', help='Trained checkpoint to prune')
+    parser.add_argument('--flops-ratio', type=float, nargs='+', default=[0.75, 0.5],
+                        help='Fraction of the original FLOPs to keep, one level per value')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--importance', choices=['l2', 'bn'], default='l2',
+                        help='Channel ranking: l2 (weight magnitude) or bn (BatchNorm scale)')
+    parser.add_argument('--finetune-epochs', type=int, default=10,
+                        help='Fine-tune epochs per level (0 to skip)')
+    parser.add_argument('--batch', type=int, default=16, help='Fine-tune batch size')
+    parser.add_argument('--workers', type=int, default=4, help='Dataloader workers')
+    parser.add_argument('--device', type=str, default='cpu', help='Device: cpu, 0, 0,1, etc.')
+    parser.add_argument('--export', type=str, default='onnx',
+                        help='Export format for each level (onnx, torchscript, openvino, none)')
+    parser.add_argument('--project', type=str, default='runs/brssd_prune', help='Output directory')
+    args = parser.parse_args()
+
+    if not Path(args.weights).exists():
+        print(f"✗ Checkpoint not found: {args.weights}")
+        return 1
+    if any(not 0 < r < 1 for r in args.flops_ratio):
+        print("✗ FLOPs ratios must be between 0 and 1")
+        return 1
+
+    report = prune_levels(args.weights, args.flops_ratio, data_yaml=args.data, imgsz=args.imgsz,
+                          finetune_epochs=args.finetune_epochs, batch=args.batch,
+                          device=args.device, workers=args.workers, importance=args.importance,
+                          project=args.project, export_format=args.export)
+
+    table = {'original': report['original']}
+    table.update({level['level']: level for level in report['levels']})
+    print_comparison(table, title="Pruning Report")
+
+    path = Path(args.project) / 'prune_report.json'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Report saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    # Run through the importable module so pickled checkpoints reference
+    # prune_brssd.C2fSplit rather than __main__.C2fSplit
+    import prune_brssd
+    sys.exit(prune_brssd.main())
@@ -64,6 +64,11 @@ analyze_and_plot_class_occurrences(label_dir)
 from google.colab import drive
 drive.mount('/content/drive')
 
+# Outils du dépôt (index des labels, ...)
+![ -d /content/Traffic-Sign-Recognition-YOLOv10 ] || git clone -q https://github.com/mnxtr/Traffic-Sign-Recognition-YOLOv10.git /content/Traffic-Sign-Recognition-YOLOv10
+import sys
+sys.path.insert(0, "/content/Traffic-Sign-Recognition-YOLOv10")
+
 BASE_DIR = "/content/drive/MyDrive/DATASIGNALISATION"
 
 # Dossier brut : images + labels
@@ -76,12 +81,6 @@ CLEANED_LABEL = os.path.join(BASE_DIR, "cleaned_labels")
 os.makedirs(CLEANED_IMAGE, exist_ok=True)
 os.makedirs(CLEANED_LABEL, exist_ok=True)
 
-# Dossier filtré (pour classes rares)
-FILTERED_IMAGE = os.path.join(BASE_DIR, "filtered_images")
-FILTERED_LABEL = os.path.join(BASE_DIR, "filtered_labels")
-os.makedirs(FILTERED_IMAGE, exist_ok=True)
-os.makedirs(FILTERED_LABEL, exist_ok=True)
-
 # Dossier fusionné (si tu fais un mapping de classes)
 FUSED_IMAGE = os.path.join(BASE_DIR, "fused_images")
 FUSED_LABEL = os.path.join(BASE_DIR, "fused_labels")
@@ -96,6 +95,15 @@ for s in ["train", "val", "test"]:
     os.makedirs(os.path.join(FINAL_DATA_DIR, s, "images"), exist_ok=True)
     os.makedirs(os.path.join(FINAL_DATA_DIR, s, "labels"), exist_ok=True)
 
+# {nom sans extension: chemin de l'image} en un seul listing du dossier (.jpg prioritaire),
+# au lieu de os.path.exists(.jpg) / os.path.exists(.png) par label, coûteux sur Drive
+from label_pipeline import images_by_stem
+
+# Accès fichiers avec lecture anticipée et écritures différées (voir drive_io.py).
+# Pour tester sans Drive : FS = LatencyFileSystem(latency=0.05)
+from drive_io import LocalFileSystem, LatencyFileSystem, StagedWriter, copy_many, read_texts
+FS = LocalFileSystem()
+
 def analyze_distribution(label_dir):
     """
     Retourne un dictionnaire {class_id: occurrences} pour des annotations YOLO.
@@ -136,17 +144,12 @@ def show_random_image_with_bboxes(image_dir, label_dir, nb_samples=1):
         print("Aucun label trouvé.")
         return
     chosen_labels = random.sample(all_labels, min(nb_samples, len(all_labels)))
+    images = images_by_stem(image_dir)
     for lbl_file in chosen_labels:
         base_name = lbl_file.replace('.txt', '')
 
-        jpg_path = os.path.join(image_dir, base_name + '.jpg')
-        png_path = os.path.join(image_dir, base_name + '.png')
-
-        if os.path.exists(jpg_path):
-            img_path = jpg_path
-        elif os.path.exists(png_path):
-            img_path = png_path
-        else:
+        img_path = images.get(base_name)
+        if img_path is None:
             print(f"Pas d'image correspondante pour {lbl_file}")
             continue
 
@@ -197,35 +200,43 @@ def show_random_image_with_bboxes(image_dir, label_dir, nb_samples=1):
         plt.tight_layout()
         plt.show()
 
-def clean_dataset(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir):
+def clean_dataset(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir, min_box_px=4):
+    from image_probe import probe_sizes, box_too_small
 
     nb_txt_deleted = 0
     nb_txt_kept = 0
     nb_img_kept = 0
+    nb_small_boxes = 0
 
     os.makedirs(dst_img_dir, exist_ok=True)
     os.makedirs(dst_lbl_dir, exist_ok=True)
 
     txt_files = [f for f in os.listdir(src_lbl_dir) if f.endswith(".txt")]
+    images = images_by_stem(src_img_dir)
+    pairs = []
     for lbl_file in txt_files:
         lbl_path = os.path.join(src_lbl_dir, lbl_file)
         base_name = lbl_file.replace('.txt', '')
 
 
-        jpg_path = os.path.join(src_img_dir, base_name + '.jpg')
-        png_path = os.path.join(src_img_dir, base_name + '.png')
-        if os.path.exists(jpg_path):
-            img_path = jpg_path
-        elif os.path.exists(png_path):
-            img_path = png_path
-        else:
+        img_path = images.get(base_name)
+        if img_path is None:
 
             nb_txt_deleted += 1
             print(f"[CLEAN] Orphelin (pas d'image) => on ignore {lbl_file}")
             continue
+        pairs.append((lbl_file, lbl_path, img_path))
 
-        with open(lbl_path, 'r') as f:
-            lines = f.readlines()
+    # Dimensions lues dans les en-têtes JPEG/PNG (sans décodage), en parallèle
+    image_sizes = probe_sizes([img_path for _, _, img_path in pairs])
+
+    # Tous les labels lus d'avance en parallèle ; copies et écritures envoyées en arrière-plan
+    label_texts = read_texts([lbl_path for _, lbl_path, _ in pairs], FS)
+    image_copies = []
+    writer = StagedWriter(FS)
+
+    for lbl_file, lbl_path, img_path in pairs:
+        lines = label_texts[lbl_path].splitlines(keepends=True)
         valid_lines = []
         for line in lines:
             parts = line.strip().split()
@@ -260,6 +271,11 @@ def clean_dataset(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir):
             if _w > 0.99 or _h > 0.99:
                 continue
 
+            # Boîte trop petite en pixels
+            if box_too_small(_w, _h, image_sizes[img_path], min_box_px):
+                nb_small_boxes += 1
+                continue
+
             valid_lines.append(line)
 
 
@@ -270,27 +286,27 @@ def clean_dataset(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir):
         else:
 
             dst_img_path = os.path.join(dst_img_dir, os.path.basename(img_path))
-            shutil.copy(img_path, dst_img_path)
+            image_copies.append((img_path, dst_img_path))
             nb_img_kept += 1
 
 
             dst_lbl_path = os.path.join(dst_lbl_dir, lbl_file)
-            with open(dst_lbl_path, 'w') as fw:
-                fw.writelines(valid_lines)
+            writer.write(dst_lbl_path, "".join(valid_lines).encode())
             nb_txt_kept += 1
 
+    writer.close()
+    copy_many(image_copies, FS)
 
-    images_in_src = [f for f in os.listdir(src_img_dir) if f.lower().endswith(('.jpg', '.png'))]
-    for img_file in images_in_src:
-        base_name = os.path.splitext(img_file)[0]
-        label_txt = os.path.join(src_lbl_dir, base_name + ".txt")
 
-        if not os.path.exists(label_txt):
+    label_stems = {f[:-4] for f in txt_files}
+    for base_name, img_path in images.items():
+        if base_name not in label_stems:
 
-            print(f"[CLEAN - OPTION] Image orpheline : {img_file} (pas de .txt)")
+            print(f"[CLEAN - OPTION] Image orpheline : {os.path.basename(img_path)} (pas de .txt)")
 
 
     print(f"[CLEAN] {nb_txt_deleted} labels invalides ou orphelins ignorés.")
+    print(f"[CLEAN] {nb_small_boxes} boîtes de moins de {min_box_px} px supprimées.")
     print(f"[CLEAN] {nb_txt_kept} labels conservés, {nb_img_kept} images copiées.")
     print("[CLEAN] Nettoyage (copie) terminé.\n")
 
@@ -313,6 +329,18 @@ before_counts = analyze_distribution(TRAIN_LABEL)
 print("Distribution AVANT nettoyage :", before_counts)
 plot_class_distribution(before_counts, "Distribution AVANT Nettoyage")
 
+print("===== Vérification des images (corrompues / tronquées) =====")
+from dataset_manifest import DatasetManifest
+from check_images import check_images
+# Résultats mémorisés dans le manifeste : seules les images nouvelles ou modifiées sont relues
+manifest = DatasetManifest(path=os.path.join(BASE_DIR, "train", "manifest.db"),
+                           dirs={"train": (TRAIN_IMAGE, TRAIN_LABEL)})
+integrity = check_images(manifest, mode="full", quarantine_dir=os.path.join(BASE_DIR, "quarantine"))
+manifest.close()
+print(f"{integrity['scanned']} images vérifiées, {len(integrity['quarantined'])} mises en quarantaine")
+for split, stem, status, error in integrity["bad"]:
+    print(f"  [QUARANTAINE] {stem} : {status} ({error})")
+
 print("===== Nettoyage en cours... =====")
 clean_dataset(
     src_img_dir=TRAIN_IMAGE,
@@ -484,35 +512,22 @@ for class_name, class_id in class_id_mapping.items():
 
 import os
 def show_one_image_for_specified_classes(image_dir, label_dir, target_classes):
+    from label_index import open_index
 
-    # Dictionnaire pour stocker une image par classe
-    image_per_class = {class_id: None for class_id in target_classes}
-
-    for lbl_file in os.listdir(label_dir):
-        if not lbl_file.endswith(".txt"):
-            continue
+    # Index inversé classe -> fichiers labels (mis à jour seulement pour les fichiers modifiés)
+    index = open_index(label_dir)
 
-        base_name = lbl_file.replace(".txt", "")
-        jpg_path = os.path.join(image_dir, base_name + ".jpg")
-        png_path = os.path.join(image_dir, base_name + ".png")
-
-        img_path = None
-        if os.path.exists(jpg_path):
-            img_path = jpg_path
-        elif os.path.exists(png_path):
-            img_path = png_path
-        else:
-            continue
+    images = images_by_stem(image_dir)
 
+    # Dictionnaire pour stocker une image par classe
+    image_per_class = {class_id: None for class_id in target_classes}
 
-        with open(os.path.join(label_dir, lbl_file), "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                parts = line.strip().split()
-                if len(parts) == 5:
-                    class_id = int(parts[0])
-                    if class_id in target_classes and image_per_class[class_id] is None:
-                        image_per_class[class_id] = img_path
+    for class_id in target_classes:
+        for label_path, _ in index.lookup(class_id):
+            image_per_class[class_id] = images.get(label_path.stem)
+            if image_per_class[class_id] is not None:
+                break
+    index.close()
     for class_id, img_path in image_per_class.items():
         if img_path is not None:
             print(f"Classe {class_id} (Image: {os.path.basename(img_path)})")
@@ -542,68 +557,6 @@ exclusion_str = ("0,1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,19,20,21,25,30,31,
                  "124,125,127,128,129,130,131,132,135,136,137,138,139,140,141,142,"
                  "143,144")
 CLASSES_A_EXCLURE = exclusion_str.split(",")
-def filter_labels_by_class(src_lbl_dir, dst_lbl_dir, classes_to_exclude):
-    """
-    Copie les fichiers de label depuis src_lbl_dir vers dst_lbl_dir en excluant
-    les annotations dont le premier token (classe) appartient à classes_to_exclude.
-    """
-    os.makedirs(dst_lbl_dir, exist_ok=True)
-    for lbl_file in os.listdir(src_lbl_dir):
-        if not lbl_file.endswith(".txt"):
-            continue
-        src_path = os.path.join(src_lbl_dir, lbl_file)
-        with open(src_path, "r") as f:
-            lines = f.readlines()
-        kept_lines = []
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) == 5:
-                cls_id = parts[0]
-                if cls_id not in CLASSES_A_EXCLURE:
-                    kept_lines.append(line)
-        if kept_lines:
-            with open(os.path.join(dst_lbl_dir, lbl_file), "w") as fw:
-                fw.writelines(kept_lines)
-
-# Application du filtrage
-
-FILTERED_LABEL_DIR = os.path.join(BASE_DIR, "filtered_labels")
-os.makedirs(FILTERED_LABEL_DIR, exist_ok=True)
-
-
-filter_labels_by_class(CLEANED_LABEL, FILTERED_LABEL_DIR, CLASSES_A_EXCLURE)
-
-
-new_filtered_distribution = analyze_distribution(FILTERED_LABEL_DIR)
-print("Distribution après filtrage :", new_filtered_distribution)
-plot_class_distribution(new_filtered_distribution, "Distribution après filtrage")
-
-# Copie des images associées aux labels filtrés pour garder la correspondance
-FILTERED_IMAGE_OUT = os.path.join(BASE_DIR, "filtered_images_out")
-os.makedirs(FILTERED_IMAGE_OUT, exist_ok=True)
-def copy_images_for_filtered_labels(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir):
-    os.makedirs(dst_img_dir, exist_ok=True)
-    os.makedirs(dst_lbl_dir, exist_ok=True)
-    label_files = [f for f in os.listdir(src_lbl_dir) if f.endswith(".txt")]
-    for lbl_file in label_files:
-        base_name = lbl_file.replace(".txt", "")
-        # Copier le label
-        src_label_path = os.path.join(src_lbl_dir, lbl_file)
-        dst_label_path = os.path.join(dst_lbl_dir, lbl_file)
-        if os.path.realpath(src_label_path) != os.path.realpath(dst_label_path):
-            shutil.copy2(src_label_path, dst_label_path)
-        # Copier l'image correspondante (jpg ou png)
-        for ext in [".jpg", ".png"]:
-            candidate = os.path.join(src_img_dir, base_name + ext)
-            if os.path.exists(candidate):
-                dst_candidate = os.path.join(dst_img_dir, base_name + ext)
-                if os.path.realpath(candidate) != os.path.realpath(dst_candidate):
-                    shutil.copy2(candidate, dst_candidate)
-                break
-
-copy_images_for_filtered_labels(CLEANED_IMAGE, FILTERED_LABEL_DIR,
-                                FILTERED_IMAGE_OUT, FILTERED_LABEL_DIR)
-print("Copie des images/labels filtrés effectuée.")
 
 # Mapping des classes pour la fusion
 class_mapping = {
@@ -628,96 +581,25 @@ class_mapping = {
     "Parking allowed for 15min": "Parking"
 }
 
-# Application du  mapping pour fusionner les classes
-def merge_classes_in_labels(src_lbl_dir, dst_lbl_dir, class_mapping, id_mapping):
-
-    os.makedirs(dst_lbl_dir, exist_ok=True)
-    for lbl_file in os.listdir(src_lbl_dir):
-        if not lbl_file.endswith(".txt"):
-            continue
-        src_path = os.path.join(src_lbl_dir, lbl_file)
-        with open(src_path, "r") as f:
-            lines = f.readlines()
-
-        new_lines = []
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) == 5:
-                cls_id = parts[0]
-
-                class_name = id_mapping.get(int(cls_id), None)
-                if class_name and class_name in class_mapping:
-                    new_class_name = class_mapping[class_name]
-
-                    new_cls_id = list(id_mapping.keys())[list(id_mapping.values()).index(new_class_name)]
-                    new_lines.append(f"{new_cls_id} {parts[1]} {parts[2]} {parts[3]} {parts[4]}\n")
-                else:
-                    new_lines.append(line)
-
-        if new_lines:
-            dst_path = os.path.join(dst_lbl_dir, lbl_file)
-            with open(dst_path, "w") as fw:
-                fw.writelines(new_lines)
-
-FUSED_LABEL = os.path.join(BASE_DIR, "fused_labels")
-FUSED_IMAGE = os.path.join(BASE_DIR, "fused_images")
-os.makedirs(FUSED_LABEL, exist_ok=True)
-os.makedirs(FUSED_IMAGE, exist_ok=True)
-
-FILTERED_LABEL_OUT = os.path.join(BASE_DIR, "filtered_labels_out")
-FILTERED_IMAGE_OUT = os.path.join(BASE_DIR, "filtered_images_out")
-os.makedirs(FILTERED_LABEL_OUT, exist_ok=True)
-os.makedirs(FILTERED_IMAGE_OUT, exist_ok=True)
-
-
-def copy_images_for_filtered_labels(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir):
-    os.makedirs(dst_img_dir, exist_ok=True)
-    os.makedirs(dst_lbl_dir, exist_ok=True)
-    label_files = [f for f in os.listdir(src_lbl_dir) if f.endswith(".txt")]
-    for lbl_file in label_files:
-        base_name = lbl_file.replace(".txt", "")
-
-        src_lbl_path = os.path.join(src_lbl_dir, lbl_file)
-        dst_lbl_path = os.path.join(dst_lbl_dir, lbl_file)
-        if os.path.realpath(src_lbl_path) != os.path.realpath(dst_lbl_path):
-            shutil.copy2(src_lbl_path, dst_lbl_path)
-
-        jpg_path = os.path.join(src_img_dir, base_name + ".jpg")
-        png_path = os.path.join(src_img_dir, base_name + ".png")
-        if os.path.exists(jpg_path):
-            dst_jpg = os.path.join(dst_img_dir, base_name + ".jpg")
-            if os.path.realpath(jpg_path) != os.path.realpath(dst_jpg):
-                shutil.copy2(jpg_path, dst_jpg)
-        elif os.path.exists(png_path):
-            dst_png = os.path.join(dst_img_dir, base_name + ".png")
-            if os.path.realpath(png_path) != os.path.realpath(dst_png):
-                shutil.copy2(png_path, dst_png)
-
-copy_images_for_filtered_labels(CLEANED_IMAGE, FILTERED_LABEL_DIR, FILTERED_IMAGE_OUT, FILTERED_LABEL_OUT)
-def copy_images_for_fused_labels(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir):
-    os.makedirs(dst_img_dir, exist_ok=True)
-    os.makedirs(dst_lbl_dir, exist_ok=True)
-    for lbl_file in os.listdir(src_lbl_dir):
-        if lbl_file.endswith(".txt"):
-            base_name = lbl_file.replace(".txt", "")
-            src_lbl_path = os.path.join(src_lbl_dir, lbl_file)
-            dst_lbl_path = os.path.join(dst_lbl_dir, lbl_file)
-            if os.path.realpath(src_lbl_path) != os.path.realpath(dst_lbl_path):
-                shutil.copy2(src_lbl_path, dst_lbl_path)
-            jpg_path = os.path.join(src_img_dir, base_name + ".jpg")
-            png_path = os.path.join(src_img_dir, base_name + ".png")
-            if os.path.exists(jpg_path):
-                dst_jpg = os.path.join(dst_img_dir, base_name + ".jpg")
-                if os.path.realpath(jpg_path) != os.path.realpath(dst_jpg):
-                    shutil.copy2(jpg_path, dst_jpg)
-            elif os.path.exists(png_path):
-                dst_png = os.path.join(dst_img_dir, base_name + ".png")
-                if os.path.realpath(png_path) != os.path.realpath(dst_png):
-                    shutil.copy2(png_path, dst_png)
-
-copy_images_for_fused_labels(FILTERED_IMAGE_OUT, FUSED_LABEL, FUSED_IMAGE, FUSED_LABEL)
-
-print("Fusion des classes réalisée")
+# Filtrage, fusion et vérification des labels en une seule passe (voir label_pipeline.py) :
+# chaque label est lu une fois et écrit une fois, et seules les images des labels
+# conservés sont copiées vers FUSED_IMAGE
+from label_pipeline import (LabelPipeline, exclude_classes, remap_classes, check_bounds,
+                            print_report)
+
+# Noms de classes fusionnés -> identifiants (les noms cibles absents de class_names sont ignorés)
+fusion_ids = {old_id: class_id_mapping[class_mapping[name]]
+              for old_id, name in reverse_class_id_mapping.items()
+              if name in class_mapping and class_mapping[name] in class_id_mapping}
+
+label_pipeline = LabelPipeline([
+    exclude_classes(CLASSES_A_EXCLURE),
+    remap_classes(fusion_ids),
+    check_bounds(),
+])
+rapport = label_pipeline.run(CLEANED_LABEL, FUSED_LABEL, CLEANED_IMAGE, FUSED_IMAGE, fs=FS)
+print("Filtrage + fusion des classes réalisés")
+print_report(rapport)
 
 # Visualiser la nouvelle distribution après fusion
 new_distribution = analyze_distribution(FUSED_LABEL)
@@ -725,16 +607,6 @@ print("Nouvelle distribution des classes après fusion :")
 print(new_distribution)
 plot_class_distribution(new_distribution, "Distribution des classes après Fusion")
 
-filtered_distribution = analyze_distribution(FILTERED_LABEL_DIR)
-print("Classes restantes après filtrage :", filtered_distribution.keys())
-
-merged_classes = []
-for lbl_file in os.listdir(FUSED_LABEL):
-    with open(os.path.join(FUSED_LABEL, lbl_file), 'r') as f:
-        for line in f:
-            merged_classes.append(line.split()[0])
-print("Classes après fusion :", Counter(merged_classes))
-
 TARGET_CLASSES_TO_AUGMENT = TARGET_CLASSES_TO_AUGMENT = ["25", "16", "15", "262", "26", "29", "256", "60", "203", "263", "102",
     "234", "53", "45", "70", "49", "9", "132", "140", "143", "146", "32",
     "184", "208", "147", "28", "22", "260", "151", "209", "217", "239",
@@ -767,56 +639,47 @@ arrow_classes = [
     "No U turn"
 ]
 
-# Pipeline de transformation avec rotation pour les images sans panneaux fléchés
-transform_with_rotation = A.Compose([
-    A.RandomBrightnessContrast(p=0.5),
-    A.HorizontalFlip(p=0.5),
-    A.RandomGamma(p=0.3),
-    A.Rotate(limit=15, p=0.3)
-], bbox_params=A.BboxParams(format='yolo', label_fields=['class_labels']))
+# Augmentations photométriques par lots (voir batch_augment.py) : RandomBrightnessContrast,
+# HorizontalFlip et RandomGamma appliqués par tables de correspondance NumPy sur des
+# piles d'images de même taille, mêmes paramètres par défaut qu'albumentations
+import numpy as np
+from batch_augment import BatchPhotometric, augment_samples
+from drive_io import ReadAhead
 
-# Pipeline de transformation sans rotation pour préserver l'orientation des flèches
-transform_without_rotation = A.Compose([
-    A.RandomBrightnessContrast(p=0.5),
-    A.HorizontalFlip(p=0.5),
-    A.RandomGamma(p=0.3)
+photometric = BatchPhotometric(p_brightness_contrast=0.5, p_flip=0.5, p_gamma=0.3)
+
+# Rotation (géométrique) : albumentations image par image, seulement pour les images
+# sans panneaux fléchés
+rotation = A.Compose([
+    A.Rotate(limit=15, p=0.3)
 ], bbox_params=A.BboxParams(format='yolo', label_fields=['class_labels']))
 
 def augment_dataset(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir,
-                    transform_with_rot, transform_without_rot,
-                    target_classes_to_augment, num_augment=2):
+                    photometric, rotation, target_classes_to_augment, num_augment=2,
+                    batch_size=64):
 
     os.makedirs(dst_img_dir, exist_ok=True)
     os.makedirs(dst_lbl_dir, exist_ok=True)
 
     label_files = [f for f in os.listdir(src_lbl_dir) if f.endswith(".txt")]
-    for lbl_file in label_files:
-        base_name = lbl_file.replace('.txt', '')
-
-        img_path = None
-        for ext in [".jpg", ".png"]:
-            candidate = os.path.join(src_img_dir, base_name + ext)
-            if os.path.exists(candidate):
-                img_path = candidate
-                break
-        if img_path is None:
-            continue
+    images = images_by_stem(src_img_dir)
+    label_paths = [os.path.join(src_lbl_dir, f) for f in label_files]
+    textes = read_texts(label_paths, FS)
 
+    selected = []
+    for lbl_file, lbl_path in zip(label_files, label_paths):
+        base_name = lbl_file.replace('.txt', '')
 
-        img = cv2.imread(img_path)
-        if img is None:
+        img_path = images.get(base_name)
+        if img_path is None or lbl_path not in textes:
             continue
-        H, W, _ = img.shape
-
-        with open(os.path.join(src_lbl_dir, lbl_file), 'r') as f:
-            lines = f.readlines()
 
         bboxes = []
         class_labels = []
         contains_target = False
         apply_rotation = True
 
-        for line in lines:
+        for line in textes[lbl_path].splitlines():
             parts = line.strip().split()
             if len(parts) == 5:
                 cls_id, x_c, y_c, w, h = parts
@@ -832,32 +695,35 @@ def augment_dataset(src_img_dir, src_lbl_dir, dst_img_dir, dst_lbl_dir,
         if not contains_target:
             continue
 
-        shutil.copy2(img_path, os.path.join(dst_img_dir, os.path.basename(img_path)))
-        with open(os.path.join(dst_lbl_dir, lbl_file), 'w') as fw:
-            fw.writelines(lines)
-
-        transform = transform_without_rot if not apply_rotation else transform_with_rot
-
-        # Génération des images augmentées
-        for i in range(num_augment):
-            augmented = transform(image=img, bboxes=bboxes, class_labels=class_labels)
-            aug_img = augmented['image']
-            aug_bboxes = augmented['bboxes']
-            aug_labels = augmented['class_labels']
-
-
-            aug_img_name = f"{base_name}_aug{i}.jpg"
-            cv2.imwrite(os.path.join(dst_img_dir, aug_img_name), aug_img)
-
+        selected.append((base_name, img_path, lbl_path, bboxes, class_labels, apply_rotation))
 
-            aug_label_name = f"{base_name}_aug{i}.txt"
-            with open(os.path.join(dst_lbl_dir, aug_label_name), 'w') as fw:
-                for bb, lab in zip(aug_bboxes, aug_labels):
-                    x_c, y_c, w, h = bb
-                    fw.write(f"{lab} {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n")
+    def decoded(writer):
+        lectures = ReadAhead([item[1] for item in selected], FS)
+        for (base_name, img_path, lbl_path, bboxes, class_labels, apply_rotation), (_, data) in zip(selected, lectures):
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if data else None
+            if img is None:
+                print(f"[AUGMENT] Image illisible, ignorée : {img_path}")
+                continue
+            # Original copié tel quel (avec son label) seulement s'il a pu être décodé
+            writer.write(os.path.join(dst_img_dir, os.path.basename(img_path)), data)
+            writer.write(os.path.join(dst_lbl_dir, os.path.basename(lbl_path)), textes[lbl_path].encode())
+            yield (base_name, img, np.array(bboxes, dtype=np.float32).reshape(-1, 4),
+                   class_labels, apply_rotation)
+
+    # Génération des images augmentées, par lots d'images de même taille
+    with StagedWriter(FS) as writer:
+        for base_name, i, aug_img, aug_bboxes, aug_labels in augment_samples(
+                decoded(writer), photometric, num_augment, rotation, batch_size):
+            ok, buf = cv2.imencode(".jpg", aug_img)
+            if not ok:
+                continue
+            writer.write(os.path.join(dst_img_dir, f"{base_name}_aug{i}.jpg"), buf.tobytes())
+            lignes = "".join(f"{lab} {x_c:.6f} {y_c:.6f} {w:.6f} {h:.6f}\n"
+                             for (x_c, y_c, w, h), lab in zip(aug_bboxes, aug_labels))
+            writer.write(os.path.join(dst_lbl_dir, f"{base_name}_aug{i}.txt"), lignes.encode())
 
 augment_dataset(FUSED_IMAGE, FUSED_LABEL, AUG_IMAGE, AUG_LABEL,
-                transform_with_rotation, transform_without_rotation,
+                photometric, rotation,
                 target_classes_to_augment=TARGET_CLASSES_TO_AUGMENT, num_augment=num_augment)
 
 print("Augmentation appliquée pour les classes spécifiées.")
@@ -885,17 +751,18 @@ def split_dataset(img_dir, lbl_dir, final_dir, train_ratio=0.8, val_ratio=0.1, t
         os.makedirs(os.path.join(final_dir, s, "images"), exist_ok=True)
         os.makedirs(os.path.join(final_dir, s, "labels"), exist_ok=True)
 
+    images = images_by_stem(img_dir)
+
     def copy_files(lbl_list, subset):
+        copies = []
         for lblf in lbl_list:
             base = lblf.replace(".txt", "")
-            shutil.copy2(os.path.join(lbl_dir, lblf),
-                         os.path.join(final_dir, subset, "labels", lblf))
-            jpgp = os.path.join(img_dir, base + ".jpg")
-            pngp = os.path.join(img_dir, base + ".png")
-            if os.path.exists(jpgp):
-                shutil.copy2(jpgp, os.path.join(final_dir, subset, "images", base + ".jpg"))
-            elif os.path.exists(pngp):
-                shutil.copy2(pngp, os.path.join(final_dir, subset, "images", base + ".png"))
+            copies.append((os.path.join(lbl_dir, lblf),
+                           os.path.join(final_dir, subset, "labels", lblf)))
+            img_path = images.get(base)
+            if img_path is not None:
+                copies.append((img_path, os.path.join(final_dir, subset, "images", os.path.basename(img_path))))
+        copy_many(copies, FS)
 
     copy_files(train_files, "train")
     copy_files(val_files, "val")
@@ -1087,30 +954,33 @@ with open(yaml_path, "w") as f:
     yaml.dump(data, f, sort_keys=False)
 print(f"\nFichier YAML corrigé sauvegardé dans {yaml_path}")
 
-import os
-def validate_yolo_annotations(label_dir):
-
-    for lbl_file in os.listdir(label_dir):
-        if not lbl_file.endswith(".txt"):
-            continue
+# Shards tar du split final : l'entraînement et la prédiction lisent quelques gros
+# fichiers séquentiellement au lieu de milliers de petits fichiers sur Drive.
+# Les noms de classes du YAML ci-dessus sont stockés dans les shards.
+from shards_brssd import write_shards
+from evaluate_brssd import load_class_names
+shards = write_shards(FINAL_DATA_DIR, FINAL_DATA_DIR + "_shards", names=load_class_names(yaml_path))
+for s, infos in shards["splits"].items():
+    print(f"[SHARDS] {s}: {len(infos)} shard(s), {sum(i['samples'] for i in infos)} images")
 
-        with open(os.path.join(label_dir, lbl_file), 'r') as f:
-            lines = f.readlines()
-            for line in lines:
-                parts = line.strip().split()
-                if len(parts) != 5:
-                    print(f"[Erreur] Mauvais format : {lbl_file} -> {line}")
-                    continue
-
-                cls_id, x_c, y_c, w, h = parts
-                try:
-                    x_c, y_c, w, h = float(x_c), float(y_c), float(w), float(h)
-                    if not (0 <= x_c <= 1 and 0 <= y_c <= 1 and 0 <= w <= 1 and 0 <= h <= 1):
-                        print(f"[Erreur] Valeur hors bornes dans : {lbl_file} -> {line}")
-                except ValueError:
-                    print(f"[Erreur] Valeur non valide dans : {lbl_file} -> {line}")
-
-validate_yolo_annotations("/content/drive/MyDrive/DATASIGNALISATION/final_dataset/train/labels")
+import os
+def validate_yolo_annotations(label_dir, image_dir=None, min_box_px=4):
+    """
+    Vérification en lecture seule avec les mêmes étapes que label_pipeline :
+    format, bornes [0, 1] et taille minimale en pixels (si image_dir est donné).
+    """
+    from label_pipeline import LabelPipeline, check_bounds, min_box_size, print_report
+
+    steps = [check_bounds()]
+    if image_dir is not None:
+        steps.append(min_box_size(min_box_px))
+    rapport = LabelPipeline(steps).run(label_dir, src_img_dir=image_dir, fs=FS)
+    if rapport['dropped']:
+        print(f"[Erreur] {sum(rapport['dropped'].values())} annotation(s) invalide(s) :")
+    print_report(rapport)
+
+validate_yolo_annotations("/content/drive/MyDrive/DATASIGNALISATION/final_dataset/train/labels",
+                          "/content/drive/MyDrive/DATASIGNALISATION/final_dataset/train/images")
 
 !pip install ultralytics
 
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Incremental Re-Evaluation for BRSSD
+Caches per-image predictions and match statistics keyed by image, label
+and model hashes, so validation after small dataset edits only touches
+the images that changed
+"""
+
+import io
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+from evaluate_brssd import (IMAGE_EXTENSIONS, IOU_THRESHOLDS, image_stats, load_class_names,
+                            parse_label_text, print_report, summarize, update_confusion)
+
+DEFAULT_CACHE = 'runs/eval_cache.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    sha256 TEXT
+);
+CREATE TABLE IF NOT EXISTS image_results (
+    path TEXT NOT NULL,
+    model_key TEXT NOT NULL,
+    image_hash TEXT NOT NULL,
+    label_hash TEXT,
+    preds BLOB NOT NULL,
+    stats BLOB,
+    PRIMARY KEY (path, model_key)
+);
+"""
+
+
+def pack(**arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    return buf.getvalue()
+
+
+def unpack(blob):
+    with np.load(io.BytesIO(blob)) as data:
+        return {k: data[k] for k in data.files}
+
+
+class EvalCache:
+    """SQLite cache of file hashes and per-image results"""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+
+    def file_hash(self, path):
+        """SHA-256 of a file, re-read only when its size or mtime changed"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        st = path.stat()
+        row = self.conn.execute("SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?",
+                                (str(path),)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        self.conn.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                          (str(path), st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def lookup(self, path, model_key):
+        return self.conn.execute(
+            "SELECT image_hash, label_hash, preds, stats FROM image_results "
+            "WHERE path = ? AND model_key = ?", (str(path), model_key)).fetchone()
+
+    def store(self, path, model_key, image_hash, label_hash, preds, stats):
+        self.conn.execute("INSERT OR REPLACE INTO image_results VALUES (?, ?, ?, ?, ?, ?)",
+                          (str(path), model_key, image_hash, label_hash, preds, stats))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def resolve_split(data_yaml, split='val'):
+    """Image and label directories of a dataset split"""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    root = Path(data.get('path', '.'))
+    if not root.is_absolute() and not root.exists():
+        root = Path(data_yaml).parent / root
+    images = root / data[split]
+    labels = Path(str(images).replace('/images', '/labels'))
+    return images, labels
+
+
+def run_inference(model, paths, imgsz, conf, iou, device, batch):
+    """{path: (classes, xywhn boxes, confidences)} for the given images"""
+    out = {}
+    for i in range(0, len(paths), batch):
+        chunk = [str(p) for p in paths[i:i + batch]]
+        for path, result in zip(chunk, model.predict(chunk, imgsz=imgsz, conf=conf, iou=iou,
+                                                     device=device, verbose=False)):
+            boxes = result.boxes
+            out[path] = (boxes.cls.cpu().numpy().astype(int), boxes.xywhn.cpu().numpy(),
+                         boxes.conf.cpu().numpy())
+    return out
+
+
+def reevaluate(weights, data_yaml='brssd_data.yaml', split='val', imgsz=640, conf=0.001, iou=0.7,
+               device='cpu', batch=16, cache_path=DEFAULT_CACHE):
+    """
+    Evaluate weights on a split, reusing cached work for unchanged images.
+
+    An image is re-predicted only if its bytes or the model changed, and
+    re-matched only if that or its label file changed. Metrics are then
+    aggregated from the per-image statistics of the whole split.
+    """
+    start = time.perf_counter()
+    images_dir, labels_dir = resolve_split(data_yaml, split)
+    images = sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    names = load_class_names(data_yaml)
+    nc = len(names) if names else None
+
+    cache = EvalCache(cache_path)
+    settings = json.dumps({'imgsz': imgsz, 'conf': conf, 'iou': iou}, sort_keys=True)
+    model_key = hashlib.sha256((cache.file_hash(weights) + settings).encode()).hexdigest()
+
+    entries, to_predict = {}, []
+    counts = {'reused': 0, 'rematched': 0, 'predicted': 0}
+    for path in images:
+        label_path = labels_dir / f"{path.stem}.txt"
+        image_hash = cache.file_hash(path)
+        label_hash = cache.file_hash(label_path)
+        row = cache.lookup(path, model_key)
+        entry = {'image_hash': image_hash, 'label_hash': label_hash, 'label_path': label_path}
+        if row and row[0] == image_hash:
+            entry['preds'] = unpack(row[2])
+            if row[1] == label_hash and row[3] is not None:
+                entry['stats'] = unpack(row[3])
+        else:
+            to_predict.append(path)
+        entries[path] = entry
+
+    if to_predict:
+        from ultralytics import YOLO
+        print(f"Predicting {len(to_predict)} new or changed images...")
+        model = YOLO(str(weights))
+        predictions = run_inference(model, to_predict, imgsz, conf, iou, device, batch)
+        for path in to_predict:
+            cls, boxes, scores = predictions[str(path)]
+            entries[path]['preds'] = {'cls': cls, 'boxes': boxes, 'conf': scores}
+
+    per_image = {}
+    matrix_size = None
+    for path, entry in entries.items():
+        preds = entry['preds']
+        pred = (preds['cls'].astype(int), preds['boxes'].reshape(-1, 4), preds['conf'])
+        label_path = entry['label_path']
+        if label_path.exists():
+            gt = parse_label_text(label_path.read_text())[:2]
+        else:
+            gt = (np.zeros(0, dtype=int), np.zeros((0, 4)))
+        entry['gt'], entry['pred'] = gt, pred
+
+        if path in to_predict:
+            counts['predicted'] += 1
+        elif 'stats' in entry:
+            counts['reused'] += 1
+        else:
+            counts['rematched'] += 1
+
+        if 'stats' not in entry:
+            entry['stats'] = image_stats(gt, pred, IOU_THRESHOLDS)
+            cache.store(path, model_key, entry['image_hash'], entry['label_hash'],
+                        pack(**preds), pack(**entry['stats']))
+        per_image[path.stem] = entry['stats']
+        largest = max([int(gt[0].max()) if len(gt[0]) else -1, int(pred[0].max()) if len(pred[0]) else -1])
+        matrix_size = max(matrix_size or 0, largest + 1)
+    cache.close()
+
+    nc = max(nc or 0, matrix_size or 0)
+    # The confusion matrix is cheap to rebuild from the cached predictions
+    matrix = np.zeros((nc + 1, nc + 1), dtype=np.int64)
+    for entry in entries.values():
+        update_confusion(matrix, entry['gt'], entry['pred'])
+
+    report = summarize(per_image, matrix, nc, names)
+    report['cache'] = dict(counts, seconds=round(time.perf_counter() - start, 2))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Re-evaluate a model, recomputing only changed images',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # First run predicts every validation image and fills the cache
+  python reevaluate_brssd.py --weights runs/brssd/YOLOv10m_BRSSD/weights/best.pt
+
+  # After fixing a few labels only those images are re-matched (no inference)
+  python reevaluate_brssd.py --weights runs/brssd/YOLOv10m_BRSSD/weights/best.pt --out eval.json
+
+Predictions come from model.predict, so numbers can differ slightly from
+model.val(), which uses rectangular batches.
+        """
+    )
+    parser.add_argument('--weights', required=True, help='Trained checkpoint')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--split', type=str, default='val', help='Split to evaluate (val, test)')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--conf', type=float, default=0.001, help='Confidence threshold for predictions')
+    parser.add_argument('--iou', type=float, default=0.7, help='NMS IoU threshold')
+    parser.add_argument('--device', type=str, default='cpu', help='Device: cpu, 0, 0,1, etc.')
+    parser.add_argument('--batch', type=int, default=16, help='Images per inference batch')
+    parser.add_argument('--cache', type=str, default=DEFAULT_CACHE, help='Cache database')
+    parser.add_argument('--out', type=str, default=None, help='Write the full report to this JSON file')
+    args = parser.parse_args()
+
+    if not Path(args.weights).exists():
+        print(f"✗ Checkpoint not found: {args.weights}")
+        return 1
+
+    report = reevaluate(args.weights, args.data, split=args.split, imgsz=args.imgsz, conf=args.conf,
+                        iou=args.iou, device=args.device, batch=args.batch, cache_path=args.cache)
+    print_report(report)
+    c = report['cache']
+    print(f"  Cache: {c['reused']} reused, {c['rematched']} re-matched, "
+          f"{c['predicted']} predicted in {c['seconds']}s")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f)
+        print(f"✓ Report saved to: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Experiment Registry for BRSSD Training Runs
+Indexes run folders and zipped runs (args.yaml, results.csv, final
+metrics, benchmark latency, weight hashes) into SQLite and answers
+queries without unzipping anything
+"""
+
+import io
+import csv
+import sys
+import json
+import hashlib
+import sqlite3
+import zipfile
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import yaml
+
+DEFAULT_DB = 'runs/registry.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    content_hash TEXT,
+    indexed_at TEXT,
+    model TEXT,
+    epochs INTEGER,
+    epochs_completed INTEGER,
+    best_epoch INTEGER,
+    map50 REAL,
+    map50_95 REAL,
+    precision REAL,
+    recall REAL,
+    fitness REAL,
+    latency_ms REAL,
+    params INTEGER,
+    gflops REAL
+);
+CREATE TABLE IF NOT EXISTS hyperparams (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (run_id, key)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    epoch INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, epoch, metric)
+);
+CREATE TABLE IF NOT EXISTS weights (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    file TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (run_id, file)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (run_id, path)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_map ON runs(map50_95);
+CREATE INDEX IF NOT EXISTS idx_runs_latency ON runs(latency_ms);
+"""
+
+# Sortable run columns exposed on the command line
+METRIC_COLUMNS = ['map50_95', 'map50', 'precision', 'recall', 'fitness', 'latency_ms',
+                  'params', 'gflops', 'epochs_completed']
+
+
+def connect(db_path=DEFAULT_DB):
+    """Open (and create if needed) the registry database"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def sha256_stream(f, chunk_size=1 << 20):
+    """SHA-256 of a binary file object, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_results_csv(text):
+    """Rows of an Ultralytics results.csv as {metric: float} dicts"""
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        parsed = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            try:
+                parsed[key.strip()] = float(value)
+            except (TypeError, ValueError):
+                continue
+        if parsed:
+            rows.append(parsed)
+    return rows
+
+
+def summarize_results(rows):
+    """Final metrics of a run, taken from its best epoch (the one saved as best.pt)"""
+    if not rows:
+        return {}
+
+    def fitness(row):
+        # Same weighting Ultralytics uses to pick best.pt
+        return 0.1 * row.get('metrics/mAP50(B)', 0.0) + 0.9 * row.get('metrics/mAP50-95(B)', 0.0)
+
+    best = max(rows, key=fitness)
+    return {
+        'epochs_completed': len(rows),
+        'best_epoch': int(best.get('epoch', rows.index(best) + 1)),
+        'map50': best.get('metrics/mAP50(B)'),
+        'map50_95': best.get('metrics/mAP50-95(B)'),
+        'precision': best.get('metrics/precision(B)'),
+        'recall': best.get('metrics/recall(B)'),
+        'fitness': round(fitness(best), 5),
+    }
+
+
+class RunDir:
+    """A training run stored as a folder (runs/brssd/<name>)"""
+
+    kind = 'dir'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.source = str(self.path)
+
+    def files(self):
+        """(relative path, size, mtime_ns) of every file in the run"""
+        entries = []
+        for p in sorted(self.path.rglob('*')):
+            if p.is_file():
+                st = p.stat()
+                entries.append((p.relative_to(self.path).as_posix(), st.st_size, st.st_mtime_ns))
+        return entries
+
+    def read_text(self, rel):
+        p = self.path / rel
+        return p.read_text() if p.exists() else None
+
+    def hash_file(self, rel):
+        with open(self.path / rel, 'rb') as f:
+            return sha256_stream(f)
+
+
+class RunZip:
+    """A training run stored as a zip archive (YOLOv10m_training27.zip)"""
+
+    kind = 'zip'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.source = str(self.path)
+        with zipfile.ZipFile(self.path) as zf:
+            self.members = {self._strip(i.filename): i for i in zf.infolist() if not i.is_dir()}
+            tops = {i.filename.split('/')[0] for i in zf.infolist() if '/' in i.filename}
+        # Name after the folder inside the archive; copies like "x (2).zip" share it
+        self.name = tops.pop() if len(tops) == 1 else self.path.stem
+
+    @staticmethod
+    def _strip(filename):
+        parts = filename.split('/', 1)
+        return parts[1] if len(parts) == 2 else filename
+
+    def files(self):
+        return [(rel, info.file_size, info.CRC) for rel, info in sorted(self.members.items())]
+
+    def read_text(self, rel):
+        info = self.members.get(rel)
+        if info is None:
+            return None
+        with zipfile.ZipFile(self.path) as zf:
+            return zf.read(info).decode('utf-8', errors='replace')
+
+    def hash_file(self, rel):
+        with zipfile.ZipFile(self.path) as zf, zf.open(self.members[rel]) as f:
+            return sha256_stream(f)
+
+
+def fingerprint(run):
+    """Cheap change detector: file list with sizes and mtimes (or zip size/mtime)"""
+    digest = hashlib.sha256()
+    if run.kind == 'zip':
+        st = run.path.stat()
+        digest.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    else:
+        for entry in run.files():
+            digest.update(repr(entry).encode())
+    return digest.hexdigest()
+
+
+def content_hash(run):
+    """Hash of a zipped run's members and CRCs, equal for duplicated archives"""
+    digest = hashlib.sha256()
+    for entry in run.files():
+        digest.update(repr(entry).encode())
+    return digest.hexdigest()
+
+
+def ingest_run(conn, run):
+    """Insert or replace one run and its hyperparameters, results and weight hashes"""
+    files = run.files()
+
+    args = yaml.safe_load(run.read_text('args.yaml') or '') or {}
+    rows = parse_results_csv(run.read_text('results.csv') or '')
+    summary = summarize_results(rows)
+    bench = json.loads(run.read_text('benchmark.json') or '{}')
+
+    record = {
+        'name': args.get('name') or run.name,
+        'source': run.source,
+        'kind': run.kind,
+        'fingerprint': fingerprint(run),
+        'content_hash': content_hash(run) if run.kind == 'zip' else None,
+        'indexed_at': datetime.now().isoformat(timespec='seconds'),
+        'model': args.get('model'),
+        'epochs': args.get('epochs'),
+        'latency_ms': bench.get('latency_ms'),
+        'params': bench.get('params'),
+        'gflops': bench.get('gflops'),
+    }
+    record.update(summary)
+    # Benchmarks run after training measure the final weights; prefer their mAP
+    for key in ('map50', 'map50_95'):
+        if bench.get(key) is not None and record.get(key) is None:
+            record[key] = bench[key]
+
+    conn.execute("DELETE FROM runs WHERE source = ?", (run.source,))
+    columns = list(record)
+    cur = conn.execute(
+        f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [record[c] for c in columns])
+    run_id = cur.lastrowid
+
+    conn.executemany("INSERT INTO hyperparams VALUES (?, ?, ?)",
+                     [(run_id, k, json.dumps(v)) for k, v in args.items()])
+    conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                     [(run_id, int(row.get('epoch', i + 1)), metric, value)
+                      for i, row in enumerate(rows) for metric, value in row.items()
+                      if metric != 'epoch'])
+    conn.executemany("INSERT INTO weights VALUES (?, ?, ?, ?)",
+                     [(run_id, rel, run.hash_file(rel), size)
+                      for rel, size, _ in files if rel.endswith('.pt')])
+    conn.executemany("INSERT INTO artifacts VALUES (?, ?, ?)",
+                     [(run_id, rel, size) for rel, size, _ in files])
+    return run_id
+
+
+def discover_runs(paths):
+    """Run folders (anything with args.yaml or results.csv) and zip archives under paths"""
+    runs = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file() and path.suffix == '.zip':
+            runs.append(RunZip(path))
+        elif path.is_dir():
+            dirs = {p.parent for pattern in ('args.yaml', 'results.csv') for p in path.rglob(pattern)}
+            runs.extend(RunDir(d) for d in sorted(dirs))
+    return runs
+
+
+def index_runs(conn, paths):
+    """Incrementally (re)index runs; only new or changed runs are read"""
+    known = {row['source']: row['fingerprint']
+             for row in conn.execute("SELECT source, fingerprint FROM runs")}
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    seen = set()
+    for run in discover_runs(paths):
+        seen.add(run.source)
+        try:
+            if known.get(run.source) == fingerprint(run):
+                counts['unchanged'] += 1
+                continue
+            with conn:
+                ingest_run(conn, run)
+            counts['updated' if run.source in known else 'added'] += 1
+            print(f"  ✓ {run.name:<30} {run.source}")
+        except Exception as e:
+            counts['failed'] += 1
+            print(f"  ✗ {run.source}: {e}")
+
+    # Forget runs that were deleted from the scanned locations
+    scanned = [str(Path(p)) for p in paths]
+    with conn:
+        for source in known:
+            under_scan = any(source == s or source.startswith(s.rstrip('/') + '/') for s in scanned)
+            if under_scan and source not in seen:
+                conn.execute("DELETE FROM runs WHERE source = ?", (source,))
+                counts['removed'] += 1
+    return counts
+
+
+def resolve_run(conn, ref):
+    """Find a run by id, name or source path"""
+    if str(ref).isdigit():
+        row = conn.execute("SELECT * FROM runs WHERE id = ?", (int(ref),)).fetchone()
+        if row:
+            return row
+    rows = conn.execute("SELECT * FROM runs WHERE name = ? OR source = ?", (ref, ref)).fetchall()
+    if not rows:
+        raise KeyError(f"No run matches '{ref}'")
+    if len(rows) > 1:
+        choices = ', '.join(f"{r['id']} ({r['source']})" for r in rows)
+        raise KeyError(f"'{ref}' is ambiguous, use an id: {choices}")
+    return rows[0]
+
+
+def best_runs(conn, metric='map50_95', max_latency=None, top=5):
+    """Runs ranked by metric, optionally only those at or under max_latency ms"""
+    if metric not in METRIC_COLUMNS:
+        raise ValueError(f"Unknown metric '{metric}'")
+    query = f"SELECT * FROM runs WHERE {metric} IS NOT NULL"
+    params = []
+    if max_latency is not None:
+        query += " AND latency_ms IS NOT NULL AND latency_ms <= ?"
+        params.append(max_latency)
+    query += f" ORDER BY {metric} DESC LIMIT ?"
+    params.append(top)
+    return conn.execute(query, params).fetchall()
+
+
+def hyperparam_diff(conn, run_a, run_b):
+    """{key: (value_a, value_b)} for hyperparameters that differ between two runs"""
+    def params(run_id):
+        return {r['key']: json.loads(r['value'])
+                for r in conn.execute("SELECT key, value FROM hyperparams WHERE run_id = ?", (run_id,))}
+
+    a, b = params(run_a['id']), params(run_b['id'])
+    # Bookkeeping keys always differ and say nothing about the experiment
+    ignore = {'name', 'save_dir'}
+    return {k: (a.get(k), b.get(k)) for k in sorted(set(a) | set(b))
+            if k not in ignore and a.get(k) != b.get(k)}
+
+
+def fmt(value, digits=4):
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+
+def print_runs(rows):
+    """Print runs as a table"""
+    print(f"{'ID':>4} {'Name':<28} {'Model':<14} {'Ep':>4} {'mAP50':>7} {'mAP50-95':>9} "
+          f"{'CPU ms':>8} {'Source'}")
+    print(f"{'-'*4} {'-'*28} {'-'*14} {'-'*4} {'-'*7} {'-'*9} {'-'*8} {'-'*20}")
+    for r in rows:
+        print(f"{r['id']:>4} {r['name'][:28]:<28} {fmt(r['model'])[:14]:<14} "
+              f"{fmt(r['epochs_completed']):>4} {fmt(r['map50']):>7} {fmt(r['map50_95']):>9} "
+              f"{fmt(r['latency_ms'], 1):>8} {r['source']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Index BRSSD training runs into SQLite and query them',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Index runs/ and the zipped runs in the current directory
+  python registry_brssd.py index
+
+  # Best mAP50-95 among models faster than 80 ms on CPU
+  python registry_brssd.py best --max-latency 80
+
+  # Which hyperparameters differ between two runs
+  python registry_brssd.py diff YOLOv10n_BRSSD YOLOv10s_BRSSD
+
+Latency comes from benchmark.json, written by benchmark_brssd.py.
+        """
+    )
+    parser.add_argument('--db', type=str, default=DEFAULT_DB, help='Registry database file')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('index', help='Add new and changed runs to the registry')
+    p.add_argument('paths', nargs='*', help='Run directories to scan and zip files '
+                                            '(default: runs/ and ./*.zip)')
+
+    p = sub.add_parser('list', help='List indexed runs')
+    p.add_argument('--sort', choices=METRIC_COLUMNS, default='map50_95', help='Sort column')
+
+    p = sub.add_parser('best', help='Best runs by a metric, optionally under a latency budget')
+    p.add_argument('--metric', choices=METRIC_COLUMNS, default='map50_95', help='Ranking metric')
+    p.add_argument('--max-latency', type=float, default=None, help='CPU latency budget in ms')
+    p.add_argument('--top', type=int, default=5, help='Number of runs to show')
+
+    p = sub.add_parser('diff', help='Hyperparameter differences between two runs')
+    p.add_argument('run_a', help='Run id, name or source path')
+    p.add_argument('run_b', help='Run id, name or source path')
+
+    p = sub.add_parser('show', help='Details of one run')
+    p.add_argument('run', help='Run id, name or source path')
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+
+    try:
+        if args.command == 'index':
+            paths = args.paths or ['runs'] + sorted(str(p) for p in Path('.').glob('*.zip'))
+            print(f"Indexing into {args.db}...")
+            counts = index_runs(conn, paths)
+            print("✓ " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+
+        elif args.command == 'list':
+            direction = 'ASC' if args.sort == 'latency_ms' else 'DESC'
+            rows = conn.execute(f"SELECT * FROM runs ORDER BY {args.sort} IS NULL, "
+                                f"{args.sort} {direction}, id").fetchall()
+            print_runs(rows)
+
+        elif args.command == 'best':
+            rows = best_runs(conn, args.metric, args.max_latency, args.top)
+            if not rows:
+                print("No matching runs")
+                if args.max_latency is not None:
+                    missing = conn.execute("SELECT COUNT(*) FROM runs WHERE latency_ms IS NULL").fetchone()[0]
+                    print(f"  {missing} run(s) have no latency; run benchmark_brssd.py on their weights")
+                return 1
+            print_runs(rows)
+
+        elif args.command == 'diff':
+            run_a, run_b = resolve_run(conn, args.run_a), resolve_run(conn, args.run_b)
+            diff = hyperparam_diff(conn, run_a, run_b)
+            if not diff:
+                print("No hyperparameter differences")
+                return 0
+            print(f"{'Parameter':<20} {run_a['name'][:25]:<25} {run_b['name'][:25]:<25}")
+            print(f"{'-'*20} {'-'*25} {'-'*25}")
+            for key, (a, b) in diff.items():
+                print(f"{key:<20} {fmt(a):<25} {fmt(b):<25}")
+
+        elif args.command == 'show':
+            run = resolve_run(conn, args.run)
+            for key in run.keys():
+                print(f"  {key:<18} {fmt(run[key])}")
+            weights = conn.execute("SELECT file, sha256, size FROM weights WHERE run_id = ?",
+                                   (run['id'],)).fetchall()
+            for w in weights:
+                print(f"  weights: {w['file']:<20} {w['sha256'][:16]}  {w['size'] / 1e6:.1f} MB")
+            if run['content_hash']:
+                dupes = conn.execute("SELECT source FROM runs WHERE content_hash = ? AND id != ?",
+                                     (run['content_hash'], run['id'])).fetchall()
+                for d in dupes:
+                    print(f"  duplicate of: {d['source']}")
+    except (KeyError, ValueError) as e:
+        print(f"✗ {e.args[0] if e.args else e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
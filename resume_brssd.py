@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Crash-Safe Training Helpers for BRSSD
+Finds interrupted runs to resume and keeps the dataloader order
+deterministic across interruptions
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+import torch
+from torch.utils.data import RandomSampler, Sampler
+
+
+def load_checkpoint_info(weights_path):
+    """Read the resumable state of an Ultralytics checkpoint"""
+    ckpt = torch.load(weights_path, map_location='cpu', weights_only=False)
+    train_args = ckpt.get('train_args') or {}
+    return {
+        'path': Path(weights_path),
+        'epoch': ckpt.get('epoch', -1),
+        'epochs': train_args.get('epochs'),
+        'has_optimizer': ckpt.get('optimizer') is not None,
+        'has_ema': ckpt.get('ema') is not None,
+    }
+
+
+def is_incomplete(info):
+    """A run is resumable if its last.pt still carries optimizer state"""
+    # Finished runs are stripped: optimizer/EMA removed and epoch set to -1
+    if not info['has_optimizer'] or info['epoch'] is None or info['epoch'] < 0:
+        return False
+    return info['epochs'] is None or info['epoch'] + 1 < info['epochs']
+
+
+def find_incomplete_run(project='runs/brssd', name=None):
+    """Return the most recently updated resumable last.pt under project, or None"""
+    project = Path(project)
+    if not project.exists():
+        return None
+
+    pattern = f'{name}/weights/last.pt' if name else '*/weights/last.pt'
+    candidates = sorted(project.glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+    for last_pt in candidates:
+        try:
+            info = load_checkpoint_info(last_pt)
+        except Exception as e:
+            print(f"⚠️  Skipping unreadable checkpoint {last_pt}: {e}")
+            continue
+        if is_incomplete(info):
+            return info
+    return None
+
+
+class EpochSeededSampler(Sampler):
+    """Random sampler whose permutation depends only on (seed, epoch)"""
+
+    def __init__(self, num_samples, seed=0, epoch=0):
+        self.num_samples = num_samples
+        self.seed = seed
+        self.epoch = epoch
+
+    def __len__(self):
+        return self.num_samples
+
+    def __iter__(self):
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        self.epoch += 1
+        return iter(torch.randperm(self.num_samples, generator=generator).tolist())
+
+
+def add_deterministic_order(model, seed=0):
+    """
+    Make the training dataloader order reproducible across resumes.
+
+    The stock loader draws every epoch's shuffle from one generator seeded
+    at start-up, so a resumed run sees a different order than an
+    uninterrupted one. Replacing the sampler with one keyed on the epoch
+    number gives both the same sequence.
+    """
+    state = {}
+
+    def install_sampler(trainer):
+        loader = trainer.train_loader
+        batch_sampler = getattr(loader.batch_sampler, 'sampler', loader.batch_sampler)
+        if not isinstance(getattr(batch_sampler, 'sampler', None), RandomSampler):
+            return  # distributed or unshuffled loaders keep their own order
+        sampler = EpochSeededSampler(len(loader.dataset), seed=seed, epoch=trainer.start_epoch)
+        batch_sampler.sampler = sampler
+        state['sampler'] = sampler
+        if hasattr(loader, 'reset'):
+            loader.reset()
+
+    def realign_on_reset(trainer):
+        # The trainer rebuilds the loader iterator when mosaic is closed;
+        # make the fresh iterator start at the current epoch's permutation
+        sampler = state.get('sampler')
+        if sampler is not None and trainer.epoch == trainer.epochs - trainer.args.close_mosaic:
+            sampler.epoch = trainer.epoch
+
+    model.add_callback('on_pretrain_routine_end', install_sampler)
+    model.add_callback('on_train_epoch_start', realign_on_reset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List resumable BRSSD training runs')
+    parser.add_argument('--project', type=str, default='runs/brssd', help='Runs directory')
+    args = parser.parse_args()
+
+    project = Path(args.project)
+    runs = sorted(project.glob('*/weights/last.pt')) if project.exists() else []
+    if not runs:
+        print(f"No checkpoints found under {project}/")
+        return 0
+
+    print(f"{'Run':<30} {'Epoch':<12} {'Status'}")
+    print(f"{'-'*30} {'-'*12} {'-'*12}")
+    for last_pt in runs:
+        try:
+            info = load_checkpoint_info(last_pt)
+        except Exception as e:
+            print(f"{last_pt.parent.parent.name:<30} {'?':<12} unreadable ({e})")
+            continue
+        status = 'resumable' if is_incomplete(info) else 'finished'
+        epoch = f"{info['epoch'] + 1}/{info['epochs']}" if info['epoch'] >= 0 else '-'
+        print(f"{last_pt.parent.parent.name:<30} {epoch:<12} {status}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
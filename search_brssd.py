@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Search for YOLOv10 on BRSSD
+Runs short trials in parallel on a data subset, stops weak trials early
+with ASHA (asynchronous successive halving) rungs and promotes the best
+configurations to full training
+"""
+
+import os
+import sys
+import csv
+import math
+import time
+import random
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import yaml
+
+# name: (low, high, scale) - same knobs as training_args in train_brssd_improved.py
+SEARCH_SPACE = {
+    'lr0': (1e-4, 1e-1, 'log'),
+    'lrf': (0.01, 0.5, 'linear'),
+    'momentum': (0.7, 0.98, 'linear'),
+    'weight_decay': (1e-5, 1e-3, 'log'),
+    'warmup_epochs': (0.0, 5.0, 'linear'),
+    'hsv_h': (0.0, 0.05, 'linear'),
+    'hsv_s': (0.0, 0.9, 'linear'),
+    'hsv_v': (0.0, 0.9, 'linear'),
+    'translate': (0.0, 0.3, 'linear'),
+    'scale': (0.0, 0.9, 'linear'),
+    'mosaic': (0.0, 1.0, 'linear'),
+    'mixup': (0.0, 0.3, 'linear'),
+    'box': (2.0, 15.0, 'linear'),
+    'cls': (0.2, 4.0, 'log'),
+    'dfl': (0.5, 3.0, 'linear'),
+}
+
+RESULT_FIELDS = ['trial', 'rung', 'epochs', 'status', 'fitness', 'map50', 'map50_95',
+                 'precision', 'recall', 'seconds', 'run_dir']
+
+
+def sample_config(rng, space=SEARCH_SPACE):
+    """Draw one configuration from the search space"""
+    config = {}
+    for name, (low, high, scale) in space.items():
+        if scale == 'log':
+            value = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            value = rng.uniform(low, high)
+        config[name] = round(value, 6)
+    return config
+
+
+def rung_budgets(min_epochs, max_epochs, eta):
+    """Epoch budget of each rung: min_epochs * eta**k, capped at max_epochs"""
+    budgets = [min_epochs]
+    while budgets[-1] * eta <= max_epochs:
+        budgets.append(budgets[-1] * eta)
+    return budgets
+
+
+def make_subset_yaml(data_yaml, out_dir, train_fraction=0.25, val_fraction=0.5, seed=0):
+    """Write a data YAML pointing at random subsets of the train/val images"""
+    with open(data_yaml, 'r') as f:
+        config = yaml.safe_load(f)
+
+    root = Path(config.get('path', '.'))
+    if not root.is_absolute():
+        root = (Path(data_yaml).parent / root).resolve()
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    subset = dict(config)
+    subset['path'] = str(root)
+    for split, fraction in (('train', train_fraction), ('val', val_fraction)):
+        images = sorted(str(p) for p in (root / config[split]).glob('*.*'))
+        if not images:
+            raise FileNotFoundError(f"No images found for split '{split}' in {root / config[split]}")
+        k = max(1, int(len(images) * fraction))
+        chosen = sorted(rng.sample(images, k))
+        list_path = out_dir / f'{split}_subset.txt'
+        list_path.write_text('\n'.join(chosen) + '\n')
+        subset[split] = str(list_path)
+        print(f"  {split}: {k}/{len(images)} images")
+    subset.pop('test', None)
+
+    subset_yaml = out_dir / 'data_subset.yaml'
+    with open(subset_yaml, 'w') as f:
+        yaml.safe_dump(subset, f, sort_keys=False)
+    return subset_yaml
+
+
+def run_trial(spec):
+    """Train one (config, rung) pair; executed in a worker process"""
+    import torch
+    torch.set_num_threads(spec['threads'])
+
+    from ultralytics import YOLO
+
+    start = time.time()
+    run_name = f"trial{spec['trial']:03d}_r{spec['rung']}"
+    result = {'trial': spec['trial'], 'rung': spec['rung'], 'epochs': spec['epochs'],
+              'run_dir': str(Path(spec['project']) / run_name)}
+    try:
+        model = YOLO(spec['model'])
+        metrics = model.train(
+            data=spec['data'],
+            epochs=spec['epochs'],
+            imgsz=spec['imgsz'],
+            batch=spec['batch'],
+            device=spec['device'],
+            workers=spec['workers'],
+            project=spec['project'],
+            name=run_name,
+            exist_ok=True,
+            seed=spec['seed'],
+            deterministic=True,
+            plots=False,
+            verbose=False,
+            patience=0,
+            **spec['config'],
+        )
+        box = metrics.box
+        result.update({
+            'status': 'ok',
+            'fitness': round(0.1 * box.map50 + 0.9 * box.map, 5),
+            'map50': round(box.map50, 5),
+            'map50_95': round(box.map, 5),
+            'precision': round(box.mp, 5),
+            'recall': round(box.mr, 5),
+        })
+    except Exception as e:
+        result.update({'status': f'failed: {type(e).__name__}: {e}', 'fitness': 0.0})
+    result['seconds'] = round(time.time() - start, 1)
+    return result
+
+
+class ASHAScheduler:
+    """Asynchronous successive halving over a fixed number of sampled trials"""
+
+    def __init__(self, num_trials, budgets, eta, seed=0):
+        self.num_trials = num_trials
+        self.budgets = budgets
+        self.eta = eta
+        self.rng = random.Random(seed)
+        self.configs = {}
+        self.rungs = [dict() for _ in budgets]  # trial -> fitness
+        self.promoted = [set() for _ in budgets]
+
+    def next_job(self):
+        """Return (trial, rung) to run next, or None if nothing is ready"""
+        # Promote from the highest rung first: a config in the top 1/eta of
+        # the results seen so far at rung k moves on to rung k+1
+        for k in reversed(range(len(self.budgets) - 1)):
+            ranked = sorted(self.rungs[k].items(), key=lambda item: item[1], reverse=True)
+            for trial, _ in ranked[:len(ranked) // self.eta]:
+                if trial not in self.promoted[k]:
+                    self.promoted[k].add(trial)
+                    return trial, k + 1
+        if len(self.configs) < self.num_trials:
+            trial = len(self.configs)
+            self.configs[trial] = sample_config(self.rng)
+            return trial, 0
+        return None
+
+    def report(self, trial, rung, fitness):
+        self.rungs[rung][trial] = fitness
+
+    def leaderboard(self):
+        """Trials ranked by highest rung reached, then fitness"""
+        best = {}
+        for k, results in enumerate(self.rungs):
+            for trial, fitness in results.items():
+                best[trial] = (k, fitness)
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+
+def write_results(rows, path, config_keys):
+    """Write every trial result (one row per trial and rung) to a CSV table"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS + config_keys, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+def search(model_size='n', data_yaml='brssd_data.yaml', num_trials=27, min_epochs=3,
+           max_epochs=27, eta=3, parallel=2, train_fraction=0.25, val_fraction=0.5,
+           imgsz=640, batch=8, device='cpu', project='runs/brssd_search', seed=0):
+    """Run the ASHA search and return (scheduler, result rows)"""
+    project = Path(project)
+    project.mkdir(parents=True, exist_ok=True)
+    budgets = rung_budgets(min_epochs, max_epochs, eta)
+    config_keys = list(SEARCH_SPACE)
+
+    print("\n" + "=" * 60)
+    print("BRSSD Hyperparameter Search (ASHA)")
+    print("=" * 60)
+    print(f"  Model: yolov10{model_size}.pt")
+    print(f"  Trials: {num_trials} ({parallel} in parallel)")
+    print(f"  Rung budgets (epochs): {budgets}")
+    print(f"  Reduction factor: {eta}")
+    print("\nBuilding data subset...")
+    subset_yaml = make_subset_yaml(data_yaml, project, train_fraction, val_fraction, seed)
+
+    threads = max(1, (os.cpu_count() or 1) // parallel)
+    scheduler = ASHAScheduler(num_trials, budgets, eta, seed=seed)
+    rows = []
+    results_path = project / 'trials.csv'
+
+    def make_spec(trial, rung):
+        return {
+            'trial': trial, 'rung': rung, 'epochs': budgets[rung],
+            'config': scheduler.configs[trial], 'model': f'yolov10{model_size}.pt',
+            'data': str(subset_yaml), 'imgsz': imgsz, 'batch': batch, 'device': device,
+            'workers': 0 if device == 'cpu' else 2, 'project': str(project),
+            'seed': seed, 'threads': threads,
+        }
+
+    ctx = mp.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=parallel, mp_context=ctx) as pool:
+        running = {}
+        while True:
+            while len(running) < parallel:
+                job = scheduler.next_job()
+                if job is None:
+                    break
+                trial, rung = job
+                print(f"  → trial {trial:03d} rung {rung} ({budgets[rung]} epochs)")
+                running[pool.submit(run_trial, make_spec(trial, rung))] = job
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial, rung = running.pop(future)
+                result = future.result()
+                scheduler.report(trial, rung, result['fitness'])
+                rows.append({**result, **scheduler.configs[trial]})
+                write_results(rows, results_path, config_keys)
+                flag = '✓' if result['status'] == 'ok' else '✗'
+                print(f"  {flag} trial {trial:03d} rung {rung}: fitness={result['fitness']:.4f} "
+                      f"({result['seconds']:.0f}s)")
+
+    print(f"\n✓ Search finished: {len(rows)} trial runs recorded in {results_path}")
+    return scheduler, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='ASHA hyperparameter search for YOLOv10 on BRSSD',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 27 trials, rungs of 3/9/27 epochs, 2 trials at a time on a 25% subset
+  python search_brssd.py --model n --trials 27
+
+  # Promote the 2 best configurations to a full 100-epoch training
+  python search_brssd.py --model s --trials 40 --promote 2 --full-epochs 100
+        """
+    )
+    parser.add_argument('--model', choices=['n', 's', 'm', 'l', 'x'], default='n',
+                        help='Model size: n(nano), s(small), m(medium), l(large), x(xlarge)')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--trials', type=int, default=27, help='Number of sampled configurations')
+    parser.add_argument('--min-epochs', type=int, default=3, help='Epoch budget of the first rung')
+    parser.add_argument('--max-epochs', type=int, default=27, help='Largest rung budget')
+    parser.add_argument('--eta', type=int, default=3, help='Keep the top 1/eta at each rung')
+    parser.add_argument('--parallel', type=int, default=2, help='Trials running at the same time')
+    parser.add_argument('--fraction', type=float, default=0.25, help='Fraction of training images used by trials')
+    parser.add_argument('--val-fraction', type=float, default=0.5, help='Fraction of validation images used by trials')
+    parser.add_argument('--imgsz', type=int, default=640, help='Image size')
+    parser.add_argument('--batch', type=int, default=8, help='Batch size per trial')
+    parser.add_argument('--device', type=str, default='cpu', help='Device for trials: cpu, 0, 1, ...')
+    parser.add_argument('--project', type=str, default='runs/brssd_search', help='Output directory')
+    parser.add_argument('--promote', type=int, default=0,
+                        help='Train the top N configurations on the full dataset after the search')
+    parser.add_argument('--full-epochs', type=int, default=100, help='Epochs for promoted full trainings')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for sampling and subsets')
+    args = parser.parse_args()
+
+    if args.eta < 2:
+        parser.error('--eta must be at least 2')
+
+    try:
+        scheduler, rows = search(
+            model_size=args.model, data_yaml=args.data, num_trials=args.trials,
+            min_epochs=args.min_epochs, max_epochs=args.max_epochs, eta=args.eta,
+            parallel=args.parallel, train_fraction=args.fraction,
+            val_fraction=args.val_fraction, imgsz=args.imgsz, batch=args.batch,
+            device=args.device, project=args.project, seed=args.seed,
+        )
+    except FileNotFoundError as e:
+        print(f"\n✗ File not found: {e}")
+        return 1
+
+    leaderboard = scheduler.leaderboard()
+    print(f"\n{'Trial':<8} {'Rung':<6} {'Fitness':<10}")
+    print(f"{'-'*8} {'-'*6} {'-'*10}")
+    for trial, (rung, fitness) in leaderboard[:10]:
+        print(f"{trial:<8} {rung:<6} {fitness:<10.4f}")
+
+    if not leaderboard:
+        print("\n✗ No trial finished")
+        return 1
+
+    project = Path(args.project)
+    best_hyp = project / 'best_hyp.yaml'
+    with open(best_hyp, 'w') as f:
+        yaml.safe_dump(scheduler.configs[leaderboard[0][0]], f, sort_keys=False)
+    print(f"\n✓ Best configuration saved to: {best_hyp}")
+
+    if args.promote > 0:
+        from train_brssd_improved import train_yolov10
+
+        for trial, _ in leaderboard[:args.promote]:
+            print(f"\nPromoting trial {trial:03d} to full training ({args.full_epochs} epochs)...")
+            start = time.time()
+            name = f'YOLOv10{args.model}_BRSSD_trial{trial:03d}'
+            _, _, metrics = train_yolov10(
+                model_size=args.model, epochs=args.full_epochs, imgsz=args.imgsz,
+                data_yaml=args.data, device=args.device, hyp=scheduler.configs[trial], name=name,
+            )
+            box = metrics.box
+            rows.append({
+                'trial': trial, 'rung': 'full', 'epochs': args.full_epochs, 'status': 'ok',
+                'fitness': round(0.1 * box.map50 + 0.9 * box.map, 5),
+                'map50': round(box.map50, 5), 'map50_95': round(box.map, 5),
+                'precision': round(box.mp, 5), 'recall': round(box.mr, 5),
+                'seconds': round(time.time() - start, 1), 'run_dir': f'runs/brssd/{name}',
+                **scheduler.configs[trial],
+            })
+            write_results(rows, project / 'trials.csv', list(SEARCH_SPACE))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
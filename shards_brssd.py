@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Sharded Tar Format for BRSSD Splits
+Packs each split into fixed-size tar shards of image + label records so
+training and prediction read a few large files sequentially instead of
+thousands of small ones, and streams them back with shard-level shuffling
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tarfile
+import argparse
+from io import BytesIO
+from pathlib import Path
+
+import yaml
+
+from drive_io import LocalFileSystem, ReadAhead
+from evaluate_brssd import load_class_names
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+SPLIT_FOLDERS = ('train', 'val', 'valid', 'test')
+INDEX_FILE = 'shards.json'
+SHARD_BYTES = 256 * 1024 * 1024
+
+
+def dataset_splits(dataset_dir):
+    """Split folders (train, val/valid, test) that contain an images/ folder"""
+    return [s for s in SPLIT_FOLDERS if (Path(dataset_dir) / s / 'images').is_dir()]
+
+
+def _tar_size(nbytes):
+    """Bytes a member takes in a tar: 512-byte header plus data padded to 512"""
+    return 512 + (nbytes + 511) // 512 * 512
+
+
+class ShardWriter:
+    """Append samples to <prefix>-00000.tar, <prefix>-00001.tar, ... of about shard_bytes each"""
+
+    def __init__(self, out_dir, prefix, shard_bytes=SHARD_BYTES):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.shard_bytes = shard_bytes
+        self.shards = []
+        self.tar = None
+
+    def _open(self):
+        name = f"{self.prefix}-{len(self.shards):05d}.tar"
+        self.tmp = self.out_dir / f"{name}.tmp"
+        self.tar = tarfile.open(self.tmp, 'w')
+        self.shards.append({'file': name, 'samples': 0, 'bytes': 0})
+
+    def _finish(self):
+        self.tar.close()
+        os.replace(self.tmp, self.out_dir / self.shards[-1]['file'])
+        self.tar = None
+
+    def add(self, key, files):
+        """Write one sample: {extension: bytes}, stored as <key><extension>"""
+        size = sum(_tar_size(len(data)) for data in files.values())
+        if self.tar is not None and self.shards[-1]['bytes'] + size > self.shard_bytes:
+            self._finish()
+        if self.tar is None:
+            self._open()
+        for ext, data in files.items():
+            info = tarfile.TarInfo(f"{key}{ext}")
+            info.size = len(data)
+            info.mtime = 0  # identical input gives identical shards
+            self.tar.addfile(info, BytesIO(data))
+        self.shards[-1]['samples'] += 1
+        self.shards[-1]['bytes'] += size
+
+    def close(self):
+        if self.tar is not None:
+            self._finish()
+        return self.shards
+
+
+def write_shards(dataset_dir, out_dir, shard_bytes=SHARD_BYTES, names=None, seed=0, fs=None):
+    """
+    Pack every split of a dataset folder (split_dataset output or BRSSD/) into tar shards.
+
+    Samples are shuffled once with `seed` before packing, so a shard holds a
+    random mix of classes and shard-level shuffling is enough at read time.
+    Images without a label file get an empty label (background images).
+    """
+    fs = fs or LocalFileSystem()
+    dataset_dir, out_dir = Path(dataset_dir), Path(out_dir)
+    index = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'names': names, 'splits': {}}
+
+    for split in dataset_splits(dataset_dir):
+        images_dir, labels_dir = dataset_dir / split / 'images', dataset_dir / split / 'labels'
+        images = sorted(n for n in fs.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+        random.Random(seed).shuffle(images)
+        paths = []
+        for name in images:
+            paths += [str(images_dir / name), str(labels_dir / f"{os.path.splitext(name)[0]}.txt")]
+
+        writer = ShardWriter(out_dir, split, shard_bytes)
+        reads = iter(ReadAhead(paths, fs))
+        for name, (_, image), (_, label) in zip(images, reads, reads):
+            if image is None:
+                continue
+            stem, ext = os.path.splitext(name)
+            writer.add(stem, {ext.lower(): image, '.txt': label or b''})
+        index['splits'][split] = writer.close()
+
+    with open(out_dir / INDEX_FILE, 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def load_index(shard_dir):
+    """Contents of shards.json: class names and the shard files of each split"""
+    with open(Path(shard_dir) / INDEX_FILE) as f:
+        return json.load(f)
+
+
+def shard_paths(source, split=None):
+    """Shard files of a split in a shard folder, or [source] for a single .tar"""
+    source = Path(source)
+    if source.suffix == '.tar':
+        return [source]
+    splits = load_index(source)['splits']
+    chosen = [split] if split else list(splits)
+    return [source / shard['file'] for s in chosen for shard in splits.get(s, [])]
+
+
+def iter_shard(path):
+    """(key, {extension: bytes}) samples of one shard, read front to back"""
+    key, files = None, {}
+    with tarfile.open(path, 'r|') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            stem, ext = os.path.splitext(member.name)
+            if stem != key and files:
+                yield key, files
+                files = {}
+            key = stem
+            files[ext] = tar.extractfile(member).read()
+    if files:
+        yield key, files
+
+
+def iter_samples(shards, shuffle=False, seed=None, buffer=0, rank=0, world=1):
+    """
+    Stream (key, {extension: bytes}) samples from a list of shards.
+
+    shuffle reorders shards (a different order for each seed, e.g. the
+    epoch); buffer > 0 also mixes samples within a window of that many.
+    rank/world give each worker its own subset of shards.
+    """
+    shards = list(shards)
+    if shuffle:
+        random.Random(seed).shuffle(shards)
+    rng = random.Random(seed)
+    pool = []
+    for path in shards[rank::world]:
+        for sample in iter_shard(path):
+            if buffer <= 0:
+                yield sample
+                continue
+            pool.append(sample)
+            if len(pool) >= buffer:
+                i = rng.randrange(len(pool))
+                pool[i], pool[-1] = pool[-1], pool[i]
+                yield pool.pop()
+    rng.shuffle(pool)
+    yield from pool
+
+
+def image_member(files):
+    """(extension, bytes) of the image in a sample"""
+    for ext, data in files.items():
+        if ext.lower() in IMAGE_EXTENSIONS:
+            return ext, data
+    return None, None
+
+
+def materialize(shard_dir, dest_dir, names=None):
+    """
+    Unpack every split to dest_dir/<split>/{images,labels} and write a data YAML.
+
+    Each shard is one sequential read, so copying a dataset off Drive or a
+    network disk onto local storage before training is bound by bandwidth.
+    Class names come from the shards, or from `names` if none were stored;
+    ValueError if neither has them. dest_dir is replaced if it holds an
+    earlier unpack (it has a copy of shards.json); any other non-empty
+    folder raises FileExistsError. Returns the path of the data YAML.
+    """
+    index = load_index(shard_dir)
+    names = index.get('names') or names
+    if not names:
+        raise ValueError(f"{shard_dir} has no class names; pass the data YAML the shards were labeled with")
+    dest_dir = Path(dest_dir)
+    if dest_dir.is_dir() and any(dest_dir.iterdir()):
+        if not (dest_dir / INDEX_FILE).is_file() or any(dest_dir.glob('*.tar')):
+            raise FileExistsError(f"{dest_dir} is not empty and was not unpacked from shards")
+        # Leftovers of another shard set or of an older dataset must not be trained on
+        shutil.rmtree(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    # Marks dest_dir (even half unpacked) as one the next materialize may replace
+    shutil.copyfile(Path(shard_dir) / INDEX_FILE, dest_dir / INDEX_FILE)
+    for split, shards in index['splits'].items():
+        images_dir, labels_dir = dest_dir / split / 'images', dest_dir / split / 'labels'
+        images_dir.mkdir(parents=True, exist_ok=True)
+        labels_dir.mkdir(parents=True, exist_ok=True)
+        for key, files in iter_samples(Path(shard_dir) / s['file'] for s in shards):
+            ext, image = image_member(files)
+            if image is None:
+                continue
+            (images_dir / f"{key}{ext}").write_bytes(image)
+            if files.get('.txt'):
+                (labels_dir / f"{key}.txt").write_bytes(files['.txt'])
+
+    splits = index['splits']
+    config = {'path': str(dest_dir.resolve())}
+    if 'train' in splits:
+        config['train'] = 'train/images'
+    val = next((s for s in ('val', 'valid') if s in splits), None)
+    if val:
+        config['val'] = f"{val}/images"
+    if 'test' in splits:
+        config['test'] = 'test/images'
+    config['nc'] = len(names)
+    config['names'] = {int(k): v for k, v in names.items()}  # JSON keys are strings
+    data_yaml = dest_dir / 'data.yaml'
+    with open(data_yaml, 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return data_yaml
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Pack dataset splits into tar shards, or unpack them for training',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Pack the output of split_dataset (train/val/test) into 256 MB shards
+  python shards_brssd.py pack DATASET_FINAL BRSSD_shards --data brssd_data.yaml
+
+  # Stream the shards onto local disk and train (same as train_brssd_improved.py --shards)
+  python shards_brssd.py unpack BRSSD_shards /content/brssd_local
+  python train_brssd_improved.py --data /content/brssd_local/data.yaml
+
+  # Predict straight from the test shards
+  python predict_brssd.py --weights best.pt --source BRSSD_shards --split test
+        """
+    )
+    parser.add_argument('command', choices=['pack', 'unpack', 'info'], help='Action')
+    parser.add_argument('source', help='Dataset folder (pack) or shard folder (unpack, info)')
+    parser.add_argument('dest', nargs='?', default=None, help='Shard folder (pack) or local folder (unpack)')
+    parser.add_argument('--shard-mb', type=int, default=SHARD_BYTES // 2**20, help='Target shard size in MB')
+    parser.add_argument('--data', type=str, default=None, help='Data YAML with the class names to store (pack) or use if none were stored (unpack)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the packing order')
+    args = parser.parse_args()
+
+    if not Path(args.source).is_dir():
+        print(f"✗ Folder not found: {args.source}")
+        return 1
+    if args.command != 'info' and not args.dest:
+        print(f"✗ {args.command} needs a destination folder")
+        return 1
+
+    start = time.perf_counter()
+    if args.command == 'pack':
+        if not dataset_splits(args.source):
+            print(f"✗ No train/val/valid/test folders with images/ in {args.source}")
+            return 1
+        index = write_shards(args.source, args.dest, args.shard_mb * 2**20, load_class_names(args.data), args.seed)
+        print(f"✓ Packed into {args.dest} ({time.perf_counter() - start:.1f}s)")
+    elif args.command == 'unpack':
+        try:
+            data_yaml = materialize(args.source, args.dest, load_class_names(args.data))
+        except ValueError as e:
+            print(f"✗ {e} (--data)")
+            return 1
+        except FileExistsError as e:
+            print(f"✗ {e}")
+            return 1
+        print(f"✓ Unpacked to {args.dest} ({time.perf_counter() - start:.1f}s), data YAML: {data_yaml}")
+        return 0
+    else:
+        index = load_index(args.source)
+
+    print("\n" + "=" * 60)
+    print("SHARDS")
+    print("=" * 60)
+    for split, shards in index['splits'].items():
+        samples = sum(s['samples'] for s in shards)
+        size = sum(s['bytes'] for s in shards)
+        print(f"  {split:<6} {len(shards):>4} shards  {samples:>7} samples  {size / 2**20:>8.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Tests for evaluate_brssd.py on hand-built labels and predictions
+"""
+
+from collections import Counter
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from evaluate_brssd import collect_stats, compute_ap, parse_label_text, read_predictions, summarize
+
+NEAR = '0.25 0.25 0.2 0.2'
+FAR = '0.75 0.75 0.2 0.2'
+
+
+def labels(*rows):
+    cls, boxes, _ = parse_label_text('\n'.join(rows))
+    return cls, boxes
+
+
+def test_parse_label_text_rows():
+    counts = Counter()
+    cls, boxes, conf = parse_label_text(
+        f"0 {NEAR} 0.9\n1 {FAR}\n\n2 0.5 0.5 0.1\n3 x 0.5 0.1 0.1 0.4\n4 {NEAR} 0.3 7\n", counts)
+    assert cls.tolist() == [0, 1]
+    assert boxes.shape == (2, 4)
+    assert conf[0] == 0.9 and np.isnan(conf[1])
+    assert counts['malformed'] == 3
+
+
+def test_missing_confidence_is_per_row(tmp_path):
+    (tmp_path / 'a.txt').write_text(f"0 {NEAR} 0.4\n1 {FAR}\nnot a row\n")
+    cls, _, conf = read_predictions(str(tmp_path))['a']
+    assert cls.tolist() == [0, 1]
+    assert conf.tolist() == [0.4, 1.0]
+
+
+def test_perfect_curve_ap():
+    # The 101-point interpolation gives 0.995 for a perfect detector, as in Ultralytics
+    ap, _, _ = compute_ap(np.array([1.0]), np.array([1.0]))
+    assert ap == pytest.approx(0.995)
+
+
+def test_ap_and_confusion_matrix():
+    gt = {
+        'a': labels(f"0 {NEAR}"),
+        'b': labels(f"0 {NEAR}"),
+        'c': labels(f"0 {NEAR}", f"1 {FAR}"),
+        'd': labels(f"1 {NEAR}"),
+    }
+    preds = {
+        'a': parse_label_text(f"0 {NEAR} 0.9"),                 # true positive
+        'b': parse_label_text(f"0 {FAR} 0.8"),                  # false positive, label missed
+        'c': parse_label_text(f"0 {NEAR} 0.6\n1 {FAR} 0.7"),    # two true positives
+        'd': parse_label_text(f"0 {NEAR} 0.5"),                 # right box, wrong class
+    }
+    per_image, matrix, nc = collect_stats(gt, preds, nc=2)
+    report = summarize(per_image, matrix, nc)
+    ap = {c['class']: c for c in report['per_class']}
+
+    # Class 0 (3 labels): precision 1 up to recall 1/3, 2/3 up to 2/3, then 1/2
+    assert ap[0]['ap50'] == pytest.approx(1 / 3 + 1 / 3 * 2 / 3 + 1 / 3 * 0.5 / 2, abs=2e-3)
+    # Class 1 (2 labels): one detection at precision 1
+    assert ap[1]['ap50'] == pytest.approx(0.75)
+    # Matches are exact boxes, so every IoU threshold agrees
+    assert ap[0]['ap50_95'] == ap[0]['ap50'] and ap[1]['ap50_95'] == ap[1]['ap50']
+    assert report['summary']['map50'] == pytest.approx((ap[0]['ap50'] + ap[1]['ap50']) / 2, abs=1e-5)
+
+    # Rows are true classes, columns predicted; the last row/column is background
+    assert matrix.tolist() == [
+        [2, 0, 1],
+        [1, 1, 0],
+        [1, 0, 0],
+    ]
+
+
+def test_predictions_without_label_are_false_positives():
+    gt = {'a': labels(f"0 {NEAR}")}
+    preds = {
+        'a': parse_label_text(f"0 {NEAR} 0.9"),
+        'b': parse_label_text(f"0 {NEAR} 0.95"),  # no label file: background
+    }
+    per_image, matrix, nc = collect_stats(gt, preds, nc=1)
+    report = summarize(per_image, matrix, nc)
+    assert report['summary']['images'] == 2
+    assert matrix.tolist() == [[1, 0], [1, 0]]
+    # The top-ranked detection is the false positive: precision 1/2 up to recall 1
+    # (x 0.995 from the 101-point interpolation, as for a perfect curve)
+    assert report['per_class'][0]['ap50'] == pytest.approx(0.5 * 0.995)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Per-Class Confidence Thresholds for BRSSD Models
+Derives the F1-optimal (or precision-constrained) confidence threshold of
+every class from validation predictions and stores it next to the model
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from evaluate_brssd import collect_stats, load_class_names, read_label_dir, read_predictions
+
+DEFAULT_CONF = 0.25
+
+
+def thresholds_path(weights):
+    """Sidecar file holding the thresholds of a checkpoint (best.pt -> best_thresholds.json)"""
+    weights = Path(weights)
+    return weights.with_name(f"{weights.stem}_thresholds.json")
+
+
+def class_operating_points(tp, conf, pred_cls, n_labels, c):
+    """Confidence, precision, recall and F1 at every prediction of class c (conf descending)"""
+    mask = pred_cls == c
+    order = np.argsort(-conf[mask], kind='stable')
+    hits = tp[mask][order]
+    confs = conf[mask][order]
+    tpc = hits.cumsum()
+    precision = tpc / np.arange(1, len(hits) + 1)
+    recall = tpc / max(n_labels, 1)
+    f1 = 2 * precision * recall / (precision + recall + 1e-16)
+    return confs, precision, recall, f1
+
+
+def fit_thresholds(per_image, nc, mode='f1', min_precision=0.9, default=DEFAULT_CONF):
+    """
+    Pick a confidence threshold per class from per-image match statistics.
+
+    mode='f1' keeps the threshold with the highest F1; mode='precision'
+    keeps the lowest threshold (highest recall) whose precision is still
+    at least min_precision, falling back to the F1 optimum if none is.
+    """
+    stats = list(per_image.values())
+    tp = np.concatenate([s['tp'][:, 0] for s in stats]) if stats else np.zeros(0, bool)
+    conf = np.concatenate([s['conf'] for s in stats]) if stats else np.zeros(0)
+    pred_cls = np.concatenate([s['pred_cls'] for s in stats]).astype(int) if stats else np.zeros(0, int)
+    target_cls = np.concatenate([s['target_cls'] for s in stats]).astype(int) if stats else np.zeros(0, int)
+    n_labels = np.bincount(target_cls, minlength=nc)
+
+    classes = {}
+    for c in range(nc):
+        if n_labels[c] == 0 or not (pred_cls == c).any():
+            classes[c] = {'conf': default, 'source': 'default', 'instances': int(n_labels[c])}
+            continue
+        confs, precision, recall, f1 = class_operating_points(tp, conf, pred_cls, n_labels[c], c)
+        i = int(f1.argmax())
+        source = 'f1'
+        if mode == 'precision':
+            ok = np.flatnonzero(precision >= min_precision)
+            if len(ok):
+                i, source = int(ok[-1]), 'precision'
+            else:
+                source = 'f1 (precision target not reachable)'
+        classes[c] = {
+            'conf': round(float(confs[i]), 5),
+            'source': source,
+            'instances': int(n_labels[c]),
+            'precision': round(float(precision[i]), 4),
+            'recall': round(float(recall[i]), 4),
+            'f1': round(float(f1[i]), 4),
+        }
+    return classes
+
+
+def save_thresholds(weights, classes, mode, names=None, default=DEFAULT_CONF, min_precision=None):
+    """Write the thresholds sidecar next to the checkpoint"""
+    path = thresholds_path(weights)
+    data = {
+        'weights': Path(weights).name,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'mode': mode,
+        'min_precision': min_precision,
+        'default_conf': default,
+        'classes': {str(c): {'name': (names or {}).get(c, str(c)), **v} for c, v in classes.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+def load_thresholds(path_or_weights):
+    """Load thresholds from a sidecar (or the checkpoint it belongs to); None if absent"""
+    path = Path(path_or_weights)
+    if path.suffix != '.json':
+        path = thresholds_path(path)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def threshold_table(thresholds, nc=None):
+    """Lookup array: threshold[class_id]; unknown classes use the default"""
+    classes = {int(c): v['conf'] for c, v in thresholds['classes'].items()}
+    size = max(nc or 0, max(classes, default=-1) + 1)
+    table = np.full(size, thresholds.get('default_conf', DEFAULT_CONF), dtype=np.float32)
+    for c, conf in classes.items():
+        table[c] = conf
+    return table
+
+
+def apply_class_thresholds(cls, conf, table, default=DEFAULT_CONF):
+    """Boolean keep-mask for detections, vectorized over any number of boxes"""
+    cls = np.asarray(cls, dtype=int)
+    conf = np.asarray(conf)
+    if not len(table):
+        return conf >= default
+    known = cls < len(table)
+    limits = np.where(known, table[np.minimum(cls, len(table) - 1)], default)
+    return conf >= limits
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Derive per-class confidence thresholds from validation predictions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Validation predictions with confidences (keep everything: conf=0.001)
+  yolo predict model=runs/brssd/YOLOv10m_BRSSD/weights/best.pt source=BRSSD/valid/images \\
+       save_txt=True save_conf=True conf=0.001
+
+  # F1-optimal thresholds, saved as best_thresholds.json next to best.pt
+  python thresholds_brssd.py --weights runs/brssd/YOLOv10m_BRSSD/weights/best.pt \\
+      --labels BRSSD/valid/labels --predictions runs/detect/predict/labels
+
+  # Highest-recall thresholds that keep precision at 0.95 or better
+  python thresholds_brssd.py --weights best.pt --labels BRSSD/valid/labels \\
+      --predictions preds.jsonl --mode precision --min-precision 0.95
+
+predict_brssd.py applies the saved thresholds automatically.
+        """
+    )
+    parser.add_argument('--weights', required=True, help='Checkpoint the thresholds belong to')
+    parser.add_argument('--labels', required=True, help='Validation label directory')
+    parser.add_argument('--predictions', required=True,
+                        help='Validation predictions (label directory with confidences or JSONL)')
+    parser.add_argument('--mode', choices=['f1', 'precision'], default='f1',
+                        help='f1: maximize F1; precision: maximize recall at --min-precision')
+    parser.add_argument('--min-precision', type=float, default=0.9,
+                        help='Precision floor for --mode precision')
+    parser.add_argument('--default-conf', type=float, default=DEFAULT_CONF,
+                        help='Threshold for classes without validation data')
+    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML for class names')
+    args = parser.parse_args()
+
+    for path in (args.labels, args.predictions):
+        if not Path(path).exists():
+            print(f"✗ Not found: {path}")
+            return 1
+
+    names = load_class_names(args.data)
+    per_image, _, nc = collect_stats(read_label_dir(args.labels), read_predictions(args.predictions),
+                                     nc=len(names) if names else None)
+    classes = fit_thresholds(per_image, nc, mode=args.mode, min_precision=args.min_precision,
+                             default=args.default_conf)
+
+    print("\n" + "=" * 80)
+    print(f"PER-CLASS THRESHOLDS ({args.mode})")
+    print("=" * 80)
+    print(f"  {'Class':<34} {'Inst':>5} {'Conf':>7} {'P':>7} {'R':>7} {'F1':>7}")
+    print(f"  {'-'*34} {'-'*5} {'-'*7} {'-'*7} {'-'*7} {'-'*7}")
+    for c, v in classes.items():
+        name = (names or {}).get(c, str(c))
+        if v['source'] == 'default':
+            print(f"  {name[:34]:<34} {v['instances']:>5} {v['conf']:>7.3f}    (default)")
+            continue
+        print(f"  {name[:34]:<34} {v['instances']:>5} {v['conf']:>7.3f} {v['precision']:>7.3f} "
+              f"{v['recall']:>7.3f} {v['f1']:>7.3f}")
+    print("=" * 80)
+
+    path = save_thresholds(args.weights, classes, args.mode, names, default=args.default_conf,
+                           min_precision=args.min_precision if args.mode == 'precision' else None)
+    print(f"\n✓ Thresholds saved to: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
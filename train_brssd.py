@@ -10,6 +10,8 @@ from ultralytics import YOLO
 import yaml
 import argparse
 
+from dataset_manifest import DatasetManifest, print_summary
+
 def verify_dataset(data_yaml_path):
     """Verify dataset structure and configuration"""
     print("Verifying dataset configuration...")
@@ -29,13 +31,14 @@ def verify_dataset(data_yaml_path):
         if not full_path.exists():
             raise FileNotFoundError(f"Required directory not found: {full_path}")
     
-    # Count images
-    train_images = list((dataset_path / 'train/images').glob('*.*'))
-    val_images = list((dataset_path / 'valid/images').glob('*.*'))
+    # Integrity from the cached manifest (only new or changed files are re-read)
+    manifest = DatasetManifest(data_yaml_path)
+    changes = manifest.refresh()
+    report = manifest.summary()
+    manifest.close()
     
-    print(f"✓ Dataset verified:")
-    print(f"  Training images: {len(train_images)}")
-    print(f"  Validation images: {len(val_images)}")
+    print(f"✓ Dataset verified ({changes['images']} images and {changes['labels']} labels re-read):")
+    print_summary(report)
     print(f"  Number of classes: {config['nc']}")
     
     return config
@@ -7,12 +7,21 @@ Includes GPU auto-detection, better error handling, and progress tracking
 
 import os
 import sys
+import json
 from pathlib import Path
 from ultralytics import YOLO
 import yaml
 import argparse
 import torch
 
+from autotune_brssd import autotune_cpu, apply_thread_settings, save_autotune_report
+from resume_brssd import add_deterministic_order, find_incomplete_run, load_checkpoint_info
+from distill_brssd import make_distillation_trainer
+from benchmark_brssd import benchmark, print_comparison, save_benchmark
+from dataset_manifest import DatasetManifest, print_summary
+from evaluate_brssd import load_class_names
+from shards_brssd import materialize
+
 def check_gpu():
     """Check GPU availability and return device info"""
     print("\n" + "="*60)
@@ -47,28 +56,32 @@ def verify_dataset(data_yaml_path):
     
     dataset_path = Path(config['path'])
     
-    # Check directories
-    required_dirs = ['train/images', 'train/labels', 'valid/images', 'valid/labels']
+    # Check directories (val is valid/ in BRSSD, val/ in split_dataset output)
+    required_dirs = []
+    for split in ('train', 'val'):
+        images_dir = config.get(split, f"{split}/images")
+        required_dirs += [images_dir, images_dir.replace('images', 'labels')]
     for dir_path in required_dirs:
         full_path = dataset_path / dir_path
         if not full_path.exists():
             raise FileNotFoundError(f"Required directory not found: {full_path}")
     
-    # Count images
-    train_images = list((dataset_path / 'train/images').glob('*.*'))
-    val_images = list((dataset_path / 'valid/images').glob('*.*'))
-    test_images = list((dataset_path / 'test/images').glob('*.*')) if (dataset_path / 'test/images').exists() else []
+    # Integrity from the cached manifest (only new or changed files are re-read)
+    manifest = DatasetManifest(data_yaml_path)
+    changes = manifest.refresh()
+    report = manifest.summary()
+    manifest.close()
     
-    print(f"✓ Dataset verified:")
-    print(f"  Training images: {len(train_images)}")
-    print(f"  Validation images: {len(val_images)}")
-    print(f"  Test images: {len(test_images)}")
+    print(f"✓ Dataset verified ({changes['images']} images and {changes['labels']} labels re-read):")
+    print_summary(report)
     print(f"  Number of classes: {config['nc']}")
     print(f"  Dataset path: {dataset_path.absolute()}")
     
     return config
 
-def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='brssd_data.yaml', device='auto'):
+def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='brssd_data.yaml', device='auto',
+                  autotune=False, resume=None, save_period=5, hyp=None, name=None,
+                  teacher=None, baseline=None):
     """Train YOLOv10 on BRSSD dataset"""
     
     # Auto-detect GPU if device is 'auto'
@@ -78,6 +91,26 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
     # Verify dataset
     config = verify_dataset(data_yaml)
     
+    # Locate the checkpoint to resume from
+    resume_from = None
+    if resume == 'auto':
+        info = find_incomplete_run('runs/brssd')
+        if info is None:
+            print("No incomplete run found under runs/brssd/ - starting a new run")
+        else:
+            resume_from = info['path']
+    elif resume:
+        resume_from = Path(resume)
+        if not resume_from.exists():
+            raise FileNotFoundError(f"Checkpoint not found: {resume_from}")
+        info = load_checkpoint_info(resume_from)
+    
+    if resume_from:
+        print(f"\n✓ Resuming from {resume_from} (epoch {info['epoch'] + 1}/{info['epochs']})")
+        if autotune:
+            print("  Note: --autotune is ignored when resuming; batch size comes from the checkpoint")
+            autotune = False
+    
     # Model selection
     model_variants = {
         'n': 'yolov10n.pt',  # Nano - fastest
@@ -100,18 +133,34 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
     print(f"  Image size: {imgsz}")
     print(f"  Dataset: {data_yaml}")
     print(f"  Device: {device}")
+    if teacher:
+        print(f"  Teacher: {teacher}")
+    
+    if resume_from:
+        run_name = resume_from.parent.parent.name
+    else:
+        run_name = name or f'YOLOv10{model_size}_BRSSD'
+    workers = 8 if device != 'cpu' else 4
+    
+    # Auto-tune batch, workers and threads before torch starts any parallel work
+    if device == 'cpu' and autotune:
+        report = autotune_cpu(model_path, data_yaml, imgsz=imgsz, batch=batch)
+        tuned = report['settings']
+        apply_thread_settings(tuned)
+        batch, workers = tuned['batch'], tuned['workers']
+        save_autotune_report(report, Path('runs/brssd') / run_name)
     
     # Initialize model
     print("\nInitializing model...")
     try:
-        model = YOLO(model_path)
+        model = YOLO(str(resume_from) if resume_from else model_path)
         print(f"✓ Model loaded successfully")
     except Exception as e:
         print(f"✗ Failed to load model: {e}")
         raise
     
     # Adjust batch size for CPU
-    if device == 'cpu' and batch > 8:
+    if device == 'cpu' and batch > 8 and not autotune:
         print(f"\n⚠️  Reducing batch size from {batch} to 8 for CPU training")
         batch = 8
     
@@ -121,11 +170,11 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
         'epochs': epochs,
         'imgsz': imgsz,
         'batch': batch,
-        'name': f'YOLOv10{model_size}_BRSSD',
+        'name': run_name,
         'patience': 50,
         'save': True,
         'device': device,
-        'workers': 8 if device != 'cpu' else 4,
+        'workers': workers,
         'project': 'runs/brssd',
         'exist_ok': True,
         'pretrained': True,
@@ -135,7 +184,7 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
         'deterministic': True,
         'val': True,
         'plots': True,
-        'save_period': -1,  # Save checkpoint every N epochs (-1 to disable)
+        'save_period': save_period,  # Save checkpoint every N epochs (-1 to disable)
         
         # Augmentation
         'hsv_h': 0.015,
@@ -167,12 +216,41 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
         'dfl': 1.5,
     }
     
+    # Hyperparameter overrides (e.g. the best config from search_brssd.py)
+    if hyp:
+        print(f"\nApplying {len(hyp)} hyperparameter overrides:")
+        for key, value in hyp.items():
+            print(f"  {key}: {training_args.get(key)} -> {value}")
+        training_args.update(hyp)
+    
+    # The trainer may reset workers for CPU runs; keep the tuned value
+    if device == 'cpu' and autotune:
+        def keep_tuned_workers(trainer):
+            trainer.args.workers = workers
+        model.add_callback('on_pretrain_routine_start', keep_tuned_workers)
+    
+    # Same shuffle order per epoch whether or not the run was interrupted
+    add_deterministic_order(model, seed=training_args['seed'])
+    
+    # Resumed runs take their arguments (and optimizer/EMA state) from the checkpoint
+    if resume_from:
+        train_kwargs = {'resume': str(resume_from), 'device': device, 'workers': workers}
+    else:
+        train_kwargs = training_args
+    
+    # Distillation swaps in a trainer that adds the teacher's logit/feature losses
+    trainer = None
+    if teacher:
+        if not Path(teacher).exists():
+            raise FileNotFoundError(f"Teacher checkpoint not found: {teacher}")
+        trainer = make_distillation_trainer(teacher)
+    
     # Start training
     print("\nStarting training...\n")
     print("=" * 60)
     
     try:
-        results = model.train(**training_args)
+        results = model.train(trainer=trainer, **train_kwargs)
         
         print(f"\n{'='*60}")
         print("Training completed successfully!")
@@ -189,7 +267,7 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
         print(f"  Recall: {metrics.box.mr:.4f}")
         
         # Save best model info
-        results_dir = f"runs/brssd/YOLOv10{model_size}_BRSSD"
+        results_dir = f"runs/brssd/{run_name}"
         print(f"\n{'='*60}")
         print("Model Saved:")
         print(f"  Best weights: {results_dir}/weights/best.pt")
@@ -197,16 +275,46 @@ def train_yolov10(model_size='n', epochs=100, batch=16, imgsz=640, data_yaml='br
         print(f"  Results: {results_dir}/")
         print(f"{'='*60}\n")
         
+        # Distilled student vs a plain-trained model of the same size
+        if teacher:
+            compare_distillation(f"{results_dir}/weights/best.pt", baseline, data_yaml, imgsz, device,
+                                 results_dir)
+        
         return model, results, metrics
         
     except KeyboardInterrupt:
         print("\n\n⚠️  Training interrupted by user")
-        print("Partial results may be saved in runs/brssd/")
-        sys.exit(0)
+        print(f"Last completed epoch is saved in runs/brssd/{run_name}/weights/last.pt")
+        print("Continue with: python train_brssd_improved.py --resume auto")
+        sys.exit(130)
     except Exception as e:
         print(f"\n✗ Training failed: {e}")
         raise
 
+def compare_distillation(student, baseline, data_yaml, imgsz, device, results_dir):
+    """Report the distilled student's mAP and CPU latency against a plain-trained baseline"""
+    print("Benchmarking distilled student...")
+    report = {'student': benchmark(student, data_yaml, imgsz=imgsz, device=device)}
+    save_benchmark(report['student'], results_dir)
+    if baseline and Path(baseline).exists():
+        print("Benchmarking plain-trained baseline...")
+        report['baseline'] = benchmark(baseline, data_yaml, imgsz=imgsz, device=device)
+    elif baseline:
+        print(f"⚠️  Baseline checkpoint not found: {baseline}")
+    
+    print_comparison({'Distilled student': report['student'],
+                      **({'Plain-trained baseline': report['baseline']} if 'baseline' in report else {})},
+                     title="Distillation Report")
+    if 'baseline' in report:
+        delta = report['student']['map50_95'] - report['baseline']['map50_95']
+        print(f"  mAP50-95 change from distillation: {delta:+.4f}\n")
+    
+    path = Path(results_dir) / 'distill_report.json'
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Distillation report saved to: {path}")
+    return report
+
 def main():
     parser = argparse.ArgumentParser(
         description='Train YOLOv10 on BRSSD Dataset',
@@ -224,6 +332,24 @@ Examples:
   
   # Quick test run (1 epoch)
   python train_brssd_improved.py --epochs 1 --batch 4
+  
+  # Tune batch, workers and threads for this CPU before training
+  python train_brssd_improved.py --device cpu --autotune
+  
+  # Continue the most recent interrupted run under runs/brssd/
+  python train_brssd_improved.py --resume auto
+  
+  # Train with hyperparameters found by search_brssd.py
+  python train_brssd_improved.py --model s --hyp runs/brssd_search/best_hyp.yaml
+  
+  # Distil a trained YOLOv10m into a nano student and compare with plain nano
+  python train_brssd_improved.py --model n --name YOLOv10n_distill \\
+      --teacher runs/brssd/YOLOv10m_BRSSD/weights/best.pt \\
+      --baseline runs/brssd/YOLOv10n_BRSSD/weights/best.pt
+  
+  # Train from tar shards (see shards_brssd.py), unpacked to local disk first
+  python train_brssd_improved.py --shards /content/drive/MyDrive/BRSSD_shards \\
+      --shard-cache /content/brssd_local
         """
     )
     
@@ -232,16 +358,53 @@ Examples:
     parser.add_argument('--epochs', type=int, default=100, help='Number of training epochs')
     parser.add_argument('--batch', type=int, default=16, help='Batch size')
     parser.add_argument('--imgsz', type=int, default=640, help='Image size')
-    parser.add_argument('--data', type=str, default='brssd_data.yaml', help='Dataset YAML file')
+    parser.add_argument('--data', type=str, default=None,
+                       help='Dataset YAML file (default: brssd_data.yaml); with --shards, class names for shards without them')
     parser.add_argument('--device', type=str, default='auto', 
                        help='Device to use: auto, cpu, 0, 1, etc.')
+    parser.add_argument('--autotune', action='store_true',
+                       help='Time batch/workers/thread candidates before CPU training')
+    parser.add_argument('--resume', type=str, default=None,
+                       help="Resume training: 'auto' to pick the latest incomplete run, or a last.pt path")
+    parser.add_argument('--save-period', type=int, default=5,
+                       help='Keep an extra epochN.pt checkpoint every N epochs (-1 to disable)')
+    parser.add_argument('--hyp', type=str, default=None,
+                       help='YAML file with hyperparameter overrides (lr0, hsv_h, box, ...)')
+    parser.add_argument('--name', type=str, default=None,
+                       help='Run name under runs/brssd/ (default: YOLOv10<model>_BRSSD)')
+    parser.add_argument('--teacher', type=str, default=None,
+                       help='Trained teacher checkpoint (e.g. YOLOv10m/b best.pt) to distil from')
+    parser.add_argument('--baseline', type=str, default=None,
+                       help='Plain-trained checkpoint to compare the distilled student against')
+    parser.add_argument('--shards', type=str, default=None,
+                       help='Shard folder from shards_brssd.py; unpacked to --shard-cache and used instead of --data')
+    parser.add_argument('--shard-cache', type=str, default='/tmp/brssd_shards_local',
+                       help='Local folder the shards are unpacked to')
     
     args = parser.parse_args()
     
+    hyp = None
+    if args.hyp:
+        with open(args.hyp, 'r') as f:
+            hyp = yaml.safe_load(f) or {}
+    
     print("\n" + "="*60)
     print("BRSSD YOLOv10 Training Script")
     print("="*60)
     
+    if args.shards:
+        # Sequential shard reads onto local disk; class names fall back to an explicit --data only
+        print(f"Unpacking shards {args.shards} -> {args.shard_cache}")
+        try:
+            args.data = str(materialize(args.shards, args.shard_cache, load_class_names(args.data)))
+        except ValueError as e:
+            print(f"\n✗ {e} (--data)")
+            return 1
+        except FileExistsError as e:
+            print(f"\n✗ {e} (--shard-cache)")
+            return 1
+    args.data = args.data or 'brssd_data.yaml'
+    
     try:
         model, results, metrics = train_yolov10(
             model_size=args.model,
@@ -249,7 +412,14 @@ Examples:
             batch=args.batch,
             imgsz=args.imgsz,
             data_yaml=args.data,
-            device=args.device
+            device=args.device,
+            autotune=args.autotune,
+            resume=args.resume,
+            save_period=args.save_period,
+            hyp=hyp,
+            name=args.name,
+            teacher=args.teacher,
+            baseline=args.baseline
         )
         print("\n✓ Training pipeline completed successfully!")
         return 0